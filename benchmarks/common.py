@@ -0,0 +1,138 @@
+"""
+Shared helpers for the benchmark suites: timing samples, percentiles,
+JSON result files and comparison against a stored baseline.
+
+A result file is {"environment": {...}, "results": {scenario: {metric: value}}}.
+Metrics are compared scenario by scenario; a change beyond the tolerance in
+the wrong direction is a regression.
+"""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from orchestration.profiling import peak_rss_mb  # noqa: F401 (re-exported for the suites)
+
+
+class StageTimer:
+    """Thread-safe collection of duration samples (seconds) per stage."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def wrap(self, stage: str, fn):
+        """`fn` timed under `stage` on every call."""
+        def timed(*args, **kwargs):
+            with self.time(stage):
+                return fn(*args, **kwargs)
+        return timed
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                stage: latency_stats(samples)
+                for stage, samples in sorted(self.samples.items())
+            }
+
+def latency_stats(samples: Sequence[float]) -> dict[str, float]:
+    """count, total and mean/p50/p90/p99/max in milliseconds."""
+    values = np.asarray(samples, dtype=float) * 1000
+    if not len(values):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": len(values),
+        "total_ms": round(float(values.sum()), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+def environment() -> dict[str, str]:
+    """What the numbers depend on besides the code."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+    }
+
+def write_results(path: str, results: dict[str, dict[str, float]], **extra) -> None:
+    with open(path, "w") as f:
+        json.dump(dict(environment=environment(), results=results, **extra), f,
+                  indent=2, sort_keys=True)
+
+def load_results(path: str) -> dict[str, dict[str, float]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def compare(current: dict[str, dict[str, float]],
+            baseline: dict[str, dict[str, float]],
+            higher_is_better: Iterable[str] = (), tolerance: float = 0.10,
+            ignore: Iterable[str] = ()) -> tuple[list[dict], bool]:
+    """
+    Rows {scenario, metric, baseline, current, change, status} for the metrics
+    present in both files. Metrics are lower-is-better unless listed in
+    `higher_is_better`; `ignore` lists descriptive ones (sizes, counts).
+    Returns (rows, any regression beyond `tolerance`).
+    """
+    higher_is_better, ignore = set(higher_is_better), set(ignore)
+    rows, regressed = [], False
+    for scenario in sorted(set(current) & set(baseline)):
+        metrics = (set(current[scenario]) & set(baseline[scenario])) - ignore
+        for metric in sorted(metrics):
+            before, after = baseline[scenario][metric], current[scenario][metric]
+            if not isinstance(before, (int, float)) or before == 0:
+                continue
+            if not isinstance(after, (int, float)):
+                continue
+            change = (after - before) / abs(before)
+            worse = -change if metric in higher_is_better else change
+            if worse > tolerance:
+                status = "REGRESSION"
+            elif worse < -tolerance:
+                status = "improved"
+            else:
+                status = "ok"
+            regressed |= status == "REGRESSION"
+            rows.append({"scenario": scenario, "metric": metric, "baseline": before,
+                         "current": after, "change": change, "status": status})
+    return rows, regressed
+
+def print_comparison(rows: list[dict]) -> None:
+    for row in rows:
+        print(f"  {row['scenario']:<32} {row['metric']:<36} "
+              f"{row['baseline']:>12.4g} -> {row['current']:<12.4g} "
+              f"{row['change']:+7.1%}  {row['status']}")
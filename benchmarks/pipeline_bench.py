@@ -0,0 +1,256 @@
+"""
+End-to-end pipeline benchmark on synthetic universes.
+
+For each universe size the database is seeded with
+orchestration.seeder.seed_bulk, then run_pipeline runs against the five agent
+apps served in-process (FastAPI TestClient, one event loop per app) through
+the pipeline's own call path (retries, headers, wire formats). Seeding and
+the run each happen in a fresh child process, so peak memory is the run's.
+
+Per universe it records throughput (assets/s), wall time, per-stage latency
+percentiles (agent endpoints, price/fundamental loads, payload preparation,
+ledger writes), total DB write time, SQL statements and HTTP retries (from
+the run profile) and peak RSS, and saves them as JSON.
+
+    python -m benchmarks.pipeline_bench --tickers 100 1000 10000 --days 252 \
+        --out bench.json
+    python -m benchmarks.pipeline_bench --tickers 100 1000 --compare bench.json
+
+SQLite files go to --workdir (--keep reuses them and skips seeding);
+--db-url runs every size against one database instead (e.g. a local
+Postgres), seeded cumulatively in ascending order. --price-cache reads the
+prices from the columnar price cache (PRICE_CACHE_DIR, in --workdir; warmed
+before the timed run) instead of the database; compare db.load_prices.
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from multiprocessing import get_context
+from urllib.parse import urlsplit
+
+from benchmarks.common import (
+    StageTimer,
+    compare,
+    load_results,
+    peak_rss_mb,
+    print_comparison,
+    write_results,
+)
+
+HIGHER_IS_BETTER = {"assets_per_sec"}
+NOT_COMPARED = {"assets"}
+
+# Percentiles kept per stage in the flat metrics used for comparisons
+STAGE_METRICS = ("p50_ms", "p90_ms", "p99_ms")
+
+class InProcessAgents:
+    """Stands in for pipeline.http_clients, posting to the agent apps in-process."""
+
+    def __init__(self, clients, timer):
+        self.clients = clients
+        self.timer = timer
+
+    def configure(self, pool_size):
+        pass
+
+    def post(self, url, payload, headers):
+        path = urlsplit(url).path  # /api/v1/<agent>/<endpoint>
+        agent, endpoint = path.split("/api/v1/", 1)[1].split("/", 1)
+        body = {"content": payload} if isinstance(payload, bytes) else {"json": payload}
+        with self.timer.time(f"agent.{agent}.{endpoint}"):
+            resp = self.clients[agent].post(path, headers=headers, **body)
+        resp.raise_for_status()
+        return resp.json()
+
+    def log_stats(self):
+        pass
+
+def seed_universe(db_url, tickers, days, seed):
+    """Child process: seeds `tickers` x `days`. Returns the seeding time."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from orchestration import seeder
+
+    engine = create_engine(db_url)
+    started = time.perf_counter()
+    seeder.seed_bulk(tickers=tickers, days=days, seed=seed,
+                     session_factory=sessionmaker(bind=engine))
+    engine.dispose()
+    return time.perf_counter() - started
+
+def run_universe(db_url, concurrency, batch_size, verbose, price_cache_dir=None):
+    """Child process: one instrumented pipeline run. Returns its metrics."""
+    # Lift the value agent's API key quota: measure the pipeline, not the limiter
+    os.environ.setdefault("RATE_LIMIT_API_KEY_LIMIT", "1000000")
+    import logging
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from orchestration import pipeline
+    from services.consensus_agent.main import app as consensus_app
+    from services.macro_agent.main import app as macro_app
+    from services.quant_agent.main import app as quant_app
+    from services.risk_agent.main import app as risk_app
+    from services.value_agent.main import app as value_app
+
+    if not verbose:
+        for name in list(logging.root.manager.loggerDict):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    engine = create_engine(db_url)
+    if price_cache_dir:
+        from services.shared.price_cache import refresh_price_cache
+
+        # Steady state: the run only checks the watermarks and reads the cache
+        with sessionmaker(bind=engine)() as db:
+            refresh_price_cache(db, price_cache_dir)
+        pipeline.PRICE_CACHE_DIR = price_cache_dir
+    timer = StageTimer()
+    uploaded = {"results": 0, "profile": {}}
+    apps = {"value": value_app, "quant": quant_app, "macro": macro_app,
+            "risk": risk_app, "consensus": consensus_app}
+    with ExitStack() as stack:
+        clients = {
+            name: stack.enter_context(TestClient(app)) for name, app in apps.items()
+        }
+        patches = {
+            "SessionLocal": sessionmaker(autocommit=False, autoflush=False,
+                                         bind=engine),
+            "http_clients": InProcessAgents(clients, timer),
+            "upload_to_minio": lambda data, run_id: uploaded.update(
+                results=len(data["results"])),
+            "upload_profile": lambda report, run_id: uploaded.update(profile=report),
+            "load_universe_prices": timer.wrap("db.load_prices",
+                                               pipeline.load_universe_prices),
+            "load_latest_fundamentals": timer.wrap("db.load_fundamentals",
+                                                   pipeline.load_latest_fundamentals),
+            "prepare_asset": timer.wrap("prepare", pipeline.prepare_asset),
+            "flush_ledger": timer.wrap("db.write", pipeline.flush_ledger),
+        }
+        for name, value in patches.items():
+            setattr(pipeline, name, value)
+
+        started = time.perf_counter()
+        pipeline.run_pipeline(concurrency=concurrency, batch_size=batch_size,
+                              incremental=False)
+        wall = time.perf_counter() - started
+    engine.dispose()
+
+    stages = timer.summary()
+    metrics = {
+        "assets": uploaded["results"],
+        "wall_seconds": round(wall, 3),
+        "assets_per_sec": round(uploaded["results"] / wall, 2) if wall else 0.0,
+        "db_write_seconds": round(
+            stages.get("db.write", {}).get("total_ms", 0.0) / 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        # From the run profile the pipeline uploads in production
+        "sql_statements": uploaded["profile"].get("sql", {}).get("statements", 0),
+        "http_retries": uploaded["profile"].get("http", {}).get("retries", 0),
+    }
+    for stage, stats in stages.items():
+        metrics.update({
+            f"{stage}.{key}": stats[key] for key in STAGE_METRICS if key in stats
+        })
+    return metrics
+
+def in_child(fn, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the analysis pipeline end to end on synthetic "
+                    "universes.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Universe sizes")
+    parser.add_argument("--days", type=int, default=252,
+                        help="Business days of history per ticker")
+    parser.add_argument("--db-url",
+                        help="Database for every size (default: one SQLite file per "
+                             "size in --workdir)")
+    parser.add_argument("--workdir", default=".bench",
+                        help="Directory for the SQLite databases")
+    parser.add_argument("--keep", action="store_true",
+                        help="Reuse existing SQLite databases without reseeding")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="PIPELINE_CONCURRENCY for the runs")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="PIPELINE_BATCH_SIZE for the runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="pipeline_bench.json", help="Results file")
+    parser.add_argument("--compare",
+                        help="Baseline results file; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative change counted as a regression")
+    parser.add_argument("--price-cache", action="store_true",
+                        help="Load prices from the columnar price cache "
+                             "(requires pyarrow)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Keep the pipeline's INFO logging")
+    args = parser.parse_args(argv)
+
+    # Read before --out is written: they may be the same file
+    baseline = load_results(args.compare) if args.compare else None
+    os.makedirs(args.workdir, exist_ok=True)
+    results = {}
+    for tickers in sorted(args.tickers):
+        scenario = f"tickers={tickers},days={args.days},batch={args.batch_size}"
+        if args.price_cache:
+            scenario += ",cache"
+        db_url = args.db_url
+        seed_seconds = None
+        if db_url is None:
+            path = os.path.join(args.workdir, f"universe_{tickers}x{args.days}.db")
+            db_url = f"sqlite:///{path}"
+            if os.path.exists(path) and not args.keep:
+                os.remove(path)
+            if not os.path.exists(path):
+                seed_seconds = in_child(seed_universe, db_url, tickers, args.days,
+                                        args.seed)
+        else:
+            seed_seconds = in_child(seed_universe, db_url, tickers, args.days,
+                                    args.seed)
+        if seed_seconds is not None:
+            print(f"[{scenario}] seeded in {seed_seconds:.1f}s")
+
+        price_cache_dir = None
+        if args.price_cache:
+            price_cache_dir = os.path.join(args.workdir,
+                                           f"price_cache_{tickers}x{args.days}")
+        if price_cache_dir and not args.keep:
+            shutil.rmtree(price_cache_dir, ignore_errors=True)
+        metrics = in_child(run_universe, db_url, args.concurrency, args.batch_size,
+                           args.verbose, price_cache_dir)
+        results[scenario] = metrics
+        print(f"[{scenario}] {metrics['assets']} assets in "
+              f"{metrics['wall_seconds']:.2f}s "
+              f"({metrics['assets_per_sec']:.1f} assets/s), "
+              f"DB writes {metrics['db_write_seconds']:.2f}s, "
+              f"peak RSS {metrics['peak_rss_mb']:.0f} MB")
+        for key in sorted(k for k in metrics if k.endswith(".p50_ms")):
+            stage = key[:-len(".p50_ms")]
+            p99 = metrics.get(stage + ".p99_ms", 0)
+            print(f"    {stage:<36} p50 {metrics[key]:8.2f} ms  p99 {p99:8.2f} ms")
+
+    write_results(args.out, results, args=vars(args))
+    print(f"Results written to {args.out}")
+
+    if baseline is not None:
+        rows, regressed = compare(results, baseline, HIGHER_IS_BETTER, args.tolerance,
+                                  NOT_COMPARED)
+        print(f"\n--- Comparison with {args.compare} "
+              f"(tolerance {args.tolerance:.0%}) ---")
+        print_comparison(rows)
+        return 1 if regressed else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Micro-benchmarks of the agents' rule functions, stage by stage.
+
+Each case times, per call and in isolation:
+
+- validate_json: request body -> input model (what the agent does per request);
+- validate_columns: binary columnar body -> input model (quant/risk);
+- panel: input model -> right-aligned NumPy panel (the rules build this
+  instead of a DataFrame; see services/shared/panel.py);
+- compute: the math on the panel / validated model;
+- rule: the public rule function on a validated model (panel + compute);
+- end_to_end: validate_json + rule.
+
+Quant and risk run over 30 / 252 / 2,520 / 25,200 price points, consensus
+over 1-50 signals. Results are saved as JSON ({case: {stage.median_us, ...}});
+--compare checks them against a baseline file.
+
+    python -m benchmarks.rules_bench --out rules.json
+    python -m benchmarks.rules_bench --rules quant risk --compare rules.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.common import compare, load_results, print_comparison, write_results
+
+PRICE_SIZES = [30, 252, 2520, 25200]
+SIGNAL_COUNTS = [1, 5, 10, 50]
+RULES = ["quant", "risk", "value", "macro", "consensus"]
+
+Case = tuple[str, dict[str, Callable[[], object]]]
+
+def price_history(size: int, seed: int = 7):
+    dates = [datetime(1930, 1, 1) + timedelta(days=i) for i in range(size)]
+    returns = np.random.default_rng(seed).normal(0.0003, 0.015, size)
+    closes = 100 * np.cumprod(1 + returns)
+    return dates, closes.tolist()
+
+def price_cases(rule: str, sizes: list[int]) -> list[Case]:
+    from services.shared.panel import input_closes, stack_series
+    from services.shared.wire import decode_price_columns, encode_price_columns
+    if rule == "quant":
+        from services.quant_agent.rules.signals import (
+            _quant_panel,
+            calculate_quant_signals,
+        )
+        from services.quant_agent.schema import QuantColumnsInput as ColumnsModel
+        from services.quant_agent.schema import QuantInput as JsonModel
+        fields = {"ticker": "BENCH"}
+        def compute(matrix, counts):
+            return _quant_panel(["BENCH"], matrix, counts)
+        run_rule = calculate_quant_signals
+    else:
+        from services.risk_agent.rules.risk_metrics import (
+            _risk_panel,
+            calculate_risk_metrics,
+        )
+        from services.risk_agent.schema import RiskColumnsInput as ColumnsModel
+        from services.risk_agent.schema import RiskInput as JsonModel
+        fields = {"target_volatility": 0.15}
+        def compute(matrix, counts):
+            return _risk_panel(["BENCH"], matrix, counts, np.array([0.15]))
+        run_rule = calculate_risk_metrics
+
+    cases = []
+    for size in sizes:
+        dates, closes = price_history(size)
+        prices = [{"date": d.isoformat(), "price": c} for d, c in zip(dates, closes)]
+        body = json.dumps(dict(fields, prices=prices))
+        columns_body = encode_price_columns(fields, dates, closes)
+        model = JsonModel.model_validate_json(body)
+        matrix, counts = stack_series([input_closes(model)])
+
+        def validate_columns(columns_body=columns_body):
+            decoded, date_column, close_column = decode_price_columns(columns_body)
+            return ColumnsModel(dates=date_column, closes=close_column, **decoded)
+
+        cases.append((f"{rule}/prices={size}", {
+            "validate_json": lambda body=body: JsonModel.model_validate_json(body),
+            "validate_columns": validate_columns,
+            "panel": lambda model=model: stack_series([input_closes(model)]),
+            "compute": lambda matrix=matrix, counts=counts: compute(matrix, counts),
+            "rule": lambda model=model: run_rule(model),
+            "end_to_end": lambda body=body: run_rule(
+                JsonModel.model_validate_json(body)),
+        }))
+    return cases
+
+def scalar_case(name: str, model, rule, payload: dict) -> Case:
+    body = json.dumps(payload)
+    validated = model.model_validate_json(body)
+    return (name, {
+        "validate_json": lambda: model.model_validate_json(body),
+        "compute": lambda: rule(validated),
+        "end_to_end": lambda: rule(model.model_validate_json(body)),
+    })
+
+def consensus_cases(signal_counts: list[int]) -> list[Case]:
+    from services.consensus_agent.rules.aggregation import aggregate_signals
+    from services.consensus_agent.schema import ConsensusInput
+    from services.shared.models.enums import SignalType
+
+    rng = np.random.default_rng(11)
+    kinds = [s.value for s in SignalType]
+    return [
+        scalar_case(f"consensus/signals={n}", ConsensusInput, aggregate_signals, {
+            "ticker": "BENCH",
+            "signals": [
+                {"agent_name": f"agent_{i}", "signal": kinds[i % len(kinds)],
+                 "score": float(rng.uniform(-1, 1)),
+                 "weight": float(rng.uniform(0.5, 2))}
+                for i in range(n)
+            ],
+        })
+        for n in signal_counts
+    ]
+
+def build_cases(rules: list[str], sizes: list[int],
+                signal_counts: list[int]) -> list[Case]:
+    cases: list[Case] = []
+    for rule in rules:
+        if rule in ("quant", "risk"):
+            cases += price_cases(rule, sizes)
+        elif rule == "value":
+            from services.value_agent.rules.valuation import (
+                calculate_intrinsic_value,
+            )
+            from services.value_agent.schema import ValuationInput
+            payload = {
+                "ticker": "BENCH", "roe": 0.18, "fcf": 4e9, "debt": 1e9, "ebitda": 5e8,
+                "current_price": 150.0, "shares_outstanding": 1e8,
+            }
+            cases.append(scalar_case("value", ValuationInput, calculate_intrinsic_value,
+                                     payload))
+        elif rule == "macro":
+            from services.macro_agent.rules.macro_analysis import analyze_macro_regime
+            from services.macro_agent.schema import MacroInput
+            cases.append(scalar_case("macro", MacroInput, analyze_macro_regime, {
+                "inflation_rate": 0.035, "interest_rate": 0.0525, "gdp_growth": 0.021,
+                "unemployment_rate": 0.039, "liquidity_index": 0.1,
+            }))
+        elif rule == "consensus":
+            cases += consensus_cases(signal_counts)
+    return cases
+
+def time_call(fn: Callable[[], object], repeat: int,
+              min_time: float) -> dict[str, float]:
+    """
+    Per-call median/min in microseconds over `repeat` runs of at least
+    `min_time` seconds each.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2
+    runs = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - started) / number)
+    runs_us = np.array(runs) * 1e6
+    return {
+        "median_us": round(float(np.median(runs_us)), 3),
+        "min_us": round(float(runs_us.min()), 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Times each agent rule function by stage (validation, panel, "
+                    "computation).")
+    parser.add_argument("--rules", nargs="+", choices=RULES, default=RULES)
+    parser.add_argument("--sizes", type=int, nargs="+", default=PRICE_SIZES,
+                        help="Price points for quant/risk")
+    parser.add_argument("--signals", type=int, nargs="+", default=SIGNAL_COUNTS,
+                        help="Signal counts for consensus")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timed runs per stage (the median is reported)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds per run (calls are batched up to it)")
+    parser.add_argument("--out", default="rules_bench.json", help="Results file")
+    parser.add_argument("--compare",
+                        help="Baseline results file; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.compare) if args.compare else None
+    results = {}
+    for name, stages in build_cases(args.rules, args.sizes, args.signals):
+        results[name] = {}
+        for stage, fn in stages.items():
+            for key, value in time_call(fn, args.repeat, args.min_time).items():
+                results[name][f"{stage}.{key}"] = value
+        line = "  ".join(f"{stage} {results[name][stage + '.median_us']:>10.1f}"
+                         for stage in stages)
+        print(f"{name:<24} {line}  (median us/call)")
+
+    write_results(args.out, results, args=vars(args))
+    print(f"Results written to {args.out}")
+
+    if baseline is not None:
+        rows, regressed = compare(results, baseline, tolerance=args.tolerance)
+        print(f"\n--- Comparison with {args.compare} "
+              f"(tolerance {args.tolerance:.0%}) ---")
+        print_comparison(rows)
+        return 1 if regressed else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
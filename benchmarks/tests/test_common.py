@@ -0,0 +1,31 @@
+from benchmarks.common import StageTimer, compare, latency_stats
+
+
+def test_latency_stats_in_milliseconds():
+    stats = latency_stats([0.001 * i for i in range(1, 101)])
+
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == 50.5
+    assert stats["max_ms"] == 100.0
+    assert latency_stats([]) == {"count": 0}
+
+def test_stage_timer_wraps_functions():
+    timer = StageTimer()
+    double = timer.wrap("double", lambda x: 2 * x)
+
+    assert [double(i) for i in range(3)] == [0, 2, 4]
+    assert timer.summary()["double"]["count"] == 3
+
+def test_compare_flags_regressions_by_direction():
+    baseline = {"s": {"assets_per_sec": 100.0, "wall_seconds": 10.0,
+                      "peak_rss_mb": 200.0, "assets": 50}}
+    current = {"s": {"assets_per_sec": 80.0, "wall_seconds": 8.0,
+                     "peak_rss_mb": 205.0, "assets": 60}}
+
+    rows, regressed = compare(current, baseline, higher_is_better={"assets_per_sec"},
+                              tolerance=0.10, ignore={"assets"})
+    status = {row["metric"]: row["status"] for row in rows}
+
+    assert regressed
+    assert status == {"assets_per_sec": "REGRESSION", "wall_seconds": "improved",
+                      "peak_rss_mb": "ok"}
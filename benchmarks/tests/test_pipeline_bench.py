@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from benchmarks import pipeline_bench
+
+
+def test_small_universe_end_to_end(tmp_path):
+    out = tmp_path / "bench.json"
+    args = ["--tickers", "12", "--days", "60", "--workdir", str(tmp_path),
+            "--out", str(out), "--concurrency", "2"]
+
+    assert pipeline_bench.main(args) == 0
+    metrics = json.loads(out.read_text())["results"]["tickers=12,days=60,batch=1"]
+    assert metrics["assets"] == 12
+    assert metrics["assets_per_sec"] > 0
+    assert metrics["agent.quant.analyze.p50_ms"] > 0
+    assert metrics["db_write_seconds"] > 0
+
+    # Same run against itself as the baseline: comparison only
+    compare = ["--keep", "--compare", str(out), "--tolerance", "100"]
+    assert pipeline_bench.main(args + compare) == 0
+
+def test_price_cache_scenario(tmp_path):
+    pytest.importorskip("pyarrow")
+    out = tmp_path / "bench.json"
+    args = ["--tickers", "12", "--days", "60", "--workdir", str(tmp_path),
+            "--out", str(out), "--concurrency", "2", "--price-cache"]
+
+    assert pipeline_bench.main(args) == 0
+    metrics = json.loads(out.read_text())["results"]["tickers=12,days=60,batch=1,cache"]
+    assert metrics["assets"] == 12
+    assert metrics["db.load_prices.p50_ms"] > 0
+    assert (tmp_path / "price_cache_12x60").is_dir()
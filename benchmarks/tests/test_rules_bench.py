@@ -0,0 +1,21 @@
+import json
+
+from benchmarks import rules_bench
+
+
+def test_every_rule_and_stage_is_timed(tmp_path):
+    out = tmp_path / "rules.json"
+    args = ["--sizes", "30", "--signals", "1", "3", "--repeat", "1",
+            "--min-time", "0.001", "--out", str(out)]
+
+    assert rules_bench.main(args) == 0
+    results = json.loads(out.read_text())["results"]
+    assert sorted(results) == ["consensus/signals=1", "consensus/signals=3", "macro",
+                               "quant/prices=30", "risk/prices=30", "value"]
+    assert {key.split(".")[0] for key in results["risk/prices=30"]} == {
+        "validate_json", "validate_columns", "panel", "compute", "rule", "end_to_end",
+    }
+    assert all(value > 0 for value in results["quant/prices=30"].values())
+
+    compare = ["--rules", "value", "--compare", str(out), "--tolerance", "1000"]
+    assert rules_bench.main(args + compare) == 0
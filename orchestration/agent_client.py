@@ -0,0 +1,158 @@
+"""
+Keep-alive HTTP clients for the agent services.
+
+One client per agent base URL, shared by all pipeline threads, so calls reuse
+pooled TCP (and TLS) connections instead of opening one per request. The pool
+is sized to the pipeline concurrency: at most one call per in-flight asset
+targets a given agent. HTTP/2 is optional (httpx with the `h2` package).
+"""
+import sys
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.shared.logger import setup_logger
+
+logger = setup_logger("agent_client")
+
+def is_transient_error(exc):
+    """Errors worth retrying, for either transport."""
+    if isinstance(exc, requests.exceptions.RequestException):
+        return True
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(exc, httpx.HTTPError)
+
+class AgentClient:
+    """HTTP/1.1 keep-alive client for one base URL (requests.Session + sized pool)."""
+
+    def __init__(self, base_url, pool_size, timeout=10):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+    def post(self, url, payload, headers):
+        with self._lock:
+            self.requests += 1
+        # bytes: pre-encoded body (binary wire format), anything else is sent as JSON
+        body = {"data": payload} if isinstance(payload, bytes) else {"json": payload}
+        resp = self.session.post(url, headers=headers, timeout=self.timeout, **body)
+        resp.raise_for_status()
+        return resp.json()
+
+    def connections(self):
+        """New connections opened so far (the rest of the requests reused one)."""
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def close(self):
+        self.session.close()
+
+class Http2AgentClient:
+    """HTTP/2 client for one base URL: calls are multiplexed over few connections."""
+
+    def __init__(self, base_url, pool_size, timeout=10):
+        import httpx  # Optional dependency, only needed with HTTP/2 enabled
+
+        self.base_url = base_url
+        self.requests = 0
+        self._connections = 0
+        self._lock = threading.Lock()
+        self.client = httpx.Client(
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    def _trace(self, event, info):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self._connections += 1
+
+    def post(self, url, payload, headers):
+        with self._lock:
+            self.requests += 1
+        body = {"content": payload} if isinstance(payload, bytes) else {"json": payload}
+        resp = self.client.post(url, headers=headers,
+                                extensions={"trace": self._trace}, **body)
+        resp.raise_for_status()
+        return resp.json()
+
+    def connections(self):
+        return self._connections
+
+    def close(self):
+        self.client.close()
+
+class AgentClients:
+    """Registry of clients keyed by agent base URL."""
+
+    def __init__(self, base_urls, pool_size, timeout=10, http2=False):
+        self.base_urls = list(base_urls)
+        self.timeout = timeout
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._clients = {}
+        self.configure(pool_size)
+
+    def configure(self, pool_size):
+        """(Re)creates the clients with `pool_size` connections per agent."""
+        with self._lock:
+            if self._clients and pool_size == self.pool_size:
+                return
+            for client in self._clients.values():
+                client.close()
+            self.pool_size = max(1, pool_size)
+            self._clients = {}
+
+    def for_url(self, url):
+        # Longest base URL first, so agents sharing a host keep separate clients
+        longest_first = sorted(self.base_urls, key=len, reverse=True)
+        base_url = next((b for b in longest_first if url.startswith(b)), None)
+        if base_url is None:
+            base_url = "/".join(url.split("/", 3)[:3])
+        client = self._clients.get(base_url)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(base_url)
+                if client is None:
+                    client = self._clients[base_url] = self._create(base_url)
+        return client
+
+    def _create(self, base_url):
+        if self.http2:
+            try:
+                return Http2AgentClient(base_url, self.pool_size, self.timeout)
+            except ImportError as e:
+                logger.warning("HTTP/2 unavailable (%s); install httpx[http2]. "
+                               "Falling back to HTTP/1.1", e)
+                self.http2 = False
+        return AgentClient(base_url, self.pool_size, self.timeout)
+
+    def post(self, url, payload, headers):
+        return self.for_url(url).post(url, payload, headers)
+
+    def stats(self):
+        """{base_url: {"requests", "connections", "reused"}} since creation."""
+        stats = {}
+        for base_url, client in list(self._clients.items()):
+            connections = client.connections()
+            stats[base_url] = {
+                "requests": client.requests,
+                "connections": connections,
+                "reused": max(0, client.requests - connections),
+            }
+        return stats
+
+    def log_stats(self):
+        for base_url, s in self.stats().items():
+            ratio = s["reused"] / s["requests"] if s["requests"] else 0.0
+            logger.info("HTTP %s: %d requests over %d connections (reuse %.0f%%)",
+                        base_url, s["requests"], s["connections"], ratio * 100)
@@ -0,0 +1,67 @@
+"""
+Bulk data loading for the pipeline.
+
+Loads the context data for the whole universe up front with a fixed number of
+queries (instead of two per asset), selecting only the columns the agents use
+and grouping rows in memory by asset.
+"""
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import func, or_, select
+
+from services.shared.models.domain import Asset, Fundamental, Price, RollingStateRecord
+
+# Rows fetched per round-trip while streaming the prices table
+PRICE_FETCH_SIZE = 50_000
+
+def load_assets(db):
+    """Returns (id, ticker) rows for the universe, in a stable order."""
+    return db.execute(select(Asset.id, Asset.ticker).order_by(Asset.id)).all()
+
+def load_prices(db, new_only=False):
+    """
+    Fetches (asset_id, date, close) for the whole universe in one query.
+    With `new_only`, only bars after each asset's rolling state (all bars for
+    assets without one).
+    Returns {asset_id: (dates, closes)} with both lists in date order.
+    """
+    stmt = select(Price.asset_id, Price.date, Price.close)
+    if new_only:
+        state = RollingStateRecord
+        stmt = stmt.outerjoin(state, state.asset_id == Price.asset_id).where(
+            or_(state.last_date.is_(None), Price.date > state.last_date)
+        )
+    stmt = stmt.order_by(Price.asset_id, Price.date)
+    stmt = stmt.execution_options(yield_per=PRICE_FETCH_SIZE)
+    prices = {}
+    for asset_id, rows in groupby(db.execute(stmt), key=itemgetter(0)):
+        rows = list(rows)
+        prices[asset_id] = ([r[1] for r in rows], [r[2] for r in rows])
+    return prices
+
+def load_latest_fundamentals(db):
+    """
+    Fetches the latest Fundamental of every asset in one query (ROW_NUMBER
+    window, portable across Postgres and SQLite). Returns {asset_id: row}.
+    """
+    latest_first = func.row_number().over(
+        partition_by=Fundamental.asset_id,
+        order_by=(Fundamental.reporting_date.desc(), Fundamental.id.desc())
+    ).label("rn")
+    ranked = select(
+        Fundamental.asset_id,
+        Fundamental.roe,
+        Fundamental.fcf,
+        Fundamental.debt_to_ebitda,
+        latest_first
+    ).subquery()
+    rows = db.execute(select(ranked).where(ranked.c.rn == 1)).all()
+    return {row.asset_id: row for row in rows}
+
+def load_rolling_states(db):
+    """Returns {asset_id: rolling state dict} persisted by the last incremental run."""
+    stmt = select(RollingStateRecord.asset_id, RollingStateRecord.state)
+    rows = db.execute(stmt).all()
+    return {asset_id: json.loads(state) for asset_id, state in rows}
@@ -1,19 +1,70 @@
 import sys
 sys.path.insert(0, __import__('os').path.abspath(__import__('os').path.join(__import__('os').path.dirname(__file__), "..")))
 
-import requests
 import json
 import os
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from urllib.parse import urlsplit
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 from services.shared.database import SessionLocal
-from services.shared.models.domain import Asset, Price, Fundamental, MacroData, AgentOutput, FinalDecision
-from services.shared.logger import setup_logger
+from services.shared.models.domain import MacroData, RollingStateRecord
+from services.shared.logger import bind_log_fields, setup_logger
+from services.shared.metrics import (
+    PIPELINE_CALL_SECONDS,
+    PIPELINE_STAGE_SECONDS,
+    export_pipeline_metrics,
+    pipeline_stage,
+)
+from services.shared.tracing import (
+    CLIENT,
+    flush_traces,
+    in_trace_context,
+    inject,
+    start_span,
+)
 from services.shared.models.enums import SignalType
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-import hashlib
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 from services.shared.config import settings
 from services.shared.mode_engine import ModeMachine
+from services.shared.batch import MAX_BATCH_SIZE
+from services.shared.wire import (
+    PRICE_COLUMNS_CONTENT_TYPE,
+    EncodedPayload,
+    encode_price_columns,
+    price_ref_payload,
+)
+from services.shared.price_store import (
+    PRICE_STORE_DIR,
+    remove_price_store,
+    write_price_store,
+)
+from services.shared.price_cache import (
+    PRICE_CACHE_DIR,
+    load_cached_prices,
+    refresh_price_cache,
+)
+from services.shared.ledger import (
+    FINAL_DECISION_CHAIN,
+    ChainHeads,
+    LedgerWriter,
+    agent_chain,
+)
+from orchestration.loader import (
+    load_assets,
+    load_latest_fundamentals,
+    load_prices,
+    load_rolling_states,
+)
+from orchestration.agent_client import AgentClients, is_transient_error
+from orchestration.profiling import RunProfile
+from orchestration.results_store import open_result_stream, put_object
 
 logger = setup_logger("pipeline")
 
@@ -26,13 +77,80 @@ AGENTS = {
     "consensus": os.getenv("Consensus_URL", "http://localhost:8005/api/v1/consensus")
 }
 
+# Concurrency: number of assets analysed in parallel. Each in-flight asset
+# fans out to up to 3 agent calls (value, quant, risk) before consensus.
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "8"))
+
+# Batching: assets per /analyze/batch and /decide/batch request.
+# 1 keeps the single-ticker endpoints (one request per asset per agent).
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "1"))
+
+# Incremental mode: quant and risk update a persisted per-asset rolling
+# state with the bars added since the last run instead of the full history.
+PIPELINE_INCREMENTAL = os.getenv("PIPELINE_INCREMENTAL", "false").lower() == "true"
+INCREMENTAL_AGENTS = ("quant", "risk")
+
+# Wire format of the price histories sent to quant and risk: "json" or
+# "columns" (binary columnar, see services/shared/wire.py). Columns apply to
+# the single-ticker /analyze calls (batch_size 1, full mode).
+PIPELINE_WIRE_FORMAT = os.getenv("PIPELINE_WIRE_FORMAT", "json").lower()
+
+# Shared price store (PRICE_STORE_DIR, on a volume shared with quant and
+# risk): the run's histories are written once and requests carry only a
+# run_id + ticker reference. Same scope as the columns format; takes precedence.
+
+# Columnar price cache (PRICE_CACHE_DIR, see services/shared/price_cache.py):
+# refreshed with the new rows at the start of a full run and read instead of
+# the prices table. Incremental runs already read only the new bars.
+
+# Agents writing to their own hash chain over agent_outputs
+CHAIN_AGENTS = ["value_agent", "quant_agent", "risk_agent", "consensus_agent"]
+
+# Attempts to persist a batch when another writer moves a chain head
+CHAIN_CONFLICT_RETRIES = 3
+
+# Write-behind: ledger rows (agent outputs + final decisions) buffered
+# before a bulk insert. Roughly 5 rows per asset.
+PIPELINE_WRITE_BATCH_SIZE = int(os.getenv("PIPELINE_WRITE_BATCH_SIZE", "500"))
+
+# Connection pooling: keep-alive connections per agent (defaults to the
+# concurrency, one per in-flight asset). HTTP/2 requires httpx[http2].
+PIPELINE_HTTP_POOL_SIZE = int(os.getenv("PIPELINE_HTTP_POOL_SIZE", "0"))
+PIPELINE_HTTP2 = os.getenv("PIPELINE_HTTP2", "false").lower() == "true"
+
+# Shared by all pipeline threads; see orchestration/agent_client.py
+http_clients = AgentClients(
+    AGENTS.values(),
+    pool_size=PIPELINE_HTTP_POOL_SIZE or PIPELINE_CONCURRENCY,
+    http2=PIPELINE_HTTP2
+)
+
+# Per-run profile (stages, agent calls, SQL, slowest assets), uploaded next
+# to the results as run_<run_id>_profile.json; reset at the start of each run
+profile = RunProfile()
+
+def agent_endpoint(url):
+    """("quant", "analyze/batch") for .../api/v1/quant/analyze/batch."""
+    agent, _, endpoint = urlsplit(url).path.partition("/api/v1/")[2].partition("/")
+    return agent, endpoint
+
+@contextmanager
+def run_stage(stage, span_name):
+    """
+    Times a stage in the metrics, the run's trace and the run profile (also a
+    decorator).
+    """
+    with pipeline_stage(stage), start_span(span_name), profile.stage(stage):
+        yield
+
 # Resilience: Retry configuration
 # Stop after 3 attempts
 # Wait 1s, then 2s, etc.
 RETRY_CONFIG = {
     "stop": stop_after_attempt(3),
     "wait": wait_exponential(multiplier=1, min=1, max=10),
-    "retry": retry_if_exception_type(requests.exceptions.RequestException)
+    "retry": retry_if_exception(is_transient_error),
+    "before_sleep": lambda state: profile.record_retry(agent_endpoint(state.args[0])[0])
 }
 
 @retry(**RETRY_CONFIG)
@@ -41,26 +159,562 @@ def call_agent(url, payload):
         "Content-Type": "application/json",
         "X-API-KEY": settings.API_KEY_SECRET
     }
-    resp = requests.post(url, json=payload, headers=headers, timeout=10)
-    resp.raise_for_status()
-    return resp.json()
+    if isinstance(payload, EncodedPayload):
+        headers["Content-Type"] = payload.content_type
+        payload = payload.body
+    # The agent continues the current span's trace
+    inject(headers)
+    # Pooled keep-alive connection to the agent (no handshake per call)
+    return http_clients.post(url, payload, headers)
+
+def timed_call(url, payload):
+    """
+    Calls an agent and returns (response, latency_seconds); the latency is also
+    observed per agent/endpoint.
+    """
+    agent, endpoint = agent_endpoint(url)
+    start_time = time.perf_counter()
+    outcome = "error"
+    try:
+        with start_span(f"call {agent}/{endpoint}", kind=CLIENT, **{"http.url": url}):
+            res = call_agent(url, payload)
+        outcome = "ok"
+    finally:
+        latency = time.perf_counter() - start_time
+        PIPELINE_CALL_SECONDS.labels(agent, endpoint, outcome).observe(latency)
+        profile.record_call(agent, latency, outcome == "ok")
+    return res, latency
+
+def prepare_asset(asset_id, ticker, prices, fundamental, incremental=False, state=None,
+                  columns=False, price_store_run=None):
+    """
+    Builds the agent payloads for one asset from its bulk-loaded data:
+    `prices` is a (dates, closes) pair in date order, `fundamental` the
+    latest fundamental row or None.
+    In incremental mode `prices` holds only the bars after `state` (the
+    asset's persisted rolling state, None on its first incremental run).
+    With `columns`, quant and risk get the binary columnar encoding; with
+    `price_store_run`, a reference into that run's shared price store.
+    Returns None when the asset must be skipped (insufficient data).
+    """
+    dates, closes = prices
+
+    # Log Data Availability
+    price_count = len(closes) + (state["count"] if state else 0)
+    has_fundamental = bool(fundamental)
+    logger.info("Data Check for %s: Prices=%d | Fundamentals=%s", ticker, price_count,
+                has_fundamental, extra={"ticker": ticker})
+
+    if price_count < 30:
+        logger.warning("Skipping %s: Insufficient price data (%d rows)", ticker,
+                       price_count, extra={"ticker": ticker})
+        return None
+
+    # Prepare Payloads
+    payloads = {}
+
+    if fundamental:
+        mock_debt = 1_000_000_000.0
+        mock_ebitda = 1.0
+        if fundamental.debt_to_ebitda:
+            mock_ebitda = mock_debt / fundamental.debt_to_ebitda
+
+        payloads["value"] = {
+            "ticker": ticker,
+            "roe": fundamental.roe,
+            "fcf": fundamental.fcf,
+            "debt": mock_debt,
+            "ebitda": mock_ebitda,
+            "current_price": float(closes[-1]) if len(closes) else state["closes"][-1],
+            "shares_outstanding": 100_000_000
+        }
+
+    if price_store_run:
+        payloads["quant"] = price_ref_payload(price_store_run, ticker, {})
+        payloads["risk"] = price_ref_payload(price_store_run, ticker,
+                                             {"target_volatility": 0.15})
+        return {"asset_id": asset_id, "ticker": ticker, "payloads": payloads,
+                "incremental": incremental}
+
+    if columns:
+        # Dates converted once for both agents
+        epoch_seconds = np.array(dates, dtype="datetime64[s]").astype(np.int64)
+        payloads["quant"] = EncodedPayload(
+            PRICE_COLUMNS_CONTENT_TYPE,
+            encode_price_columns({"ticker": ticker}, epoch_seconds, closes))
+        payloads["risk"] = EncodedPayload(
+            PRICE_COLUMNS_CONTENT_TYPE,
+            encode_price_columns({"target_volatility": 0.15}, epoch_seconds, closes))
+        return {"asset_id": asset_id, "ticker": ticker, "payloads": payloads,
+                "incremental": incremental}
+
+    if isinstance(closes, np.ndarray):
+        # Columns from the price cache: Python objects only for the asset being sent
+        dates, closes = dates.astype("datetime64[us]").tolist(), closes.tolist()
+    price_list = [{"date": d.isoformat(), "price": c} for d, c in zip(dates, closes)]
+    if incremental:
+        payloads["quant"] = {"ticker": ticker, "state": state, "prices": price_list}
+        payloads["risk"] = {
+            "ticker": ticker, "state": state, "prices": price_list,
+            "target_volatility": 0.15
+        }
+    else:
+        payloads["quant"] = {"ticker": ticker, "prices": price_list}
+        payloads["risk"] = {"prices": price_list, "target_volatility": 0.15}
+
+    return {
+        "asset_id": asset_id, "ticker": ticker, "payloads": payloads,
+        "incremental": incremental
+    }
+
+def collect_signals(work, responses, macro_signal):
+    """
+    Turns the value/quant/risk responses of one asset into consensus inputs.
+    `responses` maps agent -> (response, latency) or the Exception raised.
+    Returns the outputs to persist, in hash chain order.
+    """
+    ticker = work["ticker"]
+    outputs = []  # (agent_name, signal, score, response)
+    agent_signals = []
+
+    # --- Value Agent ---
+    if "value" in responses:
+        try:
+            res, latency = unwrap(responses["value"])
+            sig = res.get('signal', 'HOLD')
+            logger.info("Value Agent [%s]: Signal=%s | Latency=%.3fs", ticker, sig,
+                        latency, extra={"ticker": ticker})
+
+            agent_signals.append({
+                "agent_name": "Value",
+                "signal": sig,
+                "weight": 1.0,
+                "score": 0.0
+            })
+            outputs.append(("value_agent", sig, 0.0, res))
+        except Exception as e:
+            logger.error("Value Agent failed for %s: %s", ticker, e,
+                         extra={"ticker": ticker})
+    else:
+        logger.warning("Value Agent skipped for %s: No fundamental data", ticker,
+                       extra={"ticker": ticker})
+
+    # --- Quant Agent ---
+    try:
+        res, latency = unwrap(responses["quant"])
+        sig = res.get('signal', 'HOLD')
+        score = res.get('momentum_score', 0.0)
+        logger.info("Quant Agent [%s]: Signal=%s | Score=%.2f | Latency=%.3fs", ticker,
+                    sig, score, latency, extra={"ticker": ticker})
+
+        agent_signals.append({
+            "agent_name": "Quant",
+            "signal": sig,
+            "weight": 1.0,
+            "score": score
+        })
+        outputs.append(("quant_agent", sig, score, res))
+    except Exception as e:
+        logger.error("Quant Agent failed for %s: %s", ticker, e,
+                     extra={"ticker": ticker})
+
+    # --- Risk Agent ---
+    try:
+        res, latency = unwrap(responses["risk"])
+        exposure = res.get('risk_adjusted_exposure', 0.5)
+        risk_sig = SignalType.HOLD
+        if exposure < 0.5:
+            risk_sig = SignalType.SELL
+        elif exposure >= 0.9:
+            risk_sig = SignalType.BUY
+
+        logger.info("Risk Agent [%s]: Exposure=%.2f | Signal=%s | Latency=%.3fs",
+                    ticker, exposure, risk_sig, latency, extra={"ticker": ticker})
+
+        agent_signals.append({
+            "agent_name": "Risk",
+            "signal": risk_sig,
+            "weight": 1.5,
+            "score": exposure
+        })
+        outputs.append(("risk_agent", str(risk_sig), exposure, res))
+    except Exception as e:
+        logger.error("Risk Agent failed for %s: %s", ticker, e,
+                     extra={"ticker": ticker})
+
+    # --- Include Macro Signal ---
+    # Always include Macro if available
+    agent_signals.append({
+        "agent_name": "Macro",
+        "signal": macro_signal,
+        "weight": 0.5,
+        "score": 0.0
+    })
+
+    return {
+        "asset_id": work["asset_id"],
+        "ticker": ticker,
+        "outputs": outputs,
+        "agent_signals": agent_signals,
+        "consensus": None
+    }
 
-def calculate_hash(prev_hash: str, data: str) -> str:
-    """Creates a SHA-256 hash chain."""
-    return hashlib.sha256(f"{prev_hash}{data}".encode()).hexdigest()
+def prepare_chunks(assets, batch_size, universe_prices, fundamentals, rolling_states,
+                   **options):
+    """Yields the universe's prepared work in chunks of `batch_size`, in order."""
+    chunk = []
+    for asset_id, ticker in assets:
+        logger.info("Processing Asset: %s", ticker, extra={"ticker": ticker})
+        work = prepare_asset(
+            asset_id, ticker, universe_prices.get(asset_id, ([], [])),
+            fundamentals.get(asset_id), state=rolling_states.get(asset_id), **options
+        )
+        if work is None:
+            continue
+        chunk.append(work)
+        if len(chunk) >= batch_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def analyze_path(work, agent):
+    """Endpoint (relative to the agent URL) for `agent` in the work's mode."""
+    if work.get("incremental") and agent in INCREMENTAL_AGENTS:
+        return "/analyze/incremental"
+    return "/analyze"
+
+def take_state(work, responses):
+    """
+    Incremental mode: quant and risk answer {"result", "state"}. Replaces
+    those responses with the bare result and returns the updated rolling
+    state (the same from both agents; None if neither answered). A
+    response without a result counts as a failed call for that asset.
+    """
+    state = None
+    if not work.get("incremental"):
+        return state
+    for agent in INCREMENTAL_AGENTS:
+        response = responses.get(agent)
+        if isinstance(response, tuple):
+            res, latency = response
+            if not isinstance(res, dict) or "result" not in res:
+                error = f"incremental response without a result: {res!r:.200}"
+                responses[agent] = ValueError(error)
+                continue
+            state = state or res.get("state")
+            responses[agent] = (res["result"], latency)
+    return state
+
+def unwrap(response):
+    if isinstance(response, Exception):
+        raise response
+    return response
+
+def record_consensus(outcome, response):
+    """Stores the consensus response (or logs the failure) on the outcome."""
+    ticker = outcome["ticker"]
+    try:
+        res, latency = unwrap(response)
+        final_sig = res.get('final_signal', 'HOLD')
+        conf_score = res.get('confidence_score', 0.0)
+        logger.info(">>> CONSENSUS for %s: %s (Conf: %.2f) | Signals=%d | "
+                    "Latency=%.3fs", ticker, final_sig, conf_score,
+                    len(outcome['agent_signals']), latency, extra={"ticker": ticker})
+        outcome["consensus"] = res
+    except Exception as e:
+        logger.error("Consensus Agent failed for %s: %s", ticker, e,
+                     extra={"ticker": ticker})
+
+def analyze_asset(work, macro_signal, call_pool):
+    """
+    Runs the agent fan-out for one asset: value, quant and risk are called in
+    parallel on `call_pool`, consensus waits for all three.
+    Performs HTTP only (no DB access), so it is safe to run on worker threads.
+    """
+    futures = {
+        agent: call_pool.submit(in_trace_context(timed_call),
+                                f"{AGENTS[agent]}{analyze_path(work, agent)}", payload)
+        for agent, payload in work["payloads"].items()
+    }
+    responses = {}
+    for agent, future in futures.items():
+        try:
+            responses[agent] = future.result()
+        except Exception as e:
+            responses[agent] = e
+
+    state = take_state(work, responses)
+    outcome = collect_signals(work, responses, macro_signal)
+    outcome["state"] = state
+
+    # --- Consensus Decision ---
+    if outcome["agent_signals"]:
+        consensus_payload = {
+            "ticker": work["ticker"],
+            "signals": outcome["agent_signals"]
+        }
+        try:
+            response = timed_call(f"{AGENTS['consensus']}/decide", consensus_payload)
+        except Exception as e:
+            response = e
+        record_consensus(outcome, response)
 
-def run_pipeline():
-    logger.info("Starting Pipeline Execution...")
+    return outcome
+
+def split_batch_response(future, tickers):
+    """
+    Maps a batch call back to per-ticker responses: (item, latency) for
+    successes, an Exception for per-item errors or a failed call.
+    """
+    try:
+        res, latency = future.result()
+    except Exception as e:
+        return {ticker: e for ticker in tickers}
+
+    responses = {}
+    for ticker in tickers:
+        if ticker in res.get("results", {}):
+            responses[ticker] = (res["results"][ticker], latency)
+        else:
+            error = res.get("errors", {}).get(ticker, "missing from batch response")
+            responses[ticker] = ValueError(error)
+    return responses
+
+def analyze_batch(works, macro_signal, call_pool):
+    """
+    Batch variant of analyze_asset: one /analyze/batch call per agent for the
+    whole chunk (in parallel), then a single /decide/batch call.
+    """
+    # Batch results are keyed by ticker, so every item must carry one
+    per_agent = {}
+    for work in works:
+        for agent, payload in work["payloads"].items():
+            item = dict(payload, ticker=work["ticker"])
+            per_agent.setdefault(agent, {})[work["ticker"]] = item
+
+    futures = {
+        agent: call_pool.submit(in_trace_context(timed_call),
+                                f"{AGENTS[agent]}{analyze_path(works[0], agent)}/batch",
+                                {"items": list(items.values())})
+        for agent, items in per_agent.items()
+    }
+    responses = {
+        agent: split_batch_response(future, list(per_agent[agent]))
+        for agent, future in futures.items()
+    }
+
+    outcomes = []
+    for work in works:
+        agent_responses = {
+            agent: by_ticker[work["ticker"]]
+            for agent, by_ticker in responses.items()
+            if work["ticker"] in by_ticker
+        }
+        state = take_state(work, agent_responses)
+        outcome = collect_signals(work, agent_responses, macro_signal)
+        outcome["state"] = state
+        outcomes.append(outcome)
+
+    # --- Consensus Decision ---
+    decidable = [o for o in outcomes if o["agent_signals"]]
+    if decidable:
+        consensus_payload = {
+            "items": [
+                {"ticker": o["ticker"], "signals": o["agent_signals"]}
+                for o in decidable
+            ]
+        }
+        future = call_pool.submit(in_trace_context(timed_call),
+                                  f"{AGENTS['consensus']}/decide/batch",
+                                  consensus_payload)
+        consensus = split_batch_response(future, [o["ticker"] for o in decidable])
+        for outcome in decidable:
+            record_consensus(outcome, consensus[outcome["ticker"]])
+
+    return outcomes
+
+@pipeline_stage("analyze_chunk")
+def analyze_chunk(works, macro_signal, call_pool, batch_size):
+    """Analyzes a chunk of assets, through the batch endpoints when enabled."""
+    if batch_size > 1:
+        started = time.perf_counter()
+        with start_span("pipeline.batch", tickers=len(works)):
+            outcomes = analyze_batch(works, macro_signal, call_pool)
+        # Batch members share one timing: the chunk is reported as a unit
+        profile.record_asset(f"{works[0]['ticker']} (+{len(works) - 1})",
+                             time.perf_counter() - started)
+        return outcomes
+    outcomes = []
+    for work in works:
+        started = time.perf_counter()
+        with start_span("pipeline.asset", ticker=work["ticker"]):
+            outcomes.append(analyze_asset(work, macro_signal, call_pool))
+        profile.record_asset(work["ticker"], time.perf_counter() - started)
+    return outcomes
+
+def buffer_outcome(writer, outcome, run_id):
+    """
+    Queues the agent outputs and the final decision of one asset on the
+    ledger writer. Runs on the main thread only, so hash chains advance in
+    universe order.
+    Returns the flat result for the MinIO report (None if nothing to report).
+    """
+    ticker = outcome["ticker"]
+    agent_signals = outcome["agent_signals"]
+
+    if not agent_signals:
+        logger.warning("NO SIGNALS collected for %s. Marking as NO_SIGNAL.", ticker,
+                       extra={"ticker": ticker})
+        # Handle NO_SIGNAL case
+        return {
+            "ticker": ticker,
+            "decision": "NO_SIGNAL",
+            "confidence": 0.0,
+            "raw_score": 0.0,
+            "agents_count": 0
+        }
+
+    for agent, sig, score, res in outcome["outputs"]:
+        save_output(writer, outcome["asset_id"], agent, sig, score, res, run_id)
+
+    res = outcome["consensus"]
+    if res is None:
+        return None
+
+    final_sig = res.get('final_signal', 'HOLD')
+    conf_score = res.get('confidence_score', 0.0)
+    save_output(
+        writer, outcome["asset_id"], "consensus_agent", final_sig, conf_score, res,
+        run_id
+    )
+
+    # Store Final Decision with Hash Chain
+    writer.add_final_decision(ticker, final_sig, conf_score, res, run_id)
+
+    return {
+        "ticker": ticker,
+        "decision": final_sig,
+        "confidence": float(conf_score),
+        "raw_score": float(res.get('details', {}).get('raw_score', 0.0)),
+        "agents_count": len(agent_signals),
+    }
+
+@run_stage("write", "db.flush_ledger")
+def flush_ledger(writer, pending_results, persisted, pending_states):
+    """
+    Writes the buffered rows; results are only reported once persisted, to
+    `persisted` (the run's results list, or its ResultStream). Returns how
+    many were. On failure the buffered rows (and their results) are dropped.
+    Rolling states are saved after their ledger rows.
+    """
+    count = 0
+    try:
+        written = writer.flush()
+        persisted.extend(pending_results)
+        count = len(pending_results)
+        if written:
+            logger.info("Persisted %d ledger rows (%d results)", written, count)
+        if pending_states:
+            save_rolling_states(writer.db, pending_states)
+    except Exception as e:
+        logger.error("Persistence failed for %d results (%d rows): %s",
+                     len(pending_results), writer.pending, e)
+        writer.discard()
+    pending_results.clear()
+    return count
+    pending_states.clear()
+
+def save_rolling_states(db, states):
+    """
+    Replaces the rolling state of every asset in `states` ({asset_id: state}).
+    A failed save is not fatal: the next run resumes from the previous
+    state, and bars it already covers are ignored by the update.
+    """
+    now = datetime.utcnow()
+    try:
+        db.execute(delete(RollingStateRecord).where(RollingStateRecord.asset_id.in_(list(states))))
+        db.execute(insert(RollingStateRecord), [
+            {
+                "asset_id": asset_id,
+                "last_date": datetime.fromisoformat(state["last_date"]),
+                "state": json.dumps(state),
+                "updated_at": now
+            }
+            for asset_id, state in states.items()
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Could not save rolling state for %d assets: %s", len(states), e)
+
+def load_universe_prices(db, incremental):
+    """Prices for the run: from the columnar cache when configured, else the DB."""
+    if PRICE_CACHE_DIR and not incremental:
+        try:
+            refreshed = refresh_price_cache(db, PRICE_CACHE_DIR)
+            logger.info("Price cache refreshed: %d new rows in %d months",
+                        refreshed["rows"], refreshed["months"])
+            return load_cached_prices(PRICE_CACHE_DIR)
+        except Exception as e:
+            logger.warning("Price cache unavailable (%s); reading prices from the "
+                           "database", e)
+    return load_prices(db, new_only=incremental)
+
+def run_pipeline(concurrency=None, batch_size=None, incremental=None):
+    """
+    Runs the full analysis. `concurrency` bounds the number of work units in
+    flight (defaults to PIPELINE_CONCURRENCY); 1 processes them one by one.
+    `batch_size` > 1 sends chunks of that many assets to the batch endpoints
+    (defaults to PIPELINE_BATCH_SIZE). `incremental` sends quant and risk only
+    the bars since the last run (defaults to PIPELINE_INCREMENTAL).
+    """
+    concurrency = max(1, concurrency or PIPELINE_CONCURRENCY)
+    batch_size = max(1, min(batch_size or PIPELINE_BATCH_SIZE, MAX_BATCH_SIZE))
+    incremental = PIPELINE_INCREMENTAL if incremental is None else incremental
+    columns = PIPELINE_WIRE_FORMAT == "columns"
+    if columns and (batch_size > 1 or incremental):
+        logger.warning("PIPELINE_WIRE_FORMAT=columns only applies to single-ticker "
+                       "full runs; using JSON")
+        columns = False
+    use_price_store = bool(PRICE_STORE_DIR) and batch_size == 1 and not incremental
+    logger.info("Starting Pipeline Execution (concurrency=%d, batch_size=%d, "
+                "incremental=%s)...", concurrency, batch_size, incremental)
+    # One pooled connection per in-flight call to each agent
+    http_clients.configure(PIPELINE_HTTP_POOL_SIZE or concurrency)
     
     # Mode Check
     mm = ModeMachine()
     if not mm.is_safe_to_execute():
-        logger.critical(f"System Mode is {mm.get_mode()}. Aborting execution.")
+        logger.critical("System Mode is %s. Aborting execution.", mm.get_mode())
         return
 
     db = SessionLocal()
-    try:
-        run_id = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    price_store_run = None
+    run_started = time.perf_counter()
+    run_id = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    # Cleanups run in reverse order of registration, also on errors: the run
+    # span ends (and traces are flushed) after everything else
+    with ExitStack() as cleanup:
+        cleanup.callback(flush_traces)
+        # One trace per run: asset, agent call, DB and upload spans are its children
+        cleanup.enter_context(start_span("pipeline.run", service="pipeline",
+                                         run_id=run_id, concurrency=concurrency,
+                                         batch_size=batch_size,
+                                         incremental=incremental))
+        cleanup.callback(export_pipeline_metrics)
+        cleanup.callback(lambda: PIPELINE_STAGE_SECONDS.labels("run").observe(
+            time.perf_counter() - run_started))
+        cleanup.callback(db.close)
+        cleanup.callback(bind_log_fields, run_id=None)
+        cleanup.callback(http_clients.log_stats)
+        bind_log_fields(run_id=run_id)
+        profile.reset(run_id)
+        cleanup.enter_context(profile.watch_sql(db.get_bind()))
+        # ndjson.gz / parquet: results are uploaded as they are persisted
+        result_stream = open_result_stream(run_id)
+        if result_stream:
+            cleanup.callback(result_stream.abort)  # No-op once the upload completed
         
         # 1. Fetch Macro Context
         macro_record = db.query(MacroData).order_by(MacroData.date.desc()).first()
@@ -76,270 +730,135 @@ def run_pipeline():
             "liquidity_index": 0.10 # Stub
         }
         
-        logger.info(f"--- Calling Macro Agent ---")
+        logger.info("--- Calling Macro Agent ---")
         macro_signal = "NEUTRAL"
-        try:
-            start_time = datetime.now()
-            macro_resp = call_agent(f"{AGENTS['macro']}/analyze", macro_payload)
-            latency = (datetime.now() - start_time).total_seconds()
-            macro_signal = macro_resp.get('signal', 'NEUTRAL')
-            logger.info(f"Macro Agent: Signal={macro_signal} | Latency={latency:.3f}s")
-        except Exception as e:
-            logger.error(f"Macro Agent failed: {e}")
-            macro_signal = "NEUTRAL"
-
-        # 2. Iterate Assets
-        pipeline_results = []
-        assets = db.query(Asset).all()
-        for asset in assets:
-            logger.info(f"Processing Asset: {asset.ticker}")
-            
-            # Fetch Context Data
-            prices = db.query(Price).filter(Price.asset_id == asset.id).order_by(Price.date.asc()).all()
-            fundamental = db.query(Fundamental).filter(Fundamental.asset_id == asset.id).order_by(Fundamental.reporting_date.desc()).first()
-            
-            # Log Data Availability
-            price_count = len(prices)
-            has_fundamental = bool(fundamental)
-            logger.info(f"Data Check for {asset.ticker}: Prices={price_count} | Fundamentals={has_fundamental}")
-
-            if not prices or len(prices) < 30:
-                logger.warning(f"Skipping {asset.ticker}: Insufficient price data ({price_count} rows)")
-                continue
-                
-            # Prepare Payloads
-            price_list = [{"date": p.date.isoformat(), "price": p.close} for p in prices]
-            
-            agent_signals = []
-            
-            # --- Value Agent ---
-            if fundamental:
-                mock_debt = 1_000_000_000.0
-                mock_ebitda = mock_debt / fundamental.debt_to_ebitda if fundamental.debt_to_ebitda else 1.0
-                
-                value_payload = {
-                    "ticker": asset.ticker,
-                    "roe": fundamental.roe,
-                    "fcf": fundamental.fcf,
-                    "debt": mock_debt,
-                    "ebitda": mock_ebitda,
-                    "current_price": prices[-1].close,
-                    "shares_outstanding": 100_000_000
-                }
-                try:
-                    start_time = datetime.now()
-                    res = call_agent(f"{AGENTS['value']}/analyze", value_payload)
-                    latency = (datetime.now() - start_time).total_seconds()
-                    
-                    sig = res.get('signal', 'HOLD')
-                    logger.info(f"Value Agent [{asset.ticker}]: Signal={sig} | Latency={latency:.3f}s")
-                    
-                    agent_signals.append({
-                        "agent_name": "Value",
-                        "signal": sig,
-                        "weight": 1.0,
-                        "score": 0.0
-                    })
-                    save_output(db, asset.id, "value_agent", sig, 0.0, res, run_id)
-                except Exception as e:
-                    logger.error(f"Value Agent failed for {asset.ticker}: {e}")
-            else:
-                logger.warning(f"Value Agent skipped for {asset.ticker}: No fundamental data")
-
-            # --- Quant Agent ---
-            quant_payload = {"ticker": asset.ticker, "prices": price_list}
+        with run_stage("macro", "pipeline.macro"):
             try:
-                start_time = datetime.now()
-                res = call_agent(f"{AGENTS['quant']}/analyze", quant_payload)
-                latency = (datetime.now() - start_time).total_seconds()
-                
-                sig = res.get('signal', 'HOLD')
-                score = res.get('momentum_score', 0.0)
-                logger.info(f"Quant Agent [{asset.ticker}]: Signal={sig} | Score={score:.2f} | Latency={latency:.3f}s")
-                
-                agent_signals.append({
-                    "agent_name": "Quant",
-                    "signal": sig,
-                    "weight": 1.0,
-                    "score": score
-                })
-                save_output(db, asset.id, "quant_agent", sig, score, res, run_id)
+                macro_resp, latency = timed_call(f"{AGENTS['macro']}/analyze",
+                                                 macro_payload)
+                macro_signal = macro_resp.get('signal', 'NEUTRAL')
+                logger.info("Macro Agent: Signal=%s | Latency=%.3fs", macro_signal,
+                            latency)
             except Exception as e:
-                 logger.error(f"Quant Agent failed for {asset.ticker}: {e}")
+                logger.error("Macro Agent failed: %s", e)
+                macro_signal = "NEUTRAL"
+
+        # 2. Fan out Assets
+        # Agent calls run on worker threads; DB writes stay on this
+        # thread (the Session is not thread-safe) and outcomes are persisted
+        # in universe order so hash chains are independent of scheduling.
+        # Persisted results: kept for the json upload, or streamed (only counted)
+        persisted = result_stream or []
+        results_count = 0
+        with run_stage("load", "db.load"):
+            assets = load_assets(db)
+            # Bulk load: a fixed number of queries for the whole universe
+            universe_prices = load_universe_prices(db, incremental)
+            rolling_states = load_rolling_states(db) if incremental else {}
+            fundamentals = load_latest_fundamentals(db)
+        logger.info("Loaded data for %d assets: %d prices, %d fundamentals",
+                    len(assets), sum(len(c) for _, c in universe_prices.values()),
+                    len(fundamentals))
 
-            # --- Risk Agent ---
-            risk_payload = {"prices": price_list, "target_volatility": 0.15}
+        if use_price_store:
             try:
-                start_time = datetime.now()
-                res = call_agent(f"{AGENTS['risk']}/analyze", risk_payload)
-                latency = (datetime.now() - start_time).total_seconds()
-                
-                exposure = res.get('risk_adjusted_exposure', 0.5)
-                risk_sig = SignalType.HOLD
-                if exposure < 0.5:
-                    risk_sig = SignalType.SELL
-                elif exposure >= 0.9:
-                    risk_sig = SignalType.BUY
-                
-                logger.info(f"Risk Agent [{asset.ticker}]: Exposure={exposure:.2f} | Signal={risk_sig} | Latency={latency:.3f}s")
-                
-                agent_signals.append({
-                    "agent_name": "Risk",
-                    "signal": risk_sig, 
-                    "weight": 1.5,
-                    "score": exposure
+                write_price_store(PRICE_STORE_DIR, run_id, {
+                    ticker: universe_prices[asset_id]
+                    for asset_id, ticker in assets if asset_id in universe_prices
                 })
-                save_output(db, asset.id, "risk_agent", str(risk_sig), exposure, res, run_id)
+                price_store_run = run_id
+                cleanup.callback(remove_price_store, PRICE_STORE_DIR, price_store_run)
+                logger.info("Price store written to %s/%s", PRICE_STORE_DIR, run_id)
             except Exception as e:
-                 logger.error(f"Risk Agent failed for {asset.ticker}: {e}")
-            
-            # --- Include Macro Signal ---
-            # Always include Macro if available
-            agent_signals.append({
-                 "agent_name": "Macro",
-                 "signal": macro_signal,
-                 "weight": 0.5,
-                 "score": 0.0
-            })
+                logger.warning("Price store unavailable (%s); sending price histories "
+                               "inline", e)
+
+        # Chain heads are read once per run and advanced in memory
+        chain_heads = ChainHeads(db)
+        chain_heads.seed(
+            [agent_chain(a) for a in CHAIN_AGENTS] + [FINAL_DECISION_CHAIN]
+        )
+        writer = LedgerWriter(db, chain_heads, batch_size=PIPELINE_WRITE_BATCH_SIZE,
+                              conflict_retries=CHAIN_CONFLICT_RETRIES)
 
-            # --- Consensus Decision ---
-            if agent_signals:
-                consensus_payload = {
-                    "ticker": asset.ticker,
-                    "signals": agent_signals
-                }
-                try:
-                    start_time = datetime.now()
-                    res = call_agent(f"{AGENTS['consensus']}/decide", consensus_payload)
-                    latency = (datetime.now() - start_time).total_seconds()
-                    
-                    final_sig = res.get('final_signal', 'HOLD')
-                    conf_score = res.get('confidence_score', 0.0)
-                    
-                    logger.info(f">>> CONSENSUS for {asset.ticker}: {final_sig} (Conf: {conf_score:.2f}) | Signals={len(agent_signals)} | Latency={latency:.3f}s")
-                    
-                    save_output(db, asset.id, "consensus_agent", final_sig, conf_score, res, run_id)
-                    
-                    # Store Final Decision with Hash Chain
-                    last_decision = db.query(FinalDecision).order_by(FinalDecision.id.desc()).first()
-                    prev_hash = last_decision.hash if last_decision and last_decision.hash else "0" * 64
-                    
-                    details_json = json.dumps(res)
-                    current_hash = calculate_hash(prev_hash, f"{asset.ticker}{final_sig}{conf_score}{details_json}")
-
-                    final = FinalDecision(
-                        ticker=asset.ticker,
-                        decision=final_sig,
-                        confidence=conf_score,
-                        details=details_json,
-                        hash=current_hash,
-                        previous_hash=prev_hash,
-                        run_id=run_id,
-                        created_at=datetime.utcnow()
-                    )
-                    db.add(final)
-                    db.commit()
-                    
-                    flat_result = {
-                        "ticker": asset.ticker,
-                        "decision": final_sig,
-                        "confidence": float(conf_score),
-                        "raw_score": float(res.get('details', {}).get('raw_score', 0.0)),
-                        "agents_count": len(agent_signals),
-                    }
-                    pipeline_results.append(flat_result)
-
-                except Exception as e:
-                     logger.error(f"Consensus Agent failed for {asset.ticker}: {e}")
-            else:
-                logger.warning(f"NO SIGNALS collected for {asset.ticker}. Marking as NO_SIGNAL.")
-                # Handle NO_SIGNAL case
-                flat_result = {
-                    "ticker": asset.ticker,
-                    "decision": "NO_SIGNAL",
-                    "confidence": 0.0,
-                    "raw_score": 0.0,
-                    "agents_count": 0
-                }
-                pipeline_results.append(flat_result)
+        # fan_out: agent calls and the interleaved ledger writes, wall time
+        asset_pool = ThreadPoolExecutor(concurrency, thread_name_prefix="asset")
+        call_pool = ThreadPoolExecutor(concurrency * 3, thread_name_prefix="agent")
+        with run_stage("fan_out", "pipeline.fan_out"), asset_pool, call_pool:
+            chunks = prepare_chunks(
+                assets, batch_size, universe_prices, fundamentals, rolling_states,
+                incremental=incremental, columns=columns,
+                price_store_run=price_store_run
+            )
+
+            def submit(chunk):
+                task = in_trace_context(analyze_chunk)
+                return asset_pool.submit(
+                    task, chunk, macro_signal, call_pool, batch_size
+                )
+
+            # Bounded window: the next chunk is prepared and submitted as the
+            # oldest one completes, so only a few chunks of payloads are held
+            window = islice(chunks, concurrency * 2)
+            in_flight = deque(submit(chunk) for chunk in window)
+
+            pending_results = []
+            pending_states = {}
+            while in_flight:
+                outcomes = in_flight.popleft().result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    in_flight.append(submit(chunk))
+                for outcome in outcomes:
+                    flat_result = buffer_outcome(writer, outcome, run_id)
+                    if flat_result is not None:
+                        pending_results.append(flat_result)
+                    if outcome.get("state") is not None:
+                        pending_states[outcome["asset_id"]] = outcome["state"]
+                if writer.full:
+                    results_count += flush_ledger(writer, pending_results, persisted,
+                                                  pending_states)
+            results_count += flush_ledger(writer, pending_results, persisted,
+                                          pending_states)
+        logger.info("Persisted %d results for %d assets", results_count, len(assets))
         
         # 3. Upload Results to MinIO
-        if pipeline_results:
-            run_id = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        # Same run_id as the ledger rows, the price store and the profile
+        if result_stream:
+            if results_count:
+                close_result_stream(result_stream)
+        elif persisted:
             final_payload = {
                 "run_id": run_id,
                 "timestamp": datetime.utcnow().isoformat() + "Z",
-                "results": pipeline_results
+                "results": persisted
             }
             upload_to_minio(final_payload, run_id)
-        
-    finally:
-        db.close()
 
-def save_output(db, asset_id, agent, signal, score, details, run_id):
-    # Fetch last output for this agent to chain
-    last_output = db.query(AgentOutput).filter(AgentOutput.agent_name == agent).order_by(AgentOutput.id.desc()).first()
-    prev_hash = last_output.hash if last_output and last_output.hash else "0" * 64
-    
-    details_str = json.dumps(details)
-    current_hash = calculate_hash(prev_hash, f"{asset_id}{agent}{signal}{score}{details_str}")
-
-    out = AgentOutput(
-        asset_id=asset_id,
-        agent_name=agent,
-        signal=str(signal),
-        score=float(score) if score else 0.0,
-        details=details_str,
-        hash=current_hash,
-        previous_hash=prev_hash,
-        run_id=run_id,
-        generated_at=datetime.utcnow()
-    )
-    db.add(out)
-    db.commit()
+        # 4. Run profile, next to the results
+        upload_profile(profile.report(
+            assets=len(assets), results=results_count, concurrency=concurrency,
+            batch_size=batch_size, incremental=incremental
+        ), run_id)
+
+def save_output(writer, asset_id, agent, signal, score, details, run_id):
+    # Buffered: chained onto the in-memory head of this agent's chain and
+    # written in bulk by the ledger writer
+    writer.add_agent_output(asset_id, agent, signal, score, details, run_id)
 
+@run_stage("upload", "minio.upload")
 def upload_to_minio(data, run_id):
-    try:
-        import boto3
-        from botocore.exceptions import ClientError
-        from services.shared.config import settings
-    except Exception as e:
-        logger.error(f"Failed to import boto3: {e}")
-        return
+    put_object(f"run_{run_id}.json", json.dumps(data, separators=(",", ":")),
+               "application/json", "results")
 
-    s3_client = boto3.client(
-        's3',
-        endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
-        aws_access_key_id=settings.MINIO_ACCESS_KEY,
-        aws_secret_access_key=settings.MINIO_SECRET_KEY,
-        config=boto3.session.Config(signature_version='s3v4'),
-        verify=False
-    )
-    
-    bucket_name = "portfolio-results"
-    try:
-        if bucket_name not in [b['Name'] for b in s3_client.list_buckets()['Buckets']]:
-            s3_client.create_bucket(Bucket=bucket_name)
-        
-        # Governance: Enable Versioning
-        s3_client.put_bucket_versioning(
-            Bucket=bucket_name,
-            VersioningConfiguration={'Status': 'Enabled'}
-        )
-    except Exception as e:
-        logger.warning(f"Could not check/create bucket or enable versioning: {e}")
+@run_stage("upload", "minio.upload")
+def close_result_stream(stream):
+    stream.close()
 
-    filename = f"run_{run_id}.json"
-    try:
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=filename,
-            Body=json.dumps(data, indent=2),
-            ContentType='application/json'
-        )
-        logger.info(f"Successfully uploaded results to MinIO: {bucket_name}/{filename}")
-    except Exception as e:
-        logger.error(f"Failed to upload to MinIO: {e}")
+def upload_profile(report, run_id):
+    """Stores the run profile next to the run's results."""
+    put_object(f"run_{run_id}_profile.json", json.dumps(report, indent=2),
+               "application/json", "run profile")
 
 if __name__ == "__main__":
     run_pipeline()
@@ -0,0 +1,164 @@
+"""
+Per-run profile of the pipeline, uploaded next to the results as
+run_<run_id>_profile.json for trend analysis across runs.
+
+Collects wall time per stage, agent calls (count, errors, retries and
+latency percentiles per agent), SQL statements (count, errors and total time,
+via SQLAlchemy cursor events), the slowest assets and peak RSS. Thread-safe:
+agent calls are recorded from the worker threads.
+"""
+import heapq
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import event
+
+# Slowest assets kept in the report
+PROFILE_SLOWEST_ASSETS = 10
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (MB); 0 where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class RunProfile:
+    def __init__(self, slowest: int = PROFILE_SLOWEST_ASSETS):
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, run_id: Optional[str] = None) -> None:
+        with self._lock:
+            self.run_id = run_id
+            self.started_at = datetime.utcnow()
+            self._started = time.perf_counter()
+            self.stages: dict[str, dict[str, float]] = defaultdict(
+                lambda: {"seconds": 0.0, "count": 0})
+            self.calls: dict[str, list[float]] = defaultdict(list)
+            self.call_errors: dict[str, int] = defaultdict(int)
+            self.retries: dict[str, int] = defaultdict(int)
+            self.sql = {"count": 0, "errors": 0, "seconds": 0.0}
+            self._assets: list[tuple] = []  # min-heap of (seconds, ticker)
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage]["seconds"] += seconds
+            self.stages[stage]["count"] += 1
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Adds the block's wall time to `stage` (usable as a decorator)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - started)
+
+    def record_call(self, agent: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls[agent].append(seconds)
+            if not ok:
+                self.call_errors[agent] += 1
+
+    def record_retry(self, agent: str) -> None:
+        with self._lock:
+            self.retries[agent] += 1
+
+    def record_asset(self, ticker: str, seconds: float) -> None:
+        with self._lock:
+            if len(self._assets) < self.slowest:
+                heapq.heappush(self._assets, (seconds, ticker))
+            elif seconds > self._assets[0][0]:
+                heapq.heapreplace(self._assets, (seconds, ticker))
+
+    # The start time lives on the execution context: a statement that fails
+    # never reaches after_cursor_execute, and its context is discarded
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profile_started = time.perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        self._count_sql(context, failed=False)
+
+    def _sql_error(self, exception_context):
+        self._count_sql(exception_context.execution_context, failed=True)
+
+    def _count_sql(self, context, failed: bool) -> None:
+        started = getattr(context, "_profile_started", None)
+        if started is None:
+            return
+        del context._profile_started
+        with self._lock:
+            self.sql["count"] += 1
+            self.sql["errors"] += failed
+            self.sql["seconds"] += time.perf_counter() - started
+
+    @contextmanager
+    def watch_sql(self, engine):
+        """
+        Counts and times the statements executed on `engine` inside the block,
+        failed ones included.
+        """
+        event.listen(engine, "before_cursor_execute", self._before_sql)
+        event.listen(engine, "after_cursor_execute", self._after_sql)
+        event.listen(engine, "handle_error", self._sql_error)
+        try:
+            yield
+        finally:
+            event.remove(engine, "before_cursor_execute", self._before_sql)
+            event.remove(engine, "after_cursor_execute", self._after_sql)
+            event.remove(engine, "handle_error", self._sql_error)
+
+    def report(self, **extra) -> dict:
+        with self._lock:
+            agents = {}
+            for agent, latencies in sorted(self.calls.items()):
+                values = np.asarray(latencies) * 1000
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                agents[agent] = {
+                    "calls": len(values),
+                    "errors": self.call_errors.get(agent, 0),
+                    "retries": self.retries.get(agent, 0),
+                    "total_seconds": round(float(values.sum()) / 1000, 3),
+                    "p50_ms": round(float(p50), 2),
+                    "p95_ms": round(float(p95), 2),
+                    "p99_ms": round(float(p99), 2),
+                    "max_ms": round(float(values.max()), 2),
+                }
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at.isoformat() + "Z",
+                "wall_seconds": round(time.perf_counter() - self._started, 3),
+                "stages": {
+                    name: {"seconds": round(s["seconds"], 3), "count": s["count"]}
+                    for name, s in self.stages.items()
+                },
+                "agents": agents,
+                "http": {
+                    "calls": sum(a["calls"] for a in agents.values()),
+                    "errors": sum(a["errors"] for a in agents.values()),
+                    "retries": sum(self.retries.values()),
+                },
+                "sql": {
+                    "statements": self.sql["count"],
+                    "errors": self.sql["errors"],
+                    "seconds": round(self.sql["seconds"], 3),
+                },
+                "slowest_assets": [
+                    {"ticker": ticker, "seconds": round(seconds, 3)}
+                    for seconds, ticker in sorted(self._assets, reverse=True)
+                ],
+                "peak_rss_mb": peak_rss_mb(),
+                **extra,
+            }
@@ -0,0 +1,310 @@
+"""
+Result objects in MinIO (bucket portfolio-results).
+
+- One boto3 client per process, created on first use; the bucket is
+  created/versioned once per process instead of on every upload.
+- PIPELINE_RESULTS_FORMAT selects the results object:
+  - json (default): run_<run_id>.json, the whole run in one compact JSON
+    document, uploaded at the end;
+  - ndjson.gz: results/run_date=YYYY-MM-DD/run_<run_id>.ndjson.gz, one
+    result per line, gzip-compressed;
+  - parquet: results/run_date=YYYY-MM-DD/run_<run_id>.parquet (requires
+    pyarrow; falls back to ndjson.gz), columnar so readers such as DuckDB
+    scan only the columns they need.
+  The streaming formats are written while the run progresses: results are
+  encoded as they are persisted and sent as multipart-upload parts of
+  RESULTS_PART_SIZE bytes, so the object is never built in memory.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from services.shared.logger import setup_logger
+
+logger = setup_logger("results_store")
+
+RESULTS_BUCKET = "portfolio-results"
+PIPELINE_RESULTS_FORMAT = os.getenv("PIPELINE_RESULTS_FORMAT", "json").lower()
+# S3 minimum for every part but the last one
+RESULTS_PART_SIZE = max(5 * 1024 * 1024,
+                        int(os.getenv("RESULTS_PART_SIZE", str(8 * 1024 * 1024))))
+# Rows per Parquet row group (results are buffered until a group is full)
+PARQUET_ROW_GROUP_SIZE = 50_000
+
+STREAMING_FORMATS = ("ndjson.gz", "parquet")
+
+_client = None
+_client_lock = threading.Lock()
+_ready_buckets = set()
+
+def s3_client():
+    """The process-wide MinIO client (raises ImportError without boto3)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import boto3
+
+            from services.shared.config import settings
+
+            _client = boto3.client(
+                's3',
+                endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
+                aws_access_key_id=settings.MINIO_ACCESS_KEY,
+                aws_secret_access_key=settings.MINIO_SECRET_KEY,
+                config=boto3.session.Config(signature_version='s3v4'),
+                verify=False
+            )
+        return _client
+
+def ensure_bucket(client, bucket: str = RESULTS_BUCKET) -> None:
+    """
+    Creates the bucket and enables versioning, once per process (retried after
+    a failure).
+    """
+    if bucket in _ready_buckets:
+        return
+    try:
+        if bucket not in [b['Name'] for b in client.list_buckets()['Buckets']]:
+            client.create_bucket(Bucket=bucket)
+
+        # Governance: Enable Versioning
+        client.put_bucket_versioning(
+            Bucket=bucket,
+            VersioningConfiguration={'Status': 'Enabled'}
+        )
+        _ready_buckets.add(bucket)
+    except Exception as e:
+        logger.warning("Could not check/create bucket or enable versioning: %s", e)
+
+def put_object(key: str, body, content_type: str, description: str,
+               client=None) -> bool:
+    """Uploads one whole object; failures are logged. Returns whether it was stored."""
+    try:
+        client = client or s3_client()
+    except ImportError as e:
+        logger.error("Failed to import boto3: %s", e)
+        return False
+    ensure_bucket(client)
+    try:
+        client.put_object(Bucket=RESULTS_BUCKET, Key=key, Body=body,
+                          ContentType=content_type)
+        logger.info("Successfully uploaded %s to MinIO: %s/%s", description,
+                    RESULTS_BUCKET, key)
+        return True
+    except Exception as e:
+        logger.error("Failed to upload %s to MinIO: %s", description, e)
+        return False
+
+class MultipartSink:
+    """
+    Write-only file object uploading to `key` in parts of `part_size` bytes.
+    The multipart upload starts with the first full part; an object smaller
+    than one part is sent with a single put_object on close().
+    """
+
+    def __init__(self, client, key: str, content_type: str,
+                 part_size: int = RESULTS_PART_SIZE, bucket: str = RESULTS_BUCKET):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.closed = False
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts: list[dict] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.size
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        number = len(self._parts) + 1
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=body,
+        )
+        self._parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+
+    def close(self) -> None:
+        """
+        Stores the object. Only marked closed once stored, so a failure here
+        can still be aborted.
+        """
+        if self.closed:
+            return
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key,
+                                   Body=bytes(self._buffer),
+                                   ContentType=self.content_type)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+                self._buffer.clear()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self.closed = True
+
+    def abort(self) -> None:
+        """Discards the uploaded parts (nothing becomes visible)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                   UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning("Could not abort the multipart upload of %s: %s",
+                               self.key, e)
+
+def _parquet():
+    import pyarrow as pa  # Optional dependency, only needed for the parquet format
+    import pyarrow.parquet as pq
+
+    return pa, pq
+
+class ResultStream:
+    """
+    Streams a run's results to MinIO as they are persisted. extend() takes
+    the results persisted since the last call (like list.extend, so the
+    pipeline can hand it either); only their count is kept. An upload
+    failure is logged and aborts the object; the run goes on.
+    """
+
+    def __init__(self, sink: MultipartSink, fmt: str, run_id: str):
+        self.sink = sink
+        self.format = fmt
+        self.run_id = run_id
+        self.count = 0
+        self.failed = False
+        self._rows: list[dict] = []
+        if fmt == "parquet":
+            pa, pq = _parquet()
+            self._schema = pa.schema([
+                ("run_id", pa.string()),
+                ("ticker", pa.string()),
+                ("decision", pa.string()),
+                ("confidence", pa.float64()),
+                ("raw_score", pa.float64()),
+                ("agents_count", pa.int32()),
+            ])
+            self._writer = pq.ParquetWriter(sink, self._schema, compression="zstd")
+        else:
+            self._writer = gzip.GzipFile(fileobj=sink, mode="wb")
+
+    @property
+    def key(self) -> str:
+        return self.sink.key
+
+    def extend(self, results: list[dict]) -> None:
+        """Encodes `results`."""
+        if self.failed:
+            return
+        rows = [dict(result, run_id=self.run_id) for result in results]
+        self.count += len(rows)
+        try:
+            if self.format == "parquet":
+                self._rows += rows
+                if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+                    self._write_row_group()
+            elif rows:
+                lines = (json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+                self._writer.write("".join(lines).encode())
+        except Exception as e:
+            self._fail(e)
+
+    def _write_row_group(self) -> None:
+        if self._rows:
+            pa, _ = _parquet()
+            columns = {
+                name: [row.get(name) for row in self._rows]
+                for name in self._schema.names
+            }
+            self._writer.write_table(pa.table(columns, schema=self._schema))
+            self._rows = []
+
+    def close(self) -> bool:
+        """
+        Writes the pending rows and completes the upload. Returns whether the
+        object was stored.
+        """
+        if self.failed:
+            return False
+        try:
+            if self.format == "parquet":
+                self._write_row_group()
+            self._writer.close()
+            self.sink.close()
+        except Exception as e:
+            self._fail(e)
+            return False
+        logger.info("Successfully uploaded %d results to MinIO: %s/%s (%d bytes)",
+                    self.count, self.sink.bucket, self.key, self.sink.size)
+        return True
+
+    def abort(self) -> None:
+        """Drops the object (the run failed before close())."""
+        self.sink.abort()
+
+    def _fail(self, error: Exception) -> None:
+        logger.error("Failed to upload results to MinIO (%s): %s", self.key, error)
+        self.failed = True
+        self.sink.abort()
+
+def result_key(run_id: str, fmt: str, run_date: Optional[datetime] = None) -> str:
+    """Partitioned by run date (hive style), so readers can prune by date."""
+    extension = "parquet" if fmt == "parquet" else "ndjson.gz"
+    run_date = run_date or datetime.utcnow()
+    return f"results/run_date={run_date:%Y-%m-%d}/run_{run_id}.{extension}"
+
+def open_result_stream(run_id: str, fmt: str = PIPELINE_RESULTS_FORMAT,
+                       client=None) -> Optional[ResultStream]:
+    """
+    A ResultStream for the streaming formats; None for json or when MinIO
+    cannot be used.
+    """
+    if fmt not in STREAMING_FORMATS:
+        return None
+    if fmt == "parquet":
+        try:
+            _parquet()
+        except ImportError:
+            logger.warning("PIPELINE_RESULTS_FORMAT=parquet requires pyarrow; "
+                           "writing ndjson.gz instead")
+            fmt = "ndjson.gz"
+    try:
+        client = client or s3_client()
+    except ImportError as e:
+        logger.error("Failed to import boto3: %s", e)
+        return None
+    ensure_bucket(client)
+    if fmt == "parquet":
+        content_type = "application/vnd.apache.parquet"
+    else:
+        content_type = "application/gzip"
+    sink = MultipartSink(client, result_key(run_id, fmt), content_type)
+    return ResultStream(sink, fmt, run_id)
@@ -1,12 +1,20 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import argparse
+import io
 import random
+import time
 from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from services.shared.database import SessionLocal, engine, Base
-from services.shared.models.domain import Asset, Price, Fundamental, MacroData
+
+from services.shared.database import Base, SessionLocal, engine
 from services.shared.logger import setup_logger
+from services.shared.models.domain import Asset, Fundamental, MacroData, Price
 
 logger = setup_logger("seeder")
 
@@ -131,5 +139,222 @@ def seed_data():
     finally:
         db.close()
 
+# --- Bulk seeding (load testing) ---
+
+SECTORS = [
+    "Technology", "Finance", "Energy", "Healthcare", "Consumer Cyclical",
+    "Consumer Defensive", "Industrials", "Utilities",
+]
+
+# Scenario -> daily drift/volatility of the random walk and fundamentals range
+# (roe, fcf, debt_to_ebitda). "crash" adds a 40% fall over the last 20 bars.
+SCENARIOS = {
+    "base": {"drift": 0.0003, "vol": 0.015, "roe": (0.10, 0.35), "fcf": (1e9, 5e9),
+             "debt_to_ebitda": (0.5, 4.0)},
+    "bull": {"drift": 0.0010, "vol": 0.010, "roe": (0.25, 0.40), "fcf": (1e10, 5e10),
+             "debt_to_ebitda": (0.5, 1.5)},
+    "bear": {"drift": -0.0008, "vol": 0.025, "roe": (0.00, 0.06), "fcf": (-2e9, 0.0),
+             "debt_to_ebitda": (4.5, 6.0)},
+    "crash": {"drift": 0.0003, "vol": 0.030, "roe": (0.05, 0.20), "fcf": (0.0, 2e9),
+              "debt_to_ebitda": (2.0, 5.0)},
+}
+CRASH_BARS = 20
+CRASH_DEPTH = 0.40
+
+PRICE_COLUMNS = [
+    "asset_id", "date", "open", "high", "low", "close", "volume", "adjusted_close",
+]
+
+def business_days(end, days):
+    """The last `days` business days up to `end` (inclusive), as datetime64[D]."""
+    end = np.datetime64(end, "D")
+    start = np.busday_offset(end, -(days - 1), roll="backward")
+    span = np.arange(start, end + 1, dtype="datetime64[D]")
+    return span[np.is_busday(span)]
+
+def assign_scenarios(count, fractions, rng):
+    """Scenario name per ticker: `fractions` {scenario: share}, the rest "base"."""
+    names = np.full(count, "base", dtype=object)
+    order = rng.permutation(count)
+    offset = 0
+    for scenario, fraction in fractions.items():
+        n = int(round(count * fraction))
+        names[order[offset:offset + n]] = scenario
+        offset += n
+    return names
+
+def random_walks(scenarios, days, rng):
+    """Close matrix (tickers x days): vectorized geometric random walks per scenario."""
+    drift = np.array([SCENARIOS[s]["drift"] for s in scenarios])[:, None]
+    vol = np.array([SCENARIOS[s]["vol"] for s in scenarios])[:, None]
+    returns = drift + vol * rng.standard_normal((len(scenarios), days))
+    crash = np.array([s == "crash" for s in scenarios])
+    if crash.any() and days > CRASH_BARS:
+        returns[crash, -CRASH_BARS:] += (1 - CRASH_DEPTH) ** (1 / CRASH_BARS) - 1
+    start = rng.uniform(20, 500, (len(scenarios), 1))
+    return start * np.cumprod(1 + returns, axis=1)
+
+def insert_ignoring_conflicts(db, table, rows, conflict_columns):
+    """Bulk insert skipping existing rows (Postgres/SQLite ON CONFLICT DO NOTHING)."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+    else:
+        raise ValueError(f"Bulk seeding is not supported on {dialect}")
+    db.execute(stmt.on_conflict_do_nothing(index_elements=conflict_columns), rows)
+
+def price_csv(columns):
+    """The chunk's PRICE_COLUMNS as CSV rows (COPY ... WITH (FORMAT csv) input)."""
+    buffer = io.StringIO()
+    np.savetxt(buffer, np.rec.fromarrays(columns),
+               fmt=["%d", "%s", "%.6f", "%.6f", "%.6f", "%.6f", "%d", "%.6f"],
+               delimiter=",")
+    buffer.seek(0)
+    return buffer
+
+def copy_prices(db, columns):
+    """
+    Postgres: COPY the chunk into a temp table, then move it into prices with
+    ON CONFLICT (asset_id, date) DO NOTHING (idx_price_asset_date).
+    """
+    buffer = price_csv(columns)
+    with db.connection().connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS seed_prices (asset_id integer, "
+            "date timestamp, open double precision, high double precision, "
+            "low double precision, close double precision, volume double precision, "
+            "adjusted_close double precision) ON COMMIT DELETE ROWS"
+        )
+        columns = ", ".join(PRICE_COLUMNS)
+        cursor.copy_expert(
+            f"COPY seed_prices ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"INSERT INTO prices ({columns}) SELECT {columns} FROM seed_prices "
+            "ON CONFLICT (asset_id, date) DO NOTHING"
+        )
+
+def seed_bulk(tickers=1000, days=2520, scenarios=None, seed=42, chunk_size=250,
+              end=None, session_factory=None):
+    """
+    Seeds `tickers` synthetic assets (SYN00000...) with `days` business days of
+    prices ending `end` (today), one fundamental each and the macro row.
+    `scenarios` {name: share of tickers} injects SCENARIOS other than "base".
+    Idempotent: existing assets and (asset, date) prices are kept, fundamentals
+    of the seeded assets are replaced. Deterministic for a given `seed`.
+    `session_factory` targets another database (defaults to SessionLocal).
+    """
+    unknown = set(scenarios or {}) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {sorted(unknown)}")
+    session_factory = session_factory or SessionLocal
+    Base.metadata.create_all(bind=session_factory.kw["bind"])
+    rng = np.random.default_rng(seed)
+    dates = business_days(end or datetime.now(), days)
+    date_values = dates.astype("datetime64[us]").tolist()
+    names = assign_scenarios(tickers, scenarios or {}, rng)
+    started = time.perf_counter()
+
+    db = session_factory()
+    try:
+        # 1. Assets
+        symbols = [f"SYN{n:05d}" for n in range(tickers)]
+        insert_ignoring_conflicts(db, Asset.__table__, [
+            {"ticker": t, "name": f"Synthetic {t}", "sector": SECTORS[n % len(SECTORS)],
+             "created_at": datetime.utcnow()}
+            for n, t in enumerate(symbols)
+        ], ["ticker"])
+        db.commit()
+        ids = dict(db.execute(
+            select(Asset.ticker, Asset.id).where(Asset.ticker.in_(symbols))
+        ).all())
+        asset_ids = np.array([ids[t] for t in symbols])
+
+        # 2. Prices and fundamentals, one transaction per chunk of tickers
+        postgres = db.bind.dialect.name == "postgresql"
+        for lo in range(0, tickers, chunk_size):
+            hi = min(lo + chunk_size, tickers)
+            closes = random_walks(names[lo:hi], len(dates), rng)
+            volumes = rng.integers(1_000_000, 5_000_000, closes.shape)
+            chunk_ids = np.repeat(asset_ids[lo:hi], len(dates))
+            close = closes.ravel()
+
+            if postgres:
+                copy_prices(db, [
+                    chunk_ids, np.tile(dates.astype(str), hi - lo), close * 0.99,
+                    close * 1.02, close * 0.98, close, volumes.ravel(), close,
+                ])
+            else:
+                chunk_dates = date_values * (hi - lo)
+                insert_ignoring_conflicts(db, Price.__table__, [
+                    {"asset_id": int(a), "date": d, "open": c * 0.99,
+                     "high": c * 1.02, "low": c * 0.98, "close": c,
+                     "volume": float(v), "adjusted_close": c}
+                    for a, d, c, v in zip(chunk_ids.tolist(), chunk_dates,
+                                          close.tolist(), volumes.ravel().tolist())
+                ], ["asset_id", "date"])
+
+            db.execute(delete(Fundamental).where(Fundamental.asset_id.in_(asset_ids[lo:hi].tolist())))
+            fundamentals = []
+            for asset_id, scenario in zip(asset_ids[lo:hi].tolist(), names[lo:hi]):
+                params = SCENARIOS[scenario]
+                fundamentals.append({
+                    "asset_id": asset_id,
+                    "reporting_date": date_values[-1],
+                    "period": f"FY{date_values[-1].year}",
+                    "roe": rng.uniform(*params["roe"]),
+                    "fcf": rng.uniform(*params["fcf"]),
+                    "debt_to_ebitda": rng.uniform(*params["debt_to_ebitda"]),
+                    "intrinsic_value": rng.uniform(100, 200),
+                })
+            db.execute(insert(Fundamental), fundamentals)
+            db.commit()
+            logger.info("Seeded %d/%d tickers (%d price rows, %.1fs)", hi, tickers,
+                        hi * len(dates), time.perf_counter() - started)
+
+        # 3. Macro data
+        if db.query(MacroData).count() == 0:
+            db.add(MacroData(date=datetime.now(), inflation_rate=0.035,
+                             interest_rate=0.0525, gdp_growth=0.021,
+                             unemployment_rate=0.039))
+            db.commit()
+        logger.info("Bulk seed done: %d tickers x %d days in %.1fs", tickers,
+                    len(dates), time.perf_counter() - started)
+    except Exception as e:
+        logger.error("Bulk seeding failed: %s", e)
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def parse_scenarios(values):
+    """["bull=0.1", "crash=0.02"] -> {"bull": 0.1, "crash": 0.02}"""
+    scenarios = {}
+    for value in values or []:
+        name, _, fraction = value.partition("=")
+        scenarios[name] = float(fraction)
+    return scenarios
+
 if __name__ == "__main__":
-    seed_data()
+    parser = argparse.ArgumentParser(
+        description="Seeds the database (demo universe, or a synthetic one with "
+                    "--bulk).")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Seed a synthetic universe for load testing")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=2520,
+                        help="Business days of history per ticker (2520 = 10 years)")
+    parser.add_argument("--scenario", action="append",
+                        help=f"name=share of tickers, name in {sorted(SCENARIOS)} "
+                             "(repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=250,
+                        help="Tickers per transaction")
+    args = parser.parse_args()
+    if args.bulk:
+        seed_bulk(args.tickers, args.days, parse_scenarios(args.scenario), args.seed,
+                  args.chunk_size)
+    else:
+        seed_data()
@@ -0,0 +1,53 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from orchestration.agent_client import AgentClients
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        data = json.dumps({"path": self.path, "payload": json.loads(body)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_calls_reuse_pooled_connections(server_url):
+    value_url, quant_url = f"{server_url}/api/v1/value", f"{server_url}/api/v1/quant"
+    clients = AgentClients([value_url, quant_url], pool_size=2)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(
+            lambda i: clients.post(f"{value_url}/analyze", {"i": i}, {}), range(20)
+        ))
+    clients.post(f"{quant_url}/analyze", {"i": 0}, {})
+
+    assert [r["payload"]["i"] for r in results] == list(range(20))
+    stats = clients.stats()
+    # Same host, separate clients per agent base URL; at most pool_size connections
+    assert stats[value_url]["requests"] == 20
+    assert stats[value_url]["connections"] <= 2
+    assert stats[value_url]["reused"] >= 18
+    assert stats[quant_url] == {"requests": 1, "connections": 1, "reused": 0}
+    clients.configure(2)
+    assert clients.stats()[value_url]["requests"] == 20  # same size: clients kept
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from orchestration.loader import (
+    load_assets,
+    load_latest_fundamentals,
+    load_prices,
+    load_rolling_states,
+)
+from services.shared.models.base import Base
+from services.shared.models.domain import Asset, Fundamental, Price, RollingStateRecord
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def seed(db, tickers, days=5):
+    base = datetime(2024, 1, 1)
+    for n, ticker in enumerate(tickers):
+        asset = Asset(ticker=ticker, name=ticker)
+        db.add(asset)
+        db.flush()
+        # Inserted newest first to check ordering
+        for i in reversed(range(days)):
+            day = base + timedelta(days=i)
+            db.add(Price(asset_id=asset.id, date=day, close=100.0 + n + i))
+        for days_after, period, roe in ((0, "FY2023", 0.1), (90, "Q1", 0.2)):
+            reported = base + timedelta(days=days_after)
+            db.add(Fundamental(asset_id=asset.id, reporting_date=reported,
+                               period=period, roe=roe))
+    db.commit()
+
+def test_bulk_load_uses_constant_queries(db_session):
+    seed(db_session, ["AAA", "BBB", "CCC"])
+    statements = []
+    event.listen(db_session.bind, "before_cursor_execute",
+                 lambda *args: statements.append(args[2]))
+
+    assets = load_assets(db_session)
+    prices = load_prices(db_session)
+    fundamentals = load_latest_fundamentals(db_session)
+
+    assert len(statements) == 3
+    assert [t for _, t in assets] == ["AAA", "BBB", "CCC"]
+
+    dates, closes = prices[assets[1][0]]
+    assert dates == sorted(dates)
+    assert closes == [101.0, 102.0, 103.0, 104.0, 105.0]
+
+    # Latest reporting date wins
+    assert {row.roe for row in fundamentals.values()} == {0.2}
+
+def test_incremental_load_skips_bars_covered_by_rolling_state(db_session):
+    seed(db_session, ["AAA", "BBB"])
+    aaa, bbb = [asset_id for asset_id, _ in load_assets(db_session)]
+    db_session.add(RollingStateRecord(
+        asset_id=aaa, last_date=datetime(2024, 1, 3), state='{"count": 3}'
+    ))
+    db_session.commit()
+
+    prices = load_prices(db_session, new_only=True)
+
+    assert prices[aaa][1] == [103.0, 104.0]
+    assert len(prices[bbb][1]) == 5  # No state yet: full history
+    assert load_rolling_states(db_session) == {aaa: {"count": 3}}
@@ -0,0 +1,152 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from orchestration import pipeline
+
+
+def make_work(with_value=True):
+    payloads = {
+        "quant": {"ticker": "TEST", "prices": []},
+        "risk": {"prices": [], "target_volatility": 0.15},
+    }
+    if with_value:
+        payloads["value"] = {"ticker": "TEST"}
+    return {"asset_id": 1, "ticker": "TEST", "payloads": payloads}
+
+def fake_responses(url, payload):
+    if url.endswith("/decide"):
+        return {
+            "final_signal": "BUY", "confidence_score": 0.5,
+            "details": {"raw_score": 0.5}
+        }
+    if "/quant/" in url:
+        return {"signal": "BUY", "momentum_score": 0.1}
+    if "/risk/" in url:
+        return {"risk_adjusted_exposure": 1.0}
+    return {"signal": "HOLD"}
+
+def test_agent_calls_fan_out_in_parallel(monkeypatch):
+    # All three analysis calls must be in flight at once to pass the barrier
+    barrier = threading.Barrier(3, timeout=5)
+    seen_signals = []
+
+    def fake_call(url, payload):
+        if url.endswith("/decide"):
+            seen_signals.extend(s["agent_name"] for s in payload["signals"])
+        else:
+            barrier.wait()
+        return fake_responses(url, payload)
+
+    monkeypatch.setattr(pipeline, "call_agent", fake_call)
+    with ThreadPoolExecutor(max_workers=3) as call_pool:
+        outcome = pipeline.analyze_asset(make_work(), "RISK_ON", call_pool)
+
+    # Consensus waited for every input
+    assert seen_signals == ["Value", "Quant", "Risk", "Macro"]
+    # Outputs keep hash chain order
+    agents = [o[0] for o in outcome["outputs"]]
+    assert agents == ["value_agent", "quant_agent", "risk_agent"]
+    assert outcome["consensus"]["final_signal"] == "BUY"
+
+def test_failed_agent_does_not_block_consensus(monkeypatch):
+    def fake_call(url, payload):
+        if "/quant/" in url:
+            raise RuntimeError("quant down")
+        return fake_responses(url, payload)
+
+    monkeypatch.setattr(pipeline, "call_agent", fake_call)
+    with ThreadPoolExecutor(max_workers=3) as call_pool:
+        work = make_work(with_value=False)
+        outcome = pipeline.analyze_asset(work, "NEUTRAL", call_pool)
+
+    assert [o[0] for o in outcome["outputs"]] == ["risk_agent"]
+    assert [s["agent_name"] for s in outcome["agent_signals"]] == ["Risk", "Macro"]
+    assert outcome["consensus"] is not None
+
+def test_batch_mode_maps_per_item_errors(monkeypatch):
+    calls = []
+
+    def fake_call(url, payload):
+        calls.append(url)
+        if url.endswith("/decide/batch"):
+            decision = {"final_signal": "HOLD", "confidence_score": 0.1}
+            results = {i["ticker"]: decision for i in payload["items"]}
+            return {"results": results, "errors": {}}
+        tickers = [i["ticker"] for i in payload["items"]]
+        if "/quant/" in url:
+            # One bad ticker must not fail the rest of the batch
+            return {
+                "results": {"A": {"signal": "BUY", "momentum_score": 0.1}},
+                "errors": {"B": "bad prices"}
+            }
+        return {"results": {t: fake_responses(url, {}) for t in tickers}, "errors": {}}
+
+    monkeypatch.setattr(pipeline, "call_agent", fake_call)
+    works = [dict(make_work(), ticker=t, asset_id=i) for i, t in enumerate(["A", "B"])]
+    with ThreadPoolExecutor(max_workers=3) as call_pool:
+        outcomes = pipeline.analyze_chunk(works, "NEUTRAL", call_pool, batch_size=2)
+
+    # One request per agent for the whole chunk
+    assert len(calls) == 4
+    agents = [o[0] for o in outcomes[0]["outputs"]]
+    assert agents == ["value_agent", "quant_agent", "risk_agent"]
+    assert [o[0] for o in outcomes[1]["outputs"]] == ["value_agent", "risk_agent"]
+    assert all(o["consensus"]["final_signal"] == "HOLD" for o in outcomes)
+
+def test_incremental_mode_unwraps_results_and_keeps_state(monkeypatch):
+    calls = []
+
+    def fake_call(url, payload):
+        calls.append(url.rsplit("/api/v1/", 1)[-1] if "/api/v1/" in url else url)
+        res = fake_responses(url, payload)
+        if url.endswith("/analyze/incremental"):
+            state = {"count": 31, "last_date": "2024-02-01T00:00:00"}
+            return {"result": res, "state": state}
+        return res
+
+    monkeypatch.setattr(pipeline, "call_agent", fake_call)
+    work = dict(make_work(), incremental=True)
+    with ThreadPoolExecutor(max_workers=3) as call_pool:
+        outcome = pipeline.analyze_asset(work, "NEUTRAL", call_pool)
+
+    assert sorted(calls) == [
+        "consensus/decide", "quant/analyze/incremental", "risk/analyze/incremental",
+        "value/analyze"
+    ]
+    # Ledger rows store the bare agent result, as in full mode
+    quant_result = {"signal": "BUY", "momentum_score": 0.1}
+    assert outcome["outputs"][1] == ("quant_agent", "BUY", 0.1, quant_result)
+    assert outcome["state"]["count"] == 31
+
+def test_chunks_are_prepared_lazily_in_universe_order(monkeypatch):
+    prepared = []
+
+    def fake_prepare(asset_id, ticker, prices, fundamental, **options):
+        prepared.append(ticker)
+        return None if ticker == "B" else {"asset_id": asset_id, "ticker": ticker}
+
+    monkeypatch.setattr(pipeline, "prepare_asset", fake_prepare)
+    assets = [(i, t) for i, t in enumerate("ABCDE")]
+    chunks = pipeline.prepare_chunks(assets, 2, {}, {}, {})
+
+    assert [w["ticker"] for w in next(chunks)] == ["A", "C"]
+    assert prepared == ["A", "B", "C"]  # Nothing past the first chunk yet
+    assert [[w["ticker"] for w in chunk] for chunk in chunks] == [["D", "E"]]
+
+def test_incremental_response_without_state_or_result(monkeypatch):
+    def fake_call(url, payload):
+        if url.endswith("/quant/analyze/incremental"):
+            return {"result": fake_responses(url, payload)}  # No state
+        if url.endswith("/risk/analyze/incremental"):
+            return {"error": "unexpected"}  # No result either
+        return fake_responses(url, payload)
+
+    monkeypatch.setattr(pipeline, "call_agent", fake_call)
+    work = dict(make_work(), incremental=True)
+    with ThreadPoolExecutor(max_workers=3) as call_pool:
+        outcome = pipeline.analyze_asset(work, "NEUTRAL", call_pool)
+
+    # Risk counts as failed for this asset; the run goes on
+    assert [o[0] for o in outcome["outputs"]] == ["value_agent", "quant_agent"]
+    assert outcome["state"] is None
+    assert outcome["consensus"] is not None
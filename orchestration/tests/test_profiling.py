@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from orchestration.profiling import RunProfile
+
+
+def test_report_aggregates_stages_calls_and_assets():
+    profile = RunProfile(slowest=2)
+    profile.reset("20240101_000000")
+    with profile.stage("load"):
+        pass
+    profile.add_stage("write", 0.5)
+    profile.add_stage("write", 0.25)
+    for seconds in (0.01, 0.02, 0.03):
+        profile.record_call("quant", seconds, ok=True)
+    profile.record_call("risk", 0.5, ok=False)
+    profile.record_retry("risk")
+    for ticker, seconds in [("AAA", 0.1), ("BBB", 0.9), ("CCC", 0.5), ("DDD", 0.2)]:
+        profile.record_asset(ticker, seconds)
+
+    report = profile.report(assets=4)
+    assert report["run_id"] == "20240101_000000"
+    assert report["stages"]["write"] == {"seconds": 0.75, "count": 2}
+    assert report["stages"]["load"]["count"] == 1
+    assert report["agents"]["quant"]["calls"] == 3
+    assert report["agents"]["quant"]["p50_ms"] == 20.0
+    risk = report["agents"]["risk"]
+    assert (risk["errors"], risk["retries"]) == (1, 1)
+    assert report["http"] == {"calls": 4, "errors": 1, "retries": 1}
+    assert report["slowest_assets"] == [
+        {"ticker": "BBB", "seconds": 0.9}, {"ticker": "CCC", "seconds": 0.5},
+    ]
+    assert report["assets"] == 4
+    assert report["peak_rss_mb"] >= 0
+
+def test_sql_statements_are_counted_while_watched():
+    engine = create_engine("sqlite://")
+    profile = RunProfile()
+    with profile.watch_sql(engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 3"))  # No longer watched
+
+    sql = profile.report()["sql"]
+    assert (sql["statements"], sql["errors"]) == (2, 0)
+    assert sql["seconds"] >= 0
+
+def test_failed_statements_are_counted_and_leave_nothing_behind():
+    engine = create_engine("sqlite://")
+    profile = RunProfile()
+    with profile.watch_sql(engine):
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            assert "profile_started" not in conn.info
+
+    sql = profile.report()["sql"]
+    assert (sql["statements"], sql["errors"]) == (2, 1)
+
+def test_reset_starts_a_new_run():
+    profile = RunProfile()
+    profile.record_call("quant", 0.1, ok=True)
+    profile.record_asset("AAA", 0.1)
+    profile.reset("next")
+    report = profile.report()
+    assert report["agents"] == {} and report["slowest_assets"] == []
+    assert report["run_id"] == "next"
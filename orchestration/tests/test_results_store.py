@@ -0,0 +1,150 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from orchestration import results_store
+from orchestration.results_store import (
+    MultipartSink,
+    ensure_bucket,
+    open_result_stream,
+    result_key,
+)
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client calls used by results_store."""
+
+    def __init__(self):
+        self.buckets = []
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+
+    def list_buckets(self):
+        self.calls.append("list_buckets")
+        return {"Buckets": [{"Name": name} for name in self.buckets]}
+
+    def create_bucket(self, Bucket):
+        self.buckets.append(Bucket)
+
+    def put_bucket_versioning(self, Bucket, VersioningConfiguration):
+        self.calls.append("put_bucket_versioning")
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body.encode() if isinstance(Body, str) else bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.uploads[Key] = []
+        return {"UploadId": f"upload-{Key}"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[Key].append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == list(range(1, len(self.uploads[Key]) + 1))
+        self.objects[Key] = b"".join(self.uploads.pop(Key))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(Key)
+
+RESULTS = [
+    {"ticker": f"T{i:03d}", "decision": "BUY", "confidence": 0.5 + i / 1000,
+     "raw_score": 0.1, "agents_count": 3}
+    for i in range(250)
+]
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(results_store, "_ready_buckets", set())
+
+def test_sink_uploads_fixed_size_parts_and_completes():
+    s3 = FakeS3()
+    sink = MultipartSink(s3, "obj", "application/gzip", part_size=10)
+    for chunk in (b"abcdef", b"ghijklmnop", b"qrstuvwxy"):
+        sink.write(chunk)
+    assert [len(p) for p in s3.uploads["obj"]] == [10, 10]
+    sink.close()
+    assert s3.objects["obj"] == b"abcdefghijklmnopqrstuvwxy"
+
+def test_small_objects_use_a_single_put_and_abort_discards_parts():
+    s3 = FakeS3()
+    small = MultipartSink(s3, "small", "application/gzip", part_size=10)
+    small.write(b"abc")
+    small.close()
+    assert s3.objects["small"] == b"abc" and s3.uploads == {}
+
+    aborted = MultipartSink(s3, "aborted", "application/gzip", part_size=10)
+    aborted.write(b"x" * 25)
+    aborted.abort()
+    assert "aborted" not in s3.objects and s3.uploads == {}
+
+def test_ndjson_stream_round_trip():
+    s3 = FakeS3()
+    stream = open_result_stream("20240102_030405", "ndjson.gz", client=s3)
+    stream.sink.part_size = 1024  # Force several parts
+    # One call per flush, possibly empty
+    for start, end in ((0, 100), (100, 100), (100, 250)):
+        stream.extend(RESULTS[start:end])
+    assert stream.close()
+
+    assert stream.key.startswith("results/run_date=")
+    assert stream.key.endswith("/run_20240102_030405.ndjson.gz")
+    lines = gzip.decompress(s3.objects[stream.key]).splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert rows == [dict(r, run_id="20240102_030405") for r in RESULTS]
+    assert stream.count == len(RESULTS)
+
+def test_parquet_stream_round_trip(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(results_store, "PARQUET_ROW_GROUP_SIZE", 100)
+    s3 = FakeS3()
+    stream = open_result_stream("r1", "parquet", client=s3)
+    stream.extend(RESULTS[:120])
+    stream.extend(RESULTS[120:])
+    assert stream.close()
+
+    parquet = pq.ParquetFile(io.BytesIO(s3.objects[stream.key]))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("ticker").to_pylist() == [r["ticker"] for r in RESULTS]
+    assert set(table.column("run_id").to_pylist()) == {"r1"}
+
+def test_upload_failure_is_logged_and_aborted():
+    class Failing(FakeS3):
+        def upload_part(self, **kwargs):
+            raise ConnectionError("minio down")
+
+    s3 = Failing()
+    stream = open_result_stream("r1", "ndjson.gz", client=s3)
+    stream.sink.part_size = 64
+    stream.extend(RESULTS)
+    assert not stream.close() and stream.failed
+    assert s3.uploads == {} and s3.objects == {}
+
+def test_failed_completion_aborts_the_upload():
+    class Failing(FakeS3):
+        def complete_multipart_upload(self, **kwargs):
+            raise ConnectionError("minio down")
+
+    s3 = Failing()
+    stream = open_result_stream("r1", "ndjson.gz", client=s3)
+    stream.sink.part_size = 64
+    stream.extend(RESULTS)
+    assert not stream.close() and stream.failed
+    assert stream.sink.closed
+    assert s3.uploads == {} and s3.objects == {}
+
+def test_bucket_is_set_up_once_per_process():
+    s3 = FakeS3()
+    for _ in range(3):
+        ensure_bucket(s3)
+    assert s3.buckets == ["portfolio-results"]
+    assert s3.calls == ["list_buckets", "put_bucket_versioning"]
+
+def test_json_format_has_no_stream():
+    assert open_result_stream("r1", "json", client=FakeS3()) is None
+    assert result_key("r1", "parquet").endswith("/run_r1.parquet")
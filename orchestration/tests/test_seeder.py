@@ -0,0 +1,73 @@
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from orchestration import seeder
+from services.shared.models.domain import Asset, Fundamental, Price
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(seeder, "engine", engine)
+    monkeypatch.setattr(seeder, "SessionLocal", Session)
+    return Session
+
+def test_bulk_seed_is_idempotent(session_factory):
+    end = datetime(2024, 6, 28)
+    for _ in range(2):
+        seeder.seed_bulk(tickers=12, days=60, scenarios={"crash": 0.25}, chunk_size=5,
+                         end=end)
+
+    db = session_factory()
+    assert db.query(Asset).count() == 12
+    assert db.query(Price).count() == 12 * 60
+    assert db.query(Fundamental).count() == 12
+    assert db.execute(select(func.max(Price.date))).scalar() == end
+
+def test_crash_scenario_ends_in_a_drawdown():
+    rng = np.random.default_rng(0)
+    closes = seeder.random_walks(np.array(["base", "crash"], dtype=object), 250, rng)
+    drop = closes[:, -1] / closes[:, -seeder.CRASH_BARS - 1] - 1
+
+    assert drop[1] < -0.25
+    assert drop[1] < drop[0]
+
+def test_price_csv_matches_the_copy_columns():
+    dates = seeder.business_days(datetime(2024, 6, 28), 2)
+    close = np.array([10.0, 10.5, 20.0, 19.25])
+    buffer = seeder.price_csv([
+        np.repeat([1, 2], 2), np.tile(dates.astype(str), 2), close * 0.99, close * 1.02,
+        close * 0.98, close, np.array([100, 200, 300, 400]), close,
+    ])
+
+    rows = list(csv.reader(buffer))
+    assert len(rows) == 4 and all(len(row) == len(seeder.PRICE_COLUMNS) for row in rows)
+    assert rows[0] == ["1", "2024-06-27", "9.900000", "10.200000", "9.800000",
+                       "10.000000", "100", "10.000000"]
+    assert rows[3][:2] == ["2", "2024-06-28"] and rows[3][5] == "19.250000"
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"),
+                    reason="TEST_POSTGRES_URL (a disposable Postgres database) "
+                           "is not set")
+def test_bulk_seed_copies_prices_into_postgres(monkeypatch):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(seeder, "engine", engine)
+    monkeypatch.setattr(seeder, "SessionLocal", Session)
+    end = datetime(2024, 6, 28)
+    for _ in range(2):  # Idempotent through COPY + ON CONFLICT
+        seeder.seed_bulk(tickers=6, days=20, chunk_size=4, end=end)
+
+    with engine.connect() as conn:
+        count = conn.execute(text(
+            "SELECT count(*) FROM prices JOIN assets ON assets.id = prices.asset_id "
+            "WHERE assets.ticker LIKE 'SYN%' AND prices.date BETWEEN :start AND :end"
+        ), {"start": seeder.business_days(end, 20)[0].item(), "end": end}).scalar()
+    assert count == 6 * 20
@@ -0,0 +1,33 @@
+import argparse
+import sys
+import time
+
+from services.shared.database import SessionLocal
+from services.shared.price_cache import PRICE_CACHE_DIR, refresh_price_cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Refreshes the columnar price cache from the prices table.")
+    parser.add_argument("--dir", default=PRICE_CACHE_DIR,
+                        help="Cache directory (defaults to PRICE_CACHE_DIR)")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild the cache from scratch instead of fetching only "
+                             "new rows")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("set PRICE_CACHE_DIR or pass --dir")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        refreshed = refresh_price_cache(db, args.dir, full=args.full)
+        elapsed = time.perf_counter() - started
+        print(f"Price cache {args.dir}: {refreshed['rows']} new rows in "
+              f"{refreshed['months']} months ({elapsed:.2f}s)")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
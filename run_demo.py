@@ -8,8 +8,6 @@ import sys, os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import numpy as np
-import hashlib
-import json
 from datetime import datetime, timedelta, timezone
 
 # Agent imports
@@ -31,9 +29,6 @@ def generate_prices(days=252, start=100.0):
         prices.append(prices[-1] * (1 + np.random.normal(0.0005, 0.015)))
     return prices
 
-def calculate_hash(prev_hash: str, data: str) -> str:
-    return hashlib.sha256(f"{prev_hash}{data}".encode()).hexdigest()
-
 def sep(title):
     print(f"\n{'='*60}\n  {title}\n{'='*60}")
 
@@ -42,7 +37,12 @@ def persist_to_db(ticker, agent_results, consensus_result, run_id):
     try:
         from sqlalchemy import text
         from services.shared.database import SessionLocal
-        from services.shared.models.domain import Asset, AgentOutput, FinalDecision
+        from services.shared.models.domain import Asset
+        from services.shared.ledger import (
+            ChainHeads,
+            append_agent_output,
+            append_final_decision,
+        )
         db = SessionLocal()
         db.execute(text("SELECT 1"))
     except Exception:
@@ -58,48 +58,27 @@ def persist_to_db(ticker, agent_results, consensus_result, run_id):
             db.commit()
             db.refresh(asset)
         asset_id = asset.id
-        # Persist agent outputs with hash chain
+        # Persist agent outputs with hash chain (shared chain heads keep
+        # demo rows and pipeline rows on the same chains)
+        heads = ChainHeads(db)
         for agent_name, signal, score, details in agent_results:
-            last = db.query(AgentOutput).filter(AgentOutput.agent_name == agent_name).order_by(AgentOutput.id.desc()).first()
-            prev_hash = last.hash if last and last.hash else "0" * 64
-            details_str = json.dumps(details)
-            current_hash = calculate_hash(prev_hash, f"{asset_id}{agent_name}{signal}{score}{details_str}")
-
-            out = AgentOutput(
-                asset_id=asset_id,
-                agent_name=agent_name,
-                signal=signal,
-                score=float(score),
-                details=details_str,
-                hash=current_hash,
-                previous_hash=prev_hash,
-                run_id=run_id,
-                generated_at=datetime.now(timezone.utc)
+            append_agent_output(
+                db, heads, asset_id, agent_name, signal, score, details, run_id
             )
-            db.add(out)
-        db.commit()
 
         # Persist final decision with hash chain
-        last_decision = db.query(FinalDecision).order_by(FinalDecision.id.desc()).first()
-        prev_hash = last_decision.hash if last_decision and last_decision.hash else "0" * 64
-        details_json = json.dumps({
-            "raw_score": consensus_result.details['raw_score'],
-            "agents_count": consensus_result.details['agents_count']
-        })
-        current_hash = calculate_hash(prev_hash, f"{ticker}{consensus_result.final_signal.value}{consensus_result.confidence_score}{details_json}")
-
-        final = FinalDecision(
-            ticker=ticker,
-            decision=consensus_result.final_signal.value,
-            confidence=consensus_result.confidence_score,
-            details=details_json,
-            hash=current_hash,
-            previous_hash=prev_hash,
-            run_id=run_id,
-            created_at=datetime.now(timezone.utc)
+        final = append_final_decision(
+            db, heads, ticker,
+            consensus_result.final_signal.value,
+            consensus_result.confidence_score,
+            {
+                "raw_score": consensus_result.details['raw_score'],
+                "agents_count": consensus_result.details['agents_count']
+            },
+            run_id
         )
-        db.add(final)
         db.commit()
+        current_hash = final.hash
         db.close()
         print(f"\n  [DB] Persisted to PostgreSQL | run_id: {run_id} | hash: {current_hash[:16]}...")
         return True
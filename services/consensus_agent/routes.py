@@ -2,23 +2,38 @@ from fastapi import APIRouter, Depends, HTTPException
 from services.consensus_agent.schema import ConsensusInput, ConsensusOutput
 from services.consensus_agent.rules.aggregation import aggregate_signals
 from services.shared.logger import setup_logger
+from services.shared.metrics import TimedRoute
+from services.shared.batch import BatchInput, BatchOutput, run_batch
 
 from services.shared.security import get_api_key
 
-router = APIRouter()
-logger = setup_logger("consensus_agent")
+# Times validation / compute / serialization per request
+router = APIRouter(route_class=TimedRoute)
+logger = setup_logger("consensus_agent", agent="consensus")
 
 @router.post("/decide", response_model=ConsensusOutput, dependencies=[Depends(get_api_key)])
 async def reach_consensus(data: ConsensusInput):
-    logger.info(f"Aggregating signals for {data.ticker} from {len(data.signals)} agents")
+    logger.info("Aggregating signals for %s from %d agents", data.ticker,
+                len(data.signals), extra={"ticker": data.ticker})
     try:
         result = aggregate_signals(data)
-        logger.info(f"Consensus reached for {data.ticker}: {result.final_signal} (Conf: {result.confidence_score})")
+        logger.info("Consensus reached for %s: %s (Conf: %s)", data.ticker,
+                    result.final_signal, result.confidence_score,
+                    extra={"ticker": data.ticker})
         return result
     except Exception as e:
-        logger.error(f"Error in consensus: {str(e)}")
+        logger.error("Error in consensus: %s", e, extra={"ticker": data.ticker})
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/decide/batch", response_model=BatchOutput[ConsensusOutput],
+             dependencies=[Depends(get_api_key)])
+async def reach_consensus_batch(data: BatchInput):
+    logger.info("Aggregating signals for a batch of %d tickers", len(data.items))
+    result = run_batch(data.items, ConsensusInput, aggregate_signals)
+    logger.info("Consensus batch complete: %d decided, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
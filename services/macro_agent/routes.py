@@ -1,24 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
 from services.macro_agent.schema import MacroInput, MacroOutput
-from services.macro_agent.rules.macro_analysis import analyze_macro_regime
+from services.macro_agent.rules.macro_analysis import analyze_macro_regime, RULE_VERSION
 from services.shared.logger import setup_logger
+from services.shared.metrics import TimedRoute
+from services.shared.cache import ResultCache
 
 from services.shared.security import get_api_key
 
-router = APIRouter()
-logger = setup_logger("macro_agent")
+# Times validation / compute / serialization per request
+router = APIRouter(route_class=TimedRoute)
+logger = setup_logger("macro_agent", agent="macro")
+
+# Unchanged inputs (e.g. reruns) are served from the result cache
+result_cache = ResultCache.from_env("macro_agent")
+cached_macro_regime = result_cache.wrap(analyze_macro_regime, MacroOutput, RULE_VERSION)
 
 @router.post("/analyze", response_model=MacroOutput, dependencies=[Depends(get_api_key)])
 async def analyze_macro(data: MacroInput):
-    logger.info(f"Analyzing macro data: GDP={data.gdp_growth}, Infl={data.inflation_rate}")
+    logger.info("Analyzing macro data: GDP=%s, Infl=%s", data.gdp_growth,
+                data.inflation_rate)
     try:
-        result = analyze_macro_regime(data)
-        logger.info(f"Macro analysis complete: {result.regime} -> {result.signal}")
+        result = cached_macro_regime(data)
+        logger.info("Macro analysis complete: %s -> %s", result.regime, result.signal)
         return result
     except Exception as e:
-        logger.error(f"Error in macro analysis: {str(e)}")
+        logger.error("Error in macro analysis: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats", dependencies=[Depends(get_api_key)])
+async def cache_stats():
+    return result_cache.stats()
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
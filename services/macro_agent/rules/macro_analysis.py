@@ -1,6 +1,9 @@
 from services.macro_agent.schema import MacroInput, MacroOutput
 from services.shared.models.enums import SignalType
 
+# Part of the result cache key: bump whenever the rule logic changes
+RULE_VERSION = "1"
+
 def analyze_macro_regime(data: MacroInput) -> MacroOutput:
     # 1. Determine Regime
     regime = "Neutral"
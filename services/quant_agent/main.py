@@ -6,6 +6,7 @@ from fastapi.responses import JSONResponse
 from services.quant_agent.routes import router
 from services.shared.config import settings
 from services.shared.middleware import add_cors_middleware
+from services.shared.metrics import add_metrics
 
 app = FastAPI(
     title="Quant Agent",
@@ -17,23 +18,20 @@ app = FastAPI(
 add_cors_middleware(app)
 
 app.include_router(router, prefix="/api/v1/quant", tags=["quant"])
+add_metrics(app, "quant")  # GET /metrics (Prometheus)
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
 
 @app.get("/ready")
-def readiness_check():
-    from services.shared.database import SessionLocal
-    try:
-        db = SessionLocal()
-        db.execute("SELECT 1")
+async def readiness_check():
+    from services.shared.database import database_ready
+    # Async connectivity check with a timeout: never blocks the event loop
+    if await database_ready():
         return {"status": "ready"}
-    except Exception:
-        return JSONResponse(content={"status": "not_ready"}, status_code=503)
-    finally:
-        db.close()
+    return JSONResponse(content={"status": "not_ready"}, status_code=503)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    from services.shared.serving import serve
+    serve("services.quant_agent.main:app", port=8002)  # WEB_CONCURRENCY workers
@@ -1,24 +1,106 @@
 from fastapi import APIRouter, Depends, HTTPException
-from services.quant_agent.schema import QuantInput, QuantOutput
-from services.quant_agent.rules.signals import calculate_quant_signals
-from services.shared.logger import setup_logger
 
+from services.quant_agent.rules.signals import (
+    RULE_VERSION,
+    calculate_quant_signals,
+    calculate_quant_signals_batch,
+    calculate_quant_signals_incremental,
+)
+from services.quant_agent.schema import (
+    QuantColumnsInput,
+    QuantIncrementalInput,
+    QuantIncrementalOutput,
+    QuantInput,
+    QuantOutput,
+)
+from services.shared.batch import (
+    BatchInput,
+    BatchOutput,
+    run_batch,
+    run_vectorized_batch,
+)
+from services.shared.cache import ResultCache
+from services.shared.logger import setup_logger
+from services.shared.metrics import TimedRoute
 from services.shared.security import get_api_key
 
-router = APIRouter()
-logger = setup_logger("quant_agent")
+# Rules run on the rule pool so the event loop stays free
+from services.shared.serving import run_cpu_bound
+from services.shared.wire import negotiated_body, negotiated_openapi, price_count
+
+# Times validation / compute / serialization per request
+router = APIRouter(route_class=TimedRoute)
+logger = setup_logger("quant_agent", agent="quant")
 
-@router.post("/analyze", response_model=QuantOutput, dependencies=[Depends(get_api_key)])
-async def analyze_quant(data: QuantInput):
-    logger.info(f"Analyzing ticker: {data.ticker} with {len(data.prices)} price points")
+# Unchanged inputs (e.g. reruns) are served from the result cache
+result_cache = ResultCache.from_env("quant_agent")
+cached_quant_signals = result_cache.wrap(
+    calculate_quant_signals, QuantOutput, RULE_VERSION
+)
+cached_quant_signals_batch = result_cache.wrap_batch(
+    calculate_quant_signals_batch, QuantOutput, RULE_VERSION
+)
+
+# Accepts JSON or the columnar binary format (Content-Type: application/x-price-columns)
+@router.post("/analyze", response_model=QuantOutput,
+             dependencies=[Depends(get_api_key)],
+             openapi_extra=negotiated_openapi(QuantInput))
+async def analyze_quant(
+    data: QuantInput = Depends(negotiated_body(QuantInput, QuantColumnsInput)),
+):
+    logger.info("Analyzing ticker: %s with %d price points", data.ticker,
+                price_count(data), extra={"ticker": data.ticker})
     try:
-        result = calculate_quant_signals(data)
-        logger.info(f"Analysis complete for {data.ticker}: {result.signal}")
+        result = await run_cpu_bound(cached_quant_signals, data)
+        logger.info("Analysis complete for %s: %s", data.ticker, result.signal,
+                    extra={"ticker": data.ticker})
         return result
     except Exception as e:
-        logger.error(f"Error analyzing {data.ticker}: {str(e)}")
+        logger.error("Error analyzing %s: %s", data.ticker, e,
+                     extra={"ticker": data.ticker})
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analyze/batch", response_model=BatchOutput[QuantOutput],
+             dependencies=[Depends(get_api_key)])
+async def analyze_quant_batch(data: BatchInput):
+    logger.info("Analyzing batch of %d tickers", len(data.items))
+    # Cache misses are evaluated in one vectorized pass
+    result = await run_cpu_bound(run_vectorized_batch, data.items, QuantInput,
+                                 cached_quant_signals_batch)
+    logger.info("Batch complete: %d analyzed, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
+@router.post("/analyze/incremental", response_model=QuantIncrementalOutput,
+             dependencies=[Depends(get_api_key)])
+async def analyze_quant_incremental(data: QuantIncrementalInput):
+    logger.info("Incremental analysis for %s: %d new price points", data.ticker,
+                len(data.prices), extra={"ticker": data.ticker})
+    try:
+        output = await run_cpu_bound(calculate_quant_signals_incremental, data)
+        logger.info("Analysis complete for %s: %s", data.ticker, output.result.signal,
+                    extra={"ticker": data.ticker})
+        return output
+    except Exception as e:
+        logger.error("Error analyzing %s: %s", data.ticker, e,
+                     extra={"ticker": data.ticker})
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+@router.post("/analyze/incremental/batch",
+             response_model=BatchOutput[QuantIncrementalOutput],
+             dependencies=[Depends(get_api_key)])
+async def analyze_quant_incremental_batch(data: BatchInput):
+    logger.info("Incremental analysis of %d tickers", len(data.items))
+    result = await run_cpu_bound(run_batch, data.items, QuantIncrementalInput,
+                                 calculate_quant_signals_incremental)
+    logger.info("Batch complete: %d analyzed, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
+@router.get("/cache/stats", dependencies=[Depends(get_api_key)])
+async def cache_stats():
+    return result_cache.stats()
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
@@ -1,58 +1,129 @@
-import pandas as pd
+from typing import Union
+
 import numpy as np
-from services.quant_agent.schema import QuantInput, QuantOutput
+import pandas as pd
+
+from services.quant_agent.schema import (
+    QuantColumnsInput,
+    QuantIncrementalInput,
+    QuantIncrementalOutput,
+    QuantInput,
+    QuantOutput,
+)
 from services.shared.models.enums import SignalType
+from services.shared.panel import (
+    check_min_history,
+    input_closes,
+    returns_panel,
+    right_align,
+    stack_series,
+    tail_mean,
+)
+from services.shared.rolling import RollingState
+
+MIN_HISTORY = 30
+
+# Part of the result cache key: bump whenever the rule logic changes
+RULE_VERSION = "1"
 
-def calculate_quant_signals(data: QuantInput) -> QuantOutput:
+def calculate_quant_signals(data: Union[QuantInput, QuantColumnsInput]) -> QuantOutput:
     # Schema validation ensures min_length=30, so no need to check empty here
-    
-    df = pd.DataFrame([p.dict() for p in data.prices])
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date').set_index('date')
-    
+    return calculate_quant_signals_batch([data])[data.ticker]
+
+def calculate_quant_signals_batch(
+    inputs: list[Union[QuantInput, QuantColumnsInput]]
+) -> dict[str, QuantOutput]:
+    """Evaluates many tickers in a single vectorized pass (one panel, no DataFrames)."""
+    series = [input_closes(d) for d in inputs]
+    matrix, counts = stack_series(series)
+    return _quant_panel([d.ticker for d in inputs], matrix, counts)
+
+def calculate_quant_signals_panel(prices: pd.DataFrame) -> dict[str, QuantOutput]:
+    """
+    Panel mode: `prices` is a wide frame, dates (index) x tickers (columns),
+    NaN where a ticker has no bar. Returns the same QuantOutput per ticker as
+    calculate_quant_signals on each column.
+    """
+    prices = prices.sort_index()
+    matrix, counts = right_align(prices.to_numpy(dtype=float))
+    return _quant_panel([str(c) for c in prices.columns], matrix, counts)
+
+def calculate_quant_signals_incremental(
+    data: QuantIncrementalInput
+) -> QuantIncrementalOutput:
+    """
+    Incremental mode: folds the new bars into the rolling state and evaluates
+    the signal from it (O(new bars) instead of O(history)). Matches
+    calculate_quant_signals on the full history up to float rounding.
+    """
+    state = (data.state or RollingState()).update(
+        [p.date for p in data.prices], [p.price for p in data.prices]
+    )
+    check_min_history([data.ticker], np.array([state.count]), MIN_HISTORY)
+
+    current_price = np.array([state.closes[-1]])
+    price_30d_ago = state.closes[-30]
+    result = _quant_outputs(
+        [data.ticker],
+        current_price,
+        momentum_30d=(current_price - price_30d_ago) / price_30d_ago,
+        annualized_vol=np.array([state.return_std()]) * np.sqrt(252),
+        ma_50=np.array([state.moving_average(50)]),
+        ma_200=np.array([state.moving_average(200)]),
+    )
+    return QuantIncrementalOutput(result=result[data.ticker], state=state)
+
+def _quant_panel(
+    tickers: list[str], matrix: np.ndarray, counts: np.ndarray
+) -> dict[str, QuantOutput]:
+    check_min_history(tickers, counts, MIN_HISTORY)
+
     # 1. Momentum
-    current_price = df['price'].iloc[-1]
-    price_30d_ago = df['price'].iloc[-30]
-    
+    current_price = matrix[-1]
+    price_30d_ago = matrix[-30]
+
     momentum_30d = (current_price - price_30d_ago) / price_30d_ago
-    
+
     # 2. Volatility
-    df['returns'] = df['price'].pct_change().dropna()
-    if df['returns'].empty:
-        daily_vol = 0.0
-    else:
-        daily_vol = df['returns'].std()
-        
+    daily_vol = np.nanstd(returns_panel(matrix), axis=0, ddof=1)
     annualized_vol = daily_vol * np.sqrt(252)
-    
+
     # 3. Moving Averages
-    ma_50 = df['price'].rolling(window=50).mean().iloc[-1] if len(df) >= 50 else current_price
-    ma_200 = df['price'].rolling(window=200).mean().iloc[-1] if len(df) >= 200 else current_price
-    
+    ma_50 = np.where(counts >= 50, tail_mean(matrix, 50), current_price)
+    ma_200 = np.where(counts >= 200, tail_mean(matrix, 200), current_price)
+
+    return _quant_outputs(
+        tickers, current_price, momentum_30d, annualized_vol, ma_50, ma_200
+    )
+
+def _quant_outputs(tickers: list[str], current_price: np.ndarray,
+                   momentum_30d: np.ndarray, annualized_vol: np.ndarray,
+                   ma_50: np.ndarray, ma_200: np.ndarray) -> dict[str, QuantOutput]:
     # 4. Decision Logic
-    signal = SignalType.HOLD
-    score = 0
-    
-    if momentum_30d > 0.05 and current_price > ma_50:
-        score += 1
-    if current_price > ma_200:
-        score += 1
-    if annualized_vol < 0.20:
-        score += 1
-        
-    if score >= 2:
-        signal = SignalType.BUY
-    elif momentum_30d < -0.05 or current_price < ma_200:
-        signal = SignalType.SELL
-        
-    return QuantOutput(
-        ticker=data.ticker,
-        momentum_score=round(momentum_30d, 4),
-        volatility=round(annualized_vol, 4),
-        signal=signal,
-        details={
-            "ma_50": round(ma_50, 2),
-            "ma_200": round(ma_200, 2),
-            "score": float(score)
-        }
+    score = (
+        ((momentum_30d > 0.05) & (current_price > ma_50)).astype(int)
+        + (current_price > ma_200)
+        + (annualized_vol < 0.20)
     )
+    sell = (momentum_30d < -0.05) | (current_price < ma_200)
+
+    results = {}
+    for i, ticker in enumerate(tickers):
+        signal = SignalType.HOLD
+        if score[i] >= 2:
+            signal = SignalType.BUY
+        elif sell[i]:
+            signal = SignalType.SELL
+
+        results[ticker] = QuantOutput(
+            ticker=ticker,
+            momentum_score=round(float(momentum_30d[i]), 4),
+            volatility=round(float(annualized_vol[i]), 4),
+            signal=signal,
+            details={
+                "ma_50": round(float(ma_50[i]), 2),
+                "ma_200": round(float(ma_200[i]), 2),
+                "score": float(score[i])
+            }
+        )
+    return results
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict
 from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
 from services.shared.models.enums import SignalType
+from services.shared.rolling import RollingState
+from services.shared.wire import PriceColumnsModel
+
 
 class PricePoint(BaseModel):
     date: datetime
@@ -9,11 +14,29 @@ class PricePoint(BaseModel):
 
 class QuantInput(BaseModel):
     ticker: str = Field(..., min_length=1)
-    prices: List[PricePoint] = Field(..., min_length=30, description="Minimum 30 days of data required")
+    prices: list[PricePoint] = Field(
+        ..., min_length=30, description="Minimum 30 days of data required"
+    )
+
+class QuantColumnsInput(PriceColumnsModel):
+    # Columnar wire format of QuantInput
+    min_prices = 30
+    ticker: str = Field(..., min_length=1)
 
 class QuantOutput(BaseModel):
     ticker: str
     momentum_score: float
     volatility: float
     signal: SignalType
-    details: Dict[str, float]
+    details: dict[str, float]
+
+class QuantIncrementalInput(BaseModel):
+    ticker: str = Field(..., min_length=1)
+    # State returned by the previous run (None: start from the first bar)
+    state: Optional[RollingState] = None
+    # Bars after state.last_date; older ones are ignored
+    prices: list[PricePoint] = Field(default_factory=list)
+
+class QuantIncrementalOutput(BaseModel):
+    result: QuantOutput
+    state: RollingState
@@ -1,9 +1,12 @@
-import pytest
 from datetime import datetime, timedelta
-from services.quant_agent.schema import QuantInput, PricePoint
+
+import pytest
+from pydantic import ValidationError
+
 from services.quant_agent.rules.signals import calculate_quant_signals
+from services.quant_agent.schema import PricePoint, QuantInput
 from services.shared.models.enums import SignalType
-from pydantic import ValidationError
+
 
 def generate_prices(trend="UP", volatility="LOW", days=100):
     prices = []
@@ -29,3 +32,52 @@ def test_insufficient_data_validation():
     prices = generate_prices(days=10) # Too few
     with pytest.raises(ValidationError):
         QuantInput(ticker="SHORT", prices=prices)
+
+def test_panel_matches_single_ticker():
+    import pandas as pd
+
+    from services.quant_agent.rules.signals import calculate_quant_signals_panel
+
+    inputs = [
+        QuantInput(ticker="UP", prices=generate_prices(trend="UP", days=250)),
+        QuantInput(ticker="DOWN",
+                   prices=generate_prices(trend="DOWN", volatility="HIGH", days=120)),
+        QuantInput(ticker="SHORT", prices=generate_prices(days=40)),
+    ]
+    # Wide dates x tickers frame; shorter histories leave NaN gaps
+    frame = pd.DataFrame({
+        d.ticker: pd.Series([p.price for p in d.prices],
+                            index=[p.date for p in d.prices])
+        for d in inputs
+    })
+    panel = calculate_quant_signals_panel(frame)
+
+    for d in inputs:
+        assert panel[d.ticker] == calculate_quant_signals(d)
+
+def test_panel_rejects_insufficient_history():
+    import pandas as pd
+
+    from services.quant_agent.rules.signals import calculate_quant_signals_panel
+
+    frame = pd.DataFrame({"THIN": [100.0 + i for i in range(10)]})
+    with pytest.raises(ValueError):
+        calculate_quant_signals_panel(frame)
+
+def test_incremental_matches_full_history():
+    from services.quant_agent.rules.signals import calculate_quant_signals_incremental
+    from services.quant_agent.schema import QuantIncrementalInput
+
+    prices = generate_prices(trend="UP", volatility="HIGH", days=250)
+    # Bars repeated within one request are counted once, also without a state
+    first = calculate_quant_signals_incremental(
+        QuantIncrementalInput(ticker="INC", prices=prices[:240] + prices[100:102])
+    )
+    # The next run sends the new bars (re-sent bars are ignored)
+    second = calculate_quant_signals_incremental(QuantIncrementalInput(
+        ticker="INC", state=first.state, prices=prices[235:] + prices[245:247]
+    ))
+
+    assert second.state.count == 250
+    full = calculate_quant_signals(QuantInput(ticker="INC", prices=prices))
+    assert second.result == full
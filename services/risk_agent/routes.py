@@ -1,24 +1,104 @@
 from fastapi import APIRouter, Depends, HTTPException
-from services.risk_agent.schema import RiskInput, RiskOutput
-from services.risk_agent.rules.risk_metrics import calculate_risk_metrics
-from services.shared.logger import setup_logger
 
+from services.risk_agent.rules.risk_metrics import (
+    RULE_VERSION,
+    calculate_risk_metrics,
+    calculate_risk_metrics_batch,
+    calculate_risk_metrics_incremental,
+)
+from services.risk_agent.schema import (
+    RiskBatchItem,
+    RiskColumnsInput,
+    RiskIncrementalInput,
+    RiskIncrementalOutput,
+    RiskInput,
+    RiskOutput,
+)
+from services.shared.batch import (
+    BatchInput,
+    BatchOutput,
+    run_batch,
+    run_vectorized_batch,
+)
+from services.shared.cache import ResultCache
+from services.shared.logger import setup_logger
+from services.shared.metrics import TimedRoute
 from services.shared.security import get_api_key
 
-router = APIRouter()
-logger = setup_logger("risk_agent")
+# Rules run on the rule pool so the event loop stays free
+from services.shared.serving import run_cpu_bound
+from services.shared.wire import negotiated_body, negotiated_openapi, price_count
+
+# Times validation / compute / serialization per request
+router = APIRouter(route_class=TimedRoute)
+logger = setup_logger("risk_agent", agent="risk")
 
-@router.post("/analyze", response_model=RiskOutput, dependencies=[Depends(get_api_key)])
-async def analyze_risk(data: RiskInput):
-    logger.info(f"Analyzing risk for {len(data.prices)} price points")
+# Unchanged inputs (e.g. reruns) are served from the result cache
+result_cache = ResultCache.from_env("risk_agent")
+cached_risk_metrics = result_cache.wrap(
+    calculate_risk_metrics, RiskOutput, RULE_VERSION
+)
+cached_risk_metrics_batch = result_cache.wrap_batch(
+    calculate_risk_metrics_batch, RiskOutput, RULE_VERSION
+)
+
+# Accepts JSON or the columnar binary format (Content-Type: application/x-price-columns)
+@router.post("/analyze", response_model=RiskOutput,
+             dependencies=[Depends(get_api_key)],
+             openapi_extra=negotiated_openapi(RiskInput))
+async def analyze_risk(
+    data: RiskInput = Depends(negotiated_body(RiskInput, RiskColumnsInput)),
+):
+    logger.info("Analyzing risk for %d price points", price_count(data))
     try:
-        result = calculate_risk_metrics(data)
-        logger.info(f"Risk analysis complete: DD={result.max_drawdown}, Vol={result.volatility}")
+        result = await run_cpu_bound(cached_risk_metrics, data)
+        logger.info("Risk analysis complete: DD=%s, Vol=%s", result.max_drawdown,
+                    result.volatility)
         return result
     except Exception as e:
-        logger.error(f"Error analyzing risk: {str(e)}")
+        logger.error("Error analyzing risk: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analyze/batch", response_model=BatchOutput[RiskOutput],
+             dependencies=[Depends(get_api_key)])
+async def analyze_risk_batch(data: BatchInput):
+    logger.info("Analyzing risk batch of %d tickers", len(data.items))
+    # Cache misses are evaluated in one vectorized pass
+    result = await run_cpu_bound(run_vectorized_batch, data.items, RiskBatchItem,
+                                 cached_risk_metrics_batch)
+    logger.info("Risk batch complete: %d analyzed, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
+@router.post("/analyze/incremental", response_model=RiskIncrementalOutput,
+             dependencies=[Depends(get_api_key)])
+async def analyze_risk_incremental(data: RiskIncrementalInput):
+    logger.info("Incremental risk analysis for %s: %d new price points", data.ticker,
+                len(data.prices), extra={"ticker": data.ticker})
+    try:
+        output = await run_cpu_bound(calculate_risk_metrics_incremental, data)
+        logger.info("Risk analysis complete: DD=%s, Vol=%s", output.result.max_drawdown,
+                    output.result.volatility, extra={"ticker": data.ticker})
+        return output
+    except Exception as e:
+        logger.error("Error analyzing risk: %s", e, extra={"ticker": data.ticker})
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+@router.post("/analyze/incremental/batch",
+             response_model=BatchOutput[RiskIncrementalOutput],
+             dependencies=[Depends(get_api_key)])
+async def analyze_risk_incremental_batch(data: BatchInput):
+    logger.info("Incremental risk analysis of %d tickers", len(data.items))
+    result = await run_cpu_bound(run_batch, data.items, RiskIncrementalInput,
+                                 calculate_risk_metrics_incremental)
+    logger.info("Risk batch complete: %d analyzed, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
+@router.get("/cache/stats", dependencies=[Depends(get_api_key)])
+async def cache_stats():
+    return result_cache.stats()
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
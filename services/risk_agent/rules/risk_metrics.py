@@ -1,49 +1,129 @@
-import pandas as pd
+from collections.abc import Mapping
+from typing import Union
+
 import numpy as np
-from services.risk_agent.schema import RiskInput, RiskOutput
+import pandas as pd
+
+from services.risk_agent.schema import (
+    RiskBatchItem,
+    RiskColumnsInput,
+    RiskIncrementalInput,
+    RiskIncrementalOutput,
+    RiskInput,
+    RiskOutput,
+)
+from services.shared.panel import (
+    check_min_history,
+    input_closes,
+    returns_panel,
+    right_align,
+    stack_series,
+)
+from services.shared.rolling import RollingState
 
-def calculate_risk_metrics(data: RiskInput) -> RiskOutput:
+MIN_HISTORY = 30
+DEFAULT_TARGET_VOLATILITY = 0.15
+
+# Part of the result cache key: bump whenever the rule logic changes
+RULE_VERSION = "1"
+
+def calculate_risk_metrics(data: Union[RiskInput, RiskColumnsInput]) -> RiskOutput:
     # No need to check length < 30 due to Pydantic validator
-    
-    df = pd.DataFrame([p.dict() for p in data.prices])
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date').set_index('date')
-    
+    matrix, counts = stack_series([input_closes(data)])
+    return _risk_panel(["input"], matrix, counts, np.array([data.target_volatility]))[0]
+
+def calculate_risk_metrics_batch(inputs: list[RiskBatchItem]) -> dict[str, RiskOutput]:
+    """Evaluates many tickers in a single vectorized pass (one panel, no DataFrames)."""
+    tickers = [d.ticker for d in inputs]
+    series = [input_closes(d) for d in inputs]
+    matrix, counts = stack_series(series)
+    target_vol = np.array([d.target_volatility for d in inputs], dtype=float)
+    return dict(zip(tickers, _risk_panel(tickers, matrix, counts, target_vol)))
+
+def calculate_risk_metrics_panel(
+    prices: pd.DataFrame,
+    target_volatility: Union[float, Mapping[str, float]] = DEFAULT_TARGET_VOLATILITY,
+) -> dict[str, RiskOutput]:
+    """
+    Panel mode: `prices` is a wide frame, dates (index) x tickers (columns),
+    NaN where a ticker has no bar. `target_volatility` is one value for the
+    whole universe or a per-ticker mapping. Returns the same RiskOutput per
+    ticker as calculate_risk_metrics on each column.
+    """
+    prices = prices.sort_index()
+    tickers = [str(c) for c in prices.columns]
+    matrix, counts = right_align(prices.to_numpy(dtype=float))
+    if isinstance(target_volatility, Mapping):
+        target_vol = np.array([
+            target_volatility.get(t, DEFAULT_TARGET_VOLATILITY) for t in tickers
+        ], dtype=float)
+    else:
+        target_vol = np.full(len(tickers), float(target_volatility))
+    return dict(zip(tickers, _risk_panel(tickers, matrix, counts, target_vol)))
+
+def calculate_risk_metrics_incremental(
+    data: RiskIncrementalInput
+) -> RiskIncrementalOutput:
+    """
+    Incremental mode: folds the new bars into the rolling state (running peak,
+    Welford volatility) and evaluates the metrics from it. Matches
+    calculate_risk_metrics on the full history up to float rounding.
+    """
+    state = (data.state or RollingState()).update(
+        [p.date for p in data.prices], [p.price for p in data.prices]
+    )
+    check_min_history([data.ticker], np.array([state.count]), MIN_HISTORY)
+
+    result = _risk_outputs(
+        max_drawdown=np.array([state.max_drawdown]),
+        annualized_vol=np.array([state.return_std()]) * np.sqrt(252),
+        target_vol=np.array([data.target_volatility]),
+    )
+    return RiskIncrementalOutput(result=result[0], state=state)
+
+def _risk_panel(tickers: list[str], matrix: np.ndarray, counts: np.ndarray,
+                target_vol: np.ndarray) -> list[RiskOutput]:
+    check_min_history(tickers, counts, MIN_HISTORY)
+
+    # Single returns computation shared by drawdown and volatility
+    returns = returns_panel(matrix)
+
     # 1. Max Drawdown
-    # Protection against zero division is handled by schema gt=0 on price
-    cumulative_returns = (1 + df['price'].pct_change().fillna(0)).cumprod()
-    peak = cumulative_returns.expanding(min_periods=1).max()
-    
-    # Avoid division by zero if peak is somehow 0 (impossible with positive prices)
+    # Protection against zero division is handled by schema gt=0 on price.
+    # Padding rows get a 0 return, so they sit at the starting value (1.0)
+    growth = 1 + np.nan_to_num(returns, nan=0.0)
+    cumulative_returns = np.vstack(
+        [np.ones((1, matrix.shape[1])), np.cumprod(growth, axis=0)]
+    )
+    peak = np.maximum.accumulate(cumulative_returns, axis=0)
+
     drawdown = (cumulative_returns / peak) - 1
-    max_drawdown = drawdown.min()
-    
+    max_drawdown = drawdown.min(axis=0)
+
     # 2. Volatility
-    daily_returns = df['price'].pct_change().dropna()
-    if daily_returns.empty:
-        annualized_vol = 0.0
-    else:
-        annualized_vol = daily_returns.std() * np.sqrt(252)
-    
+    annualized_vol = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252)
+
+    return _risk_outputs(max_drawdown, annualized_vol, target_vol)
+
+def _risk_outputs(max_drawdown: np.ndarray, annualized_vol: np.ndarray,
+                  target_vol: np.ndarray) -> list[RiskOutput]:
     # 3. Risk Adjustment
-    target_vol = data.target_volatility
-    
-    if annualized_vol < 1e-6: # Prevent division by zero logic
-        exposure = 1.0 # No volatility? Full exposure (theoretical)
-    else:
-        exposure = target_vol / annualized_vol
-        
-    exposure = min(exposure, 1.0)
-    
-    if max_drawdown < -0.20:
-        exposure = exposure * 0.5
-        
-    return RiskOutput(
-        max_drawdown=round(float(max_drawdown), 4),
-        volatility=round(float(annualized_vol), 4),
-        risk_adjusted_exposure=round(float(exposure), 2),
-        details={
-            "drawdown_warning": bool(max_drawdown < -0.15),
-            "volatility_warning": bool(annualized_vol > target_vol)
-        }
-    )
+    # No volatility? Full exposure (theoretical); also prevents division by zero
+    with np.errstate(divide="ignore"):
+        exposure = np.where(annualized_vol < 1e-6, 1.0, target_vol / annualized_vol)
+
+    exposure = np.minimum(exposure, 1.0)
+    exposure = np.where(max_drawdown < -0.20, exposure * 0.5, exposure)
+
+    return [
+        RiskOutput(
+            max_drawdown=round(float(max_drawdown[i]), 4),
+            volatility=round(float(annualized_vol[i]), 4),
+            risk_adjusted_exposure=round(float(exposure[i]), 2),
+            details={
+                "drawdown_warning": bool(max_drawdown[i] < -0.15),
+                "volatility_warning": bool(annualized_vol[i] > target_vol[i])
+            }
+        )
+        for i in range(len(max_drawdown))
+    ]
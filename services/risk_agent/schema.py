@@ -1,17 +1,43 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
 from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from services.shared.rolling import RollingState
+from services.shared.wire import PriceColumnsModel
+
 
 class PricePoint(BaseModel):
     date: datetime
     price: float = Field(..., gt=0)
 
 class RiskInput(BaseModel):
-    prices: List[PricePoint] = Field(..., min_length=30)
+    prices: list[PricePoint] = Field(..., min_length=30)
     target_volatility: float = Field(0.15, gt=0, le=1.0) 
 
+class RiskColumnsInput(PriceColumnsModel):
+    # Columnar wire format of RiskInput
+    min_prices = 30
+    target_volatility: float = Field(0.15, gt=0, le=1.0)
+
+class RiskBatchItem(RiskInput):
+    # Batch results are keyed by ticker; single requests don't need one
+    ticker: str = Field(..., min_length=1)
+
 class RiskOutput(BaseModel):
     max_drawdown: float
     volatility: float
     risk_adjusted_exposure: float = Field(..., ge=0.0, le=1.0)
-    details: Dict[str, bool]
+    details: dict[str, bool]
+
+class RiskIncrementalInput(BaseModel):
+    ticker: str = Field(..., min_length=1)
+    # State returned by the previous run (None: start from the first bar)
+    state: Optional[RollingState] = None
+    # Bars after state.last_date; older ones are ignored
+    prices: list[PricePoint] = Field(default_factory=list)
+    target_volatility: float = Field(0.15, gt=0, le=1.0)
+
+class RiskIncrementalOutput(BaseModel):
+    result: RiskOutput
+    state: RollingState
@@ -1,7 +1,10 @@
-import pytest
 from datetime import datetime, timedelta
-from services.risk_agent.schema import RiskInput, PricePoint
+
+import pytest
+
 from services.risk_agent.rules.risk_metrics import calculate_risk_metrics
+from services.risk_agent.schema import PricePoint, RiskInput
+
 
 def generate_prices(volatility="LOW", crash=False, days=100):
     prices = []
@@ -29,3 +32,41 @@ def test_risk_crash_drawdown():
     result = calculate_risk_metrics(data)
     assert result.max_drawdown < -0.20
     assert result.risk_adjusted_exposure < 1.0
+
+def test_risk_panel_matches_single_ticker():
+    import pandas as pd
+
+    from services.risk_agent.rules.risk_metrics import calculate_risk_metrics_panel
+
+    series = {
+        "CALM": generate_prices(volatility="LOW", days=250),
+        "CRASH": generate_prices(volatility="HIGH", crash=True, days=120),
+    }
+    frame = pd.DataFrame({
+        t: pd.Series([p.price for p in prices], index=[p.date for p in prices])
+        for t, prices in series.items()
+    })
+    panel = calculate_risk_metrics_panel(frame, {"CALM": 0.15, "CRASH": 0.25})
+
+    for ticker, target in (("CALM", 0.15), ("CRASH", 0.25)):
+        data = RiskInput(prices=series[ticker], target_volatility=target)
+        assert panel[ticker] == calculate_risk_metrics(data)
+    assert panel["CRASH"].max_drawdown < -0.20
+
+def test_incremental_matches_full_history():
+    from services.risk_agent.rules.risk_metrics import (
+        calculate_risk_metrics_incremental,
+    )
+    from services.risk_agent.schema import RiskIncrementalInput
+
+    prices = generate_prices(volatility="HIGH", crash=True, days=250)
+    state = None
+    for start in range(0, 250, 50):  # One run per 50 new bars
+        # Each run repeats one of its own bars
+        new_bars = prices[start:start + 50] + [prices[start + 10]]
+        output = calculate_risk_metrics_incremental(
+            RiskIncrementalInput(ticker="INC", state=state, prices=new_bars)
+        )
+        state = output.state
+
+    assert output.result == calculate_risk_metrics(RiskInput(prices=prices))
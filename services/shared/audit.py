@@ -0,0 +1,130 @@
+"""
+Hash-chain verification.
+
+Each chain is streamed in id order with a server-side cursor (yield_per), so
+memory stays flat whatever the size of the ledger. Verification can resume
+from a checkpoint (id and hash of the last row verified on a previous pass):
+the checkpointed row is re-checked and only newer rows are hashed.
+"""
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from services.shared.ledger import (
+    FINAL_DECISION_CHAIN,
+    GENESIS_HASH,
+    agent_chain,
+    calculate_hash,
+)
+from services.shared.models.domain import AgentOutput, FinalDecision
+
+# Rows fetched per round-trip while streaming a chain
+VERIFY_FETCH_SIZE = 10_000
+
+def list_chains(db: Session) -> list[str]:
+    """Every agent chain present in agent_outputs, plus the final decision chain."""
+    names = select(AgentOutput.agent_name).distinct().order_by(AgentOutput.agent_name)
+    agents = db.execute(names).scalars()
+    return [agent_chain(a) for a in agents] + [FINAL_DECISION_CHAIN]
+
+def _chain_table(chain: str):
+    """Returns (model, hashed columns in hash order, filter) for a chain."""
+    if chain == FINAL_DECISION_CHAIN:
+        # pipeline: f"{ticker}{decision}{confidence}{details_json}"
+        columns = (FinalDecision.ticker, FinalDecision.decision,
+                   FinalDecision.confidence, FinalDecision.details)
+        return FinalDecision, columns, None
+    # pipeline: f"{asset_id}{agent}{signal}{score}{details_str}" (score as stored)
+    agent_name = chain.split(":", 1)[1]
+    columns = (AgentOutput.asset_id, AgentOutput.agent_name, AgentOutput.signal,
+               AgentOutput.score, AgentOutput.details)
+    return AgentOutput, columns, AgentOutput.agent_name == agent_name
+
+def chain_rows(db: Session, chain: str, after_id: int = 0):
+    """Streams (id, previous_hash, hash, *hashed columns) of `chain` past `after_id`."""
+    model, columns, condition = _chain_table(chain)
+    stmt = select(model.id, model.previous_hash, model.hash, *columns)
+    stmt = stmt.where(model.id > after_id)
+    if condition is not None:
+        stmt = stmt.where(condition)
+    stmt = stmt.order_by(model.id).execution_options(yield_per=VERIFY_FETCH_SIZE)
+    return db.execute(stmt)
+
+def verify_chain(db: Session, chain: str,
+                 checkpoint: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """
+    Verifies `chain` from the genesis hash, or from `checkpoint`
+    ({"last_id", "hash"}) when given. Stops at the first broken link.
+    Returns a report dict; last_id/hash are the new checkpoint when valid.
+    """
+    started = time.perf_counter()
+    last_id, expected_prev = 0, GENESIS_HASH
+    report = {"chain": chain, "valid": True, "rows": 0, "error": None}
+
+    if checkpoint:
+        last_id, expected_prev = checkpoint["last_id"], checkpoint["hash"]
+    if last_id:
+        # The checkpoint is only trusted if the row it points at is unchanged
+        model = _chain_table(chain)[0]
+        stored = db.execute(select(model.hash).where(model.id == last_id)).scalar()
+        if stored != expected_prev:
+            error = f"[CHECKPOINT MISMATCH] ID {last_id}: stored hash {stored}"
+            report.update(valid=False, error=error)
+
+    if report["valid"]:
+        for row in chain_rows(db, chain, last_id):
+            row_id, previous_hash, stored_hash = row[0], row[1], row[2]
+            if previous_hash != expected_prev:
+                error = (f"[BROKEN CHAIN] ID {row_id}: expected prev {expected_prev}, "
+                         f"got {previous_hash}")
+                report.update(valid=False, error=error)
+                break
+            data_str = "".join(f"{value}" for value in row[3:])
+            calculated_hash = calculate_hash(expected_prev, data_str)
+            if stored_hash != calculated_hash:
+                error = (f"[TAMPER DETECTED] ID {row_id}: "
+                         f"calculated {calculated_hash}, stored {stored_hash}")
+                report.update(valid=False, error=error)
+                break
+            expected_prev, last_id = stored_hash, row_id
+            report["rows"] += 1
+
+    seconds = time.perf_counter() - started
+    report.update(last_id=last_id, hash=expected_prev, seconds=seconds)
+    return report
+
+def _verify_in_process(db_uri: str, chain: str,
+                       checkpoint: Optional[dict[str, Any]]) -> dict[str, Any]:
+    # Runs in a worker process: engines and sessions can't cross process boundaries
+    engine = create_engine(db_uri)
+    db = sessionmaker(bind=engine)()
+    try:
+        return verify_chain(db, chain, checkpoint)
+    finally:
+        db.close()
+        engine.dispose()
+
+def verify_chains(db_uri: str, chains: Iterable[str],
+                  checkpoints: Optional[dict[str, Any]] = None,
+                  workers: int = 1) -> list[dict[str, Any]]:
+    """
+    Verifies independent chains in parallel, one worker process per chain
+    (hashing is CPU bound). Returns the reports in `chains` order.
+    """
+    chains = list(chains)
+    checkpoints = checkpoints or {}
+    if workers <= 1 or len(chains) <= 1:
+        return [
+            _verify_in_process(db_uri, chain, checkpoints.get(chain))
+            for chain in chains
+        ]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chains))) as pool:
+        futures = [
+            pool.submit(_verify_in_process, db_uri, chain, checkpoints.get(chain))
+            for chain in chains
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,76 @@
+from typing import Any, Callable, Generic, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+# Upper bound on items per batch request (keeps a single request bounded in
+# memory and latency; the pipeline chunks its universe below this)
+MAX_BATCH_SIZE = 1000
+
+T = TypeVar("T")
+
+class BatchInput(BaseModel):
+    # Items are validated one by one so a bad ticker fails alone, not the batch
+    items: list[dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchOutput(BaseModel, Generic[T]):
+    results: dict[str, T] = Field(default_factory=dict)
+    errors: dict[str, str] = Field(default_factory=dict)
+
+def item_key(item: dict[str, Any], index: int) -> str:
+    """Results are keyed by ticker; items without one fall back to their position."""
+    ticker = item.get("ticker") if isinstance(item, dict) else None
+    return ticker if isinstance(ticker, str) and ticker else f"item_{index}"
+
+def format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+def validate_items(
+    items: list[dict[str, Any]], model: type[BaseModel]
+) -> tuple[dict[str, BaseModel], dict[str, str]]:
+    """Validates each item against `model`: (valid items by key, errors by key)."""
+    valid: dict[str, BaseModel] = {}
+    errors: dict[str, str] = {}
+    for index, item in enumerate(items):
+        key = item_key(item, index)
+        if key in valid or key in errors:
+            errors[key] = "Duplicate ticker in batch"
+            valid.pop(key, None)
+            continue
+        try:
+            valid[key] = model.model_validate(item)
+        except ValidationError as e:
+            errors[key] = format_validation_error(e)
+    return valid, errors
+
+def run_batch(
+    items: list[dict[str, Any]], model: type[BaseModel], rule: Callable[[Any], T]
+) -> BatchOutput:
+    """Validates and evaluates every item independently, collecting per-item errors."""
+    valid, errors = validate_items(items, model)
+    results: dict[str, T] = {}
+    for key, data in valid.items():
+        try:
+            results[key] = rule(data)
+        except Exception as e:
+            errors[key] = str(e)
+    return BatchOutput(results=results, errors=errors)
+
+def run_vectorized_batch(
+    items: list[dict[str, Any]], model: type[BaseModel],
+    batch_rule: Callable[[list[Any]], dict[str, T]],
+) -> BatchOutput:
+    """
+    Like run_batch, but evaluates all valid items in one call to `batch_rule`
+    (a vectorized engine returning results keyed by ticker).
+    """
+    valid, errors = validate_items(items, model)
+    results: dict[str, T] = {}
+    if valid:
+        try:
+            results = batch_rule(list(valid.values()))
+        except Exception as e:
+            errors.update({key: str(e) for key in valid})
+    return BatchOutput(results=results, errors=errors)
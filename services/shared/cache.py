@@ -0,0 +1,191 @@
+"""
+Content-addressed result cache for the agents' rule engines.
+
+Rules are pure functions of their input, so a result is keyed by a hash of
+the canonicalized input plus the rule version (bump RULE_VERSION in a rules
+module whenever its logic changes). Two tiers:
+
+- in-process LRU with TTL (always on, per worker);
+- optional shared tier (Redis, RESULT_CACHE_URL) reused across workers and
+  replicas. Shared tier failures are logged and treated as misses.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from services.shared.logger import setup_logger
+from services.shared.metrics import CACHE_LOOKUPS
+
+logger = setup_logger("result_cache")
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL", "")
+
+T = TypeVar("T", bound=BaseModel)
+
+def input_hash(namespace: str, version: str, data: BaseModel) -> str:
+    """SHA-256 of the canonical JSON of `data` (sorted keys, no whitespace)."""
+    canonical = json.dumps(
+        data.model_dump(mode="json"), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(f"{namespace}:{version}:{canonical}".encode()).hexdigest()
+
+class RedisTier:
+    """Shared tier: results stored as JSON with a TTL."""
+
+    def __init__(self, url: str, ttl: int):
+        import redis  # Optional dependency, only needed with RESULT_CACHE_URL
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self.client.set(key, value, ex=self.ttl)
+
+class ResultCache:
+    def __init__(self, namespace: str, maxsize: int = RESULT_CACHE_SIZE,
+                 ttl: int = RESULT_CACHE_TTL, shared=None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0, "shared_hits": 0, "misses": 0,
+            "evictions": 0, "expirations": 0, "shared_errors": 0,
+        }
+
+    @classmethod
+    def from_env(cls, namespace: str) -> "ResultCache":
+        shared = None
+        if RESULT_CACHE_URL:
+            try:
+                shared = RedisTier(RESULT_CACHE_URL, RESULT_CACHE_TTL)
+            except ImportError:
+                logger.warning("RESULT_CACHE_URL is set but the redis package is not "
+                               "installed; using the in-process tier only")
+        return cls(namespace, shared=shared)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str, model: type[T]) -> Optional[T]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    CACHE_LOOKUPS.labels(self.namespace, "hit").inc()
+                    return value
+                del self._entries[key]
+                self.counters["expirations"] += 1
+
+        if self.shared is not None:
+            try:
+                raw = self.shared.get(key)
+            except Exception as e:
+                logger.warning("Shared cache read failed: %s", e)
+                self._count("shared_errors")
+                raw = None
+            value = None
+            if raw is not None:
+                try:
+                    value = model.model_validate_json(raw)
+                except ValueError as e:
+                    # Stale or foreign entry: recomputed and overwritten by set()
+                    logger.warning("Shared cache entry %s is invalid: %s", key, e)
+                    self._count("shared_errors")
+            if value is not None:
+                self._store(key, value)
+                self._count("shared_hits")
+                CACHE_LOOKUPS.labels(self.namespace, "shared_hit").inc()
+                return value
+
+        self._count("misses")
+        CACHE_LOOKUPS.labels(self.namespace, "miss").inc()
+        return None
+
+    def set(self, key: str, value: BaseModel) -> None:
+        self._store(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value.model_dump_json())
+            except Exception as e:
+                logger.warning("Shared cache write failed: %s", e)
+                self._count("shared_errors")
+
+    def _store(self, key: str, value: BaseModel) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), maxsize=self.maxsize,
+                         ttl=self.ttl)
+        hits = stats["hits"] + stats["shared_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["shared"] = self.shared is not None
+        return stats
+
+    def wrap(self, rule: Callable[[Any], T], output: type[T],
+             version: str) -> Callable[[Any], T]:
+        """Single-input rule -> cached rule."""
+        def cached_rule(data: BaseModel) -> T:
+            key = input_hash(self.namespace, version, data)
+            result = self.get(key, output)
+            if result is None:
+                result = rule(data)
+                self.set(key, result)
+            return result
+        return cached_rule
+
+    def wrap_batch(
+        self, batch_rule: Callable[[list[Any]], dict[str, T]], output: type[T],
+        version: str
+    ) -> Callable[[list[Any]], dict[str, T]]:
+        """Vectorized rule (results keyed by ticker) -> cached rule run on misses."""
+        def cached_batch_rule(inputs: list[BaseModel]) -> dict[str, T]:
+            results: dict[str, T] = {}
+            misses, miss_keys = [], {}
+            for data in inputs:
+                key = input_hash(self.namespace, version, data)
+                result = self.get(key, output)
+                if result is None:
+                    misses.append(data)
+                    miss_keys[data.ticker] = key
+                else:
+                    results[data.ticker] = result
+            if misses:
+                for ticker, result in batch_rule(misses).items():
+                    self.set(miss_keys[ticker], result)
+                    results[ticker] = result
+            return {
+                data.ticker: results[data.ticker]
+                for data in inputs if data.ticker in results
+            }
+        return cached_batch_rule
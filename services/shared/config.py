@@ -12,13 +12,28 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "admin")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "portfolio_db")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
+
+    # Connection pool (per engine, i.e. per process; sync and async engines each
+    # have one). Timeout: seconds waiting for a free connection; recycle: seconds
+    # before a connection is replaced.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
+        return self._database_uri("postgresql")
+
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        return self._database_uri("postgresql+asyncpg")
+
+    def _database_uri(self, scheme: str) -> str:
         import urllib.parse
         encoded_user = urllib.parse.quote_plus(self.POSTGRES_USER)
         encoded_password = urllib.parse.quote_plus(self.POSTGRES_PASSWORD)
-        return f"postgresql://{encoded_user}:{encoded_password}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        return f"{scheme}://{encoded_user}:{encoded_password}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
     # MinIO / S3
     MINIO_ENDPOINT: str = os.getenv("MINIO_ENDPOINT", "localhost:9000")
@@ -1,9 +1,23 @@
-from sqlalchemy import create_engine
+import asyncio
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+
 from services.shared.config import settings
 from services.shared.models.base import Base
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+
+def pool_options():
+    """Pool settings shared by the sync and async engines."""
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -12,3 +26,59 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# --- Async (asyncpg) ---
+# Created on first use: the driver is only needed by the code paths using it.
+
+_async_engine = None
+_async_session_factory = None
+
+def create_async_db_engine(url: str = None, **options):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or settings.SQLALCHEMY_ASYNC_DATABASE_URI
+    if url.startswith("postgresql"):
+        options = {**pool_options(), **options}
+    return create_async_engine(url, **options)
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_session_factory = async_sessionmaker(get_async_engine(), autoflush=False,
+                                                    expire_on_commit=False)
+    return _async_session_factory
+
+async def get_async_db():
+    """FastAPI dependency: an AsyncSession, closed after the request."""
+    async with get_async_session_factory()() as db:
+        yield db
+
+async def database_ready(timeout: float = 2.0) -> bool:
+    """SELECT 1 within `timeout` seconds, without blocking the event loop."""
+    try:
+        try:
+            async_engine = get_async_engine()
+        except ImportError:
+            # No asyncpg: run the sync check on a thread instead
+            return await asyncio.wait_for(asyncio.to_thread(_sync_ready), timeout)
+
+        async def check():
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        await asyncio.wait_for(check(), timeout)
+        return True
+    except Exception:
+        return False
+
+def _sync_ready() -> bool:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return True
@@ -0,0 +1,247 @@
+import hashlib
+import json
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from services.shared.models.domain import AgentOutput, ChainHead, FinalDecision
+
+GENESIS_HASH = "0" * 64
+FINAL_DECISION_CHAIN = "final_decisions"
+
+def calculate_hash(prev_hash: str, data: str) -> str:
+    """Creates a SHA-256 hash chain."""
+    return hashlib.sha256(f"{prev_hash}{data}".encode()).hexdigest()
+
+def agent_chain(agent_name: str) -> str:
+    """Every agent has its own chain over agent_outputs."""
+    return f"agent_outputs:{agent_name}"
+
+class ChainConflictError(RuntimeError):
+    """Another writer advanced the chain since its head was read."""
+
+class ChainHeads:
+    """
+    Tracks the tail hash of every hash chain for the duration of a run.
+
+    Heads are read once per chain from the chain_heads table (bootstrapped
+    from the last chain row the first time a chain is seen) and then advanced
+    in memory. Each advance is a compare-and-swap UPDATE on the chain's
+    chain_heads row: the row lock it takes serializes concurrent writers until
+    commit, and a writer whose expected head is stale gets a
+    ChainConflictError instead of forking the chain. On conflict the caller
+    rolls back, calls invalidate() and retries.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._heads: dict[str, str] = {}
+
+    def seed(self, chains: Iterable[str]) -> None:
+        """Loads the heads of `chains` in one query (missing ones bootstrap lazily)."""
+        chains = list(chains)
+        stmt = select(ChainHead.chain, ChainHead.hash)
+        rows = self.db.execute(stmt.where(ChainHead.chain.in_(chains))).all()
+        self._heads.update({chain: hash_ for chain, hash_ in rows})
+
+    def head(self, chain: str) -> str:
+        if chain not in self._heads:
+            self._heads[chain] = self._load(chain)
+        return self._heads[chain]
+
+    def advance(self, chain: str, prev_hash: str, new_hash: str) -> None:
+        """Moves the head from `prev_hash` to `new_hash` (in the open transaction)."""
+        result = self.db.execute(
+            update(ChainHead)
+            .where(ChainHead.chain == chain, ChainHead.hash == prev_hash)
+            .values(hash=new_hash, updated_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            raise ChainConflictError(f"Chain {chain} was advanced by another writer")
+        self._heads[chain] = new_hash
+
+    def invalidate(self) -> None:
+        """Forgets cached heads; they are re-read on next use (after a rollback)."""
+        self._heads.clear()
+
+    def _load(self, chain: str) -> str:
+        row = self.db.get(ChainHead, chain, populate_existing=True)
+        if row is not None:
+            return row.hash
+
+        # First time this chain is tracked: adopt the hash of its last row
+        tail_hash = self._tail_hash(chain)
+        self.db.add(
+            ChainHead(chain=chain, hash=tail_hash, updated_at=datetime.utcnow())
+        )
+        try:
+            self.db.flush()
+        except IntegrityError as e:
+            raise ChainConflictError(
+                f"Chain {chain} was bootstrapped by another writer"
+            ) from e
+        return tail_hash
+
+    def _tail_hash(self, chain: str) -> str:
+        if chain == FINAL_DECISION_CHAIN:
+            stmt = select(FinalDecision.hash).order_by(FinalDecision.id.desc()).limit(1)
+        else:
+            agent_name = chain.split(":", 1)[1]
+            stmt = (
+                select(AgentOutput.hash)
+                .where(AgentOutput.agent_name == agent_name)
+                .order_by(AgentOutput.id.desc())
+                .limit(1)
+            )
+        return self.db.execute(stmt).scalar() or GENESIS_HASH
+
+def agent_output_row(prev_hash: str, asset_id, agent, signal, score, details,
+                     run_id) -> dict[str, Any]:
+    """Column values of the AgentOutput chained onto `prev_hash`."""
+    details_str = json.dumps(details)
+    current_hash = calculate_hash(
+        prev_hash, f"{asset_id}{agent}{signal}{score}{details_str}"
+    )
+    return {
+        "asset_id": asset_id,
+        "agent_name": agent,
+        "signal": str(signal),
+        "score": float(score) if score else 0.0,
+        "details": details_str,
+        "hash": current_hash,
+        "previous_hash": prev_hash,
+        "run_id": run_id,
+        "generated_at": datetime.utcnow()
+    }
+
+def final_decision_row(prev_hash: str, ticker, decision, confidence, details,
+                       run_id) -> dict[str, Any]:
+    """Column values of the FinalDecision chained onto `prev_hash`."""
+    details_json = json.dumps(details)
+    current_hash = calculate_hash(
+        prev_hash, f"{ticker}{decision}{confidence}{details_json}"
+    )
+    return {
+        "ticker": ticker,
+        "decision": decision,
+        "confidence": confidence,
+        "details": details_json,
+        "hash": current_hash,
+        "previous_hash": prev_hash,
+        "run_id": run_id,
+        "created_at": datetime.utcnow()
+    }
+
+def append_agent_output(db: Session, heads: ChainHeads, asset_id, agent, signal, score,
+                        details, run_id) -> AgentOutput:
+    """Adds the next AgentOutput of `agent`'s chain to the current transaction."""
+    chain = agent_chain(agent)
+    row = agent_output_row(
+        heads.head(chain), asset_id, agent, signal, score, details, run_id
+    )
+    out = AgentOutput(**row)
+    db.add(out)
+    heads.advance(chain, out.previous_hash, out.hash)
+    return out
+
+def append_final_decision(db: Session, heads: ChainHeads, ticker, decision, confidence,
+                          details, run_id) -> FinalDecision:
+    """Adds the next FinalDecision of the global chain to the current transaction."""
+    row = final_decision_row(
+        heads.head(FINAL_DECISION_CHAIN), ticker, decision, confidence, details, run_id
+    )
+    final = FinalDecision(**row)
+    db.add(final)
+    heads.advance(FINAL_DECISION_CHAIN, final.previous_hash, final.hash)
+    return final
+
+class LedgerWriter:
+    """
+    Write-behind persistence for hash-chained rows.
+
+    Rows are buffered in append order and written by flush() in a single
+    transaction: one executemany INSERT per table plus one chain_heads
+    compare-and-swap per touched chain, instead of a commit per row. Hashes
+    are computed at flush time from the chain heads, in append order, so the
+    stored chain is identical to row-by-row writes. If another writer moved a
+    head meanwhile, the batch is rolled back, re-chained on the new heads and
+    retried.
+    """
+
+    def __init__(self, db: Session, heads: ChainHeads, batch_size: int = 500,
+                 conflict_retries: int = 3):
+        self.db = db
+        self.heads = heads
+        self.batch_size = max(1, batch_size)
+        self.conflict_retries = conflict_retries
+        self._pending: list[tuple[str, tuple]] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    def add_agent_output(self, asset_id, agent, signal, score, details, run_id) -> None:
+        row = (asset_id, agent, signal, score, details, run_id)
+        self._pending.append((agent_chain(agent), row))
+
+    def add_final_decision(self, ticker, decision, confidence, details, run_id) -> None:
+        row = (ticker, decision, confidence, details, run_id)
+        self._pending.append((FINAL_DECISION_CHAIN, row))
+
+    def flush(self) -> int:
+        """Writes all buffered rows. Returns the number of rows written."""
+        if not self._pending:
+            return 0
+        for attempt in range(1, self.conflict_retries + 1):
+            try:
+                written = self._write()
+                self.db.commit()
+                self._pending.clear()
+                return written
+            except ChainConflictError:
+                self.db.rollback()
+                self.heads.invalidate()
+                if attempt == self.conflict_retries:
+                    raise
+            except Exception:
+                self.db.rollback()
+                self.heads.invalidate()
+                raise
+        return 0
+
+    def discard(self) -> None:
+        """Drops buffered rows (after a failed flush the caller gave up on)."""
+        self._pending.clear()
+
+    def _write(self) -> int:
+        outputs: list[dict[str, Any]] = []
+        decisions: list[dict[str, Any]] = []
+        start: dict[str, str] = {}
+        tail: dict[str, str] = {}
+
+        for chain, args in self._pending:
+            prev_hash = tail[chain] if chain in tail else self.heads.head(chain)
+            start.setdefault(chain, prev_hash)
+            if chain == FINAL_DECISION_CHAIN:
+                row = final_decision_row(prev_hash, *args)
+                decisions.append(row)
+            else:
+                row = agent_output_row(prev_hash, *args)
+                outputs.append(row)
+            tail[chain] = row["hash"]
+
+        for chain, prev_hash in start.items():
+            self.heads.advance(chain, prev_hash, tail[chain])
+        if outputs:
+            self.db.execute(insert(AgentOutput), outputs)
+        if decisions:
+            self.db.execute(insert(FinalDecision), decisions)
+        return len(outputs) + len(decisions)
@@ -1,14 +1,173 @@
+"""
+Logging setup shared by the agents and the pipeline.
+
+- Records are handed to a queue and written to stdout by one background
+  listener thread, so request and worker threads never block on I/O.
+- LOG_FORMAT=json emits one JSON object per line with the run_id / ticker /
+  agent fields bound to the record (setup_logger fields, log_context,
+  bind_log_fields or extra=);
+  the default text format is unchanged.
+- setup_logger() is idempotent: calling it again returns the same logger
+  without adding handlers.
+- LOG_SAMPLE_RATES ("quant_agent=0.1,pipeline=0.5") keeps that fraction of
+  the INFO-and-below lines of a logger; warnings and errors are never sampled.
+"""
+import atexit
+import contextvars
+import copy
+import itertools
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Structured fields carried by records
+CONTEXT_FIELDS = ("run_id", "ticker", "agent")
+
+# Process-wide fields (bind_log_fields) and per-task fields (log_context)
+_bound_fields: dict[str, str] = {}
+_context_fields: contextvars.ContextVar = contextvars.ContextVar("log_context",
+                                                               default=None)
+
+def bind_log_fields(**fields) -> None:
+    """
+    Sets fields on every record of this process (e.g. the pipeline's run_id);
+    None removes one.
+    """
+    for key, value in fields.items():
+        if value is None:
+            _bound_fields.pop(key, None)
+        else:
+            _bound_fields[key] = value
+
+@contextmanager
+def log_context(**fields):
+    """Adds fields to the records logged inside the block (current thread/task only)."""
+    token = _context_fields.set({**(_context_fields.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _context_fields.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the bound and context fields onto the record (in the logging thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in {**_bound_fields, **(_context_fields.get() or {})}.items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class FieldsFilter(logging.Filter):
+    """Static fields of one logger (e.g. the agent name)."""
+
+    def __init__(self, fields: dict[str, str]):
+        super().__init__()
+        self.fields = fields
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in self.fields.items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every 1/rate INFO-and-below records; higher levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class StructuredQueueHandler(QueueHandler):
+    """Enqueues records with the message rendered and the traceback apart (exc_text)."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+_sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+def _shared_queue_handler() -> QueueHandler:
+    """The process-wide QueueHandler; its listener thread is started on first use."""
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        stream = logging.StreamHandler(sys.stdout)
+        if LOG_FORMAT == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        _listener = QueueListener(records, stream, respect_handler_level=True)
+        _listener.start()
+        # Drain the queue on exit so the last lines are not lost
+        atexit.register(_listener.stop)
+        _queue_handler = StructuredQueueHandler(records)
+        _queue_handler.addFilter(ContextFilter())
+    return _queue_handler
 
-def setup_logger(name: str):
+def setup_logger(name: str, **fields):
+    """The named logger, wired to the shared queue once; `fields` go on its records."""
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    with _setup_lock:
+        handler = _shared_queue_handler()
+        if handler not in logger.handlers:
+            logger.setLevel(LOG_LEVEL)
+            logger.addHandler(handler)
+            # Records reach stdout once, through the queue
+            logger.propagate = False
+            if name in _sample_rates:
+                logger.addFilter(SamplingFilter(_sample_rates[name]))
+            if fields:
+                logger.addFilter(FieldsFilter(fields))
     return logger
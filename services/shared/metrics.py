@@ -0,0 +1,246 @@
+"""
+Prometheus metrics for the agents and the pipeline.
+
+Agents (add_metrics): GET /metrics in the Prometheus text format with
+- agent_request_duration_seconds{agent, route, stage}: stage is validation
+  (body read, decoding, pydantic, dependencies), compute (the endpoint body:
+  rules and cache), serialization (response model -> bytes) or total;
+- agent_requests_total{agent, route, status} and agent_requests_in_flight{agent};
+- rate_limit_rejections_total{scope} and result_cache_lookups_total{cache, result}.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates every worker (otherwise each scrape sees one worker).
+
+Pipeline: pipeline_stage_duration_seconds{stage} and
+pipeline_agent_call_duration_seconds{agent, endpoint, outcome}, kept in their
+own registry and written at the end of each run to PIPELINE_METRICS_FILE
+(node_exporter textfile format) and/or pushed to PIPELINE_METRICS_PUSHGATEWAY.
+
+Without prometheus_client every metric is a no-op and /metrics returns 503.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+from services.shared import tracing
+from services.shared.logger import setup_logger
+
+logger = setup_logger("metrics")
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+PIPELINE_METRICS_FILE = os.getenv("PIPELINE_METRICS_FILE", "")
+PIPELINE_METRICS_PUSHGATEWAY = os.getenv("PIPELINE_METRICS_PUSHGATEWAY", "")
+
+if PROMETHEUS_MULTIPROC_DIR:
+    # Must exist before the first metric is created
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+# 1 ms .. 30 s: rule calls are milliseconds, full-history batches seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0)
+# Pipeline stages run once per run (or per ledger flush): up to an hour
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+def _metric(kind, name, documentation, labelnames, registry=None, **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    if registry is not None:
+        kwargs["registry"] = registry
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+# --- Agents (default registry) ---
+
+REQUEST_SECONDS = _metric("Histogram", "agent_request_duration_seconds",
+                          "Agent request latency by stage", ["agent", "route", "stage"],
+                          buckets=LATENCY_BUCKETS)
+REQUESTS = _metric("Counter", "agent_requests", "Agent requests by response status",
+                   ["agent", "route", "status"])
+IN_FLIGHT = _metric("Gauge", "agent_requests_in_flight", "Agent requests being served",
+                    ["agent"], multiprocess_mode="livesum")
+RATE_LIMITED = _metric("Counter", "rate_limit_rejections", "Requests rejected with 429",
+                       ["scope"])
+CACHE_LOOKUPS = _metric("Counter", "result_cache_lookups",
+                        "Result cache lookups by outcome", ["cache", "result"])
+
+# --- Pipeline (own registry, exported per run) ---
+
+PIPELINE_REGISTRY = prometheus_client.CollectorRegistry() if prometheus_client else None
+PIPELINE_STAGE_SECONDS = _metric("Histogram", "pipeline_stage_duration_seconds",
+                                 "Pipeline stage durations", ["stage"],
+                                 registry=PIPELINE_REGISTRY, buckets=STAGE_BUCKETS)
+PIPELINE_CALL_SECONDS = _metric("Histogram", "pipeline_agent_call_duration_seconds",
+                                "Agent call latency seen by the pipeline "
+                                "(retries included)",
+                                ["agent", "endpoint", "outcome"],
+                                registry=PIPELINE_REGISTRY, buckets=LATENCY_BUCKETS)
+
+# Per-request timestamps shared by the middleware and the timed endpoint
+_request_marks: contextvars.ContextVar = contextvars.ContextVar("request_marks",
+                                                              default=None)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency (total and per stage), status and
+    in-flight requests, plus the request's trace spans when tracing is on.
+    """
+
+    def __init__(self, app, agent: str, exclude=("/metrics",)):
+        self.app = app
+        self.agent = agent
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+
+        marks = {"start": time.perf_counter()}
+        token = _request_marks.set(marks)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                marks.setdefault("response", time.perf_counter())
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.labels(self.agent).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.labels(self.agent).dec()
+            _request_marks.reset(token)
+            self.record(scope, marks, status["code"])
+
+    def record(self, scope, marks, status_code):
+        end = time.perf_counter()
+        # The route template, not the raw path, keeps the label set bounded
+        route = getattr(scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.labels(self.agent, route, "total").observe(end - marks["start"])
+        REQUESTS.labels(self.agent, route, str(status_code)).inc()
+        if "compute_start" in marks and "compute_end" in marks:
+            stages = {
+                "validation": marks["compute_start"] - marks["start"],
+                "compute": marks["compute_end"] - marks["compute_start"],
+                "serialization": marks.get("response", end) - marks["compute_end"],
+            }
+            for stage, seconds in stages.items():
+                REQUEST_SECONDS.labels(self.agent, route, stage).observe(seconds)
+        if tracing.tracing_enabled():
+            headers = dict(scope.get("headers") or [])
+            traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+            tracing.record_request_spans(f"{self.agent}_agent",
+                                         f"{scope['method']} {route}", traceparent,
+                                         marks, end, status_code)
+
+def timed_endpoint(endpoint):
+    """`endpoint` marking when its body starts and ends (the compute stage)."""
+    if not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        marks = _request_marks.get()
+        if marks is None:
+            return await endpoint(*args, **kwargs)
+        marks["compute_start"] = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            marks["compute_end"] = time.perf_counter()
+    return timed
+
+class TimedRoute(APIRoute):
+    """
+    Route class for the agent routers: splits each request into validation /
+    compute / serialization.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+def metrics_response() -> Response:
+    if prometheus_client is None:
+        return Response("prometheus_client is not installed", status_code=503)
+    registry = prometheus_client.REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(prometheus_client.generate_latest(registry),
+                    media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+def add_metrics(app, agent: str) -> None:
+    """Instruments `app` and exposes GET /metrics."""
+    app.add_middleware(MetricsMiddleware, agent=agent)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"],
+                      include_in_schema=False)
+
+def clear_multiprocess_dir() -> None:
+    """Removes the previous run's per-worker files (call before the workers start)."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+            if name.endswith(".db"):
+                os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+# --- Pipeline helpers ---
+
+@contextmanager
+def pipeline_stage(stage: str):
+    """Times a pipeline stage; also usable as a decorator."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+def export_pipeline_metrics() -> None:
+    """Writes/pushes the pipeline registry; failures are logged, never raised."""
+    if prometheus_client is None:
+        if PIPELINE_METRICS_FILE or PIPELINE_METRICS_PUSHGATEWAY:
+            logger.warning("Pipeline metrics are configured but prometheus_client is "
+                           "not installed")
+        return
+    if PIPELINE_METRICS_FILE:
+        try:
+            # Written to a temporary file and renamed: the collector never reads a
+            # partial file
+            prometheus_client.write_to_textfile(PIPELINE_METRICS_FILE,
+                                                PIPELINE_REGISTRY)
+        except Exception as e:
+            logger.warning("Could not write pipeline metrics to %s: %s",
+                           PIPELINE_METRICS_FILE, e)
+    if PIPELINE_METRICS_PUSHGATEWAY:
+        try:
+            prometheus_client.push_to_gateway(PIPELINE_METRICS_PUSHGATEWAY,
+                                              job="portfolio_pipeline",
+                                              registry=PIPELINE_REGISTRY)
+        except Exception as e:
+            logger.warning("Could not push pipeline metrics to %s: %s",
+                           PIPELINE_METRICS_PUSHGATEWAY, e)
@@ -1,2 +1,11 @@
 from .base import Base
-from .domain import Asset, Price, Fundamental, MacroData, AgentOutput
+from .domain import (
+    AgentOutput,
+    Asset,
+    ChainHead,
+    FinalDecision,
+    Fundamental,
+    MacroData,
+    Price,
+    RollingStateRecord,
+)
@@ -75,6 +75,11 @@ class AgentOutput(Base):
     run_id = Column(String, index=True)
     generated_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Per-agent hash chains are read in id order (verification, chain tail)
+        Index('idx_agent_output_chain', 'agent_name', 'id'),
+    )
+
 class FinalDecision(Base):
     __tablename__ = "final_decisions"
     
@@ -87,3 +92,20 @@ class FinalDecision(Base):
     hash = Column(String)
     previous_hash = Column(String)
     run_id = Column(String, index=True)
+
+class RollingStateRecord(Base):
+    __tablename__ = "rolling_states"
+
+    # One row per asset: quant/risk rolling state after its last processed bar
+    asset_id = Column(Integer, ForeignKey("assets.id"), primary_key=True)
+    last_date = Column(DateTime, nullable=False)
+    state = Column(String, nullable=False) # RollingState JSON
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ChainHead(Base):
+    __tablename__ = "chain_heads"
+
+    # One row per hash chain: "agent_outputs:<agent_name>" or "final_decisions"
+    chain = Column(String, primary_key=True)
+    hash = Column(String, nullable=False) # Tail hash of the chain
+    updated_at = Column(DateTime, default=datetime.utcnow)
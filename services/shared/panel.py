@@ -0,0 +1,62 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+# Panel layout shared by the vectorized quant and risk engines:
+# a (rows x tickers) float matrix where every column is one ticker's price
+# history sorted by date and right-aligned, so row -1 is each ticker's latest
+# bar and row -k is its k-th latest. Shorter histories are NaN-padded at the
+# top. Positional alignment keeps per-ticker semantics (iloc[-30], rolling
+# windows) exact even when tickers trade on different dates.
+
+def right_align(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Right-aligns a (dates x tickers) matrix with NaN gaps.
+    Returns (aligned matrix, number of valid prices per ticker).
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    valid = ~np.isnan(matrix)
+    # Stable sort on the validity mask moves NaNs to the top and keeps the
+    # chronological order of the valid prices
+    order = np.argsort(valid, axis=0, kind="stable")
+    return np.take_along_axis(matrix, order, axis=0), valid.sum(axis=0)
+
+def stack_series(series: Sequence[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Stacks chronologically sorted 1-D price arrays into a right-aligned panel."""
+    counts = np.array([len(s) for s in series], dtype=int)
+    matrix = np.full((int(counts.max(initial=0)), len(series)), np.nan)
+    for col, values in enumerate(series):
+        if len(values):
+            matrix[-len(values):, col] = values
+    return matrix, counts
+
+def sorted_closes(dates: Sequence, prices: Sequence[float]) -> np.ndarray:
+    """Orders one ticker's prices chronologically (stable for duplicate dates)."""
+    closes = np.asarray(prices, dtype=float)
+    order = np.argsort(np.asarray(dates), kind="stable")
+    return closes[order]
+
+def input_closes(data) -> np.ndarray:
+    """
+    Chronological closes of a rule input, whichever the wire format: a
+    `prices` list of PricePoint (JSON) or `dates`/`closes` arrays (columns).
+    """
+    if getattr(data, "closes", None) is not None:
+        return sorted_closes(data.dates, data.closes)
+    return sorted_closes([p.date for p in data.prices], [p.price for p in data.prices])
+
+def returns_panel(matrix: np.ndarray) -> np.ndarray:
+    """Simple returns per row (pct_change); NaN wherever a bar is missing."""
+    return matrix[1:] / matrix[:-1] - 1
+
+def tail_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last `window` rows per column, ignoring padding."""
+    return np.nanmean(matrix[-window:], axis=0)
+
+def check_min_history(tickers: list[str], counts: np.ndarray, minimum: int) -> None:
+    short = [t for t, n in zip(tickers, counts) if n < minimum]
+    if short:
+        raise ValueError(
+            f"Minimum {minimum} prices required, insufficient history for: "
+            f"{', '.join(map(str, short))}"
+        )
@@ -0,0 +1,210 @@
+"""
+Columnar on-disk cache of the prices table.
+
+Prices are kept as uncompressed Arrow IPC files partitioned by month
+(PRICE_CACHE_DIR/month=YYYY-MM.arrow, columns asset_id, date, close sorted
+by asset and date), so reads memory-map the files instead of going through
+the ORM row by row. A manifest records the last cached date of every asset:
+a refresh only fetches the rows after it and rewrites the months they fall
+in. Rows changed or inserted before an asset's last cached date are not
+picked up until a full rebuild.
+
+pyarrow is an optional dependency, imported when the cache is used.
+"""
+import json
+import os
+import shutil
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from services.shared.models.domain import Price
+
+PRICE_CACHE_DIR = os.getenv("PRICE_CACHE_DIR", "")
+
+MANIFEST = "manifest.json"
+
+# Rows fetched per round-trip while streaming the prices table
+FETCH_SIZE = 50_000
+
+def _arrow():
+    import pyarrow as pa  # Optional dependency, only needed with PRICE_CACHE_DIR
+    import pyarrow.ipc  # noqa: F401
+
+    return pa
+
+def _partition_path(directory: str, month: str) -> str:
+    return os.path.join(directory, f"month={month}.arrow")
+
+def _partition_months(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[len("month="):-len(".arrow")] for name in os.listdir(directory)
+        if name.startswith("month=") and name.endswith(".arrow")
+    )
+
+def read_manifest(directory: str) -> dict[int, datetime]:
+    """Returns {asset_id: last cached date} ({} for an empty cache)."""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        watermarks = json.load(f)["watermarks"]
+    return {
+        int(asset_id): datetime.fromisoformat(date)
+        for asset_id, date in watermarks.items()
+    }
+
+def _write_manifest(directory: str, watermarks: dict[int, datetime]) -> None:
+    tmp_path = os.path.join(directory, f"{MANIFEST}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "updated_at": datetime.utcnow().isoformat(),
+            "watermarks": {
+                str(asset_id): date.isoformat()
+                for asset_id, date in sorted(watermarks.items())
+            },
+        }, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+
+def _read_partition(directory: str, month: str):
+    """Memory-maps one month: (asset_ids, dates, closes) as zero-copy NumPy views."""
+    pa = _arrow()
+    with pa.memory_map(_partition_path(directory, month)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    columns = [
+        table.column(name).combine_chunks() for name in ("asset_id", "date", "close")
+    ]
+    return tuple(column.to_numpy(zero_copy_only=False) for column in columns)
+
+def _write_partition(directory: str, month: str, asset_ids: np.ndarray,
+                     dates: np.ndarray, closes: np.ndarray) -> None:
+    pa = _arrow()
+    table = pa.table({
+        "asset_id": pa.array(asset_ids, type=pa.int32()),
+        "date": pa.array(dates, type=pa.timestamp("us")),
+        "close": pa.array(closes, type=pa.float64()),
+    })
+    path = _partition_path(directory, month)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def _merge(old, new):
+    """
+    Concatenates two (asset_ids, dates, closes) sets, sorted, new rows winning
+    on (asset, date).
+    """
+    asset_ids, dates, closes = (np.concatenate([o, n]) for o, n in zip(old, new))
+    # Stable sort by (asset, date): among duplicates the new row comes last
+    order = np.lexsort((dates, asset_ids))
+    asset_ids, dates, closes = asset_ids[order], dates[order], closes[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (asset_ids[1:] != asset_ids[:-1]) | (dates[1:] != dates[:-1])
+    return asset_ids[last], dates[last], closes[last]
+
+def _new_rows(
+    db, watermarks: dict[int, datetime]
+) -> Iterable[tuple[int, datetime, Optional[float]]]:
+    # Assets sharing a watermark (usually all of them) are fetched in one query
+    by_watermark = defaultdict(list)
+    for asset_id, date in watermarks.items():
+        by_watermark[date].append(asset_id)
+
+    columns = select(Price.asset_id, Price.date, Price.close)
+    queries = [columns.where(Price.asset_id.not_in(list(watermarks)))]
+    for date, asset_ids in by_watermark.items():
+        queries.append(columns.where(Price.asset_id.in_(asset_ids), Price.date > date))
+    for stmt in queries:
+        yield from db.execute(stmt.execution_options(yield_per=FETCH_SIZE))
+
+def refresh_price_cache(db, directory: str = None,
+                        full: bool = False) -> dict[str, int]:
+    """
+    Brings the cache in `directory` (PRICE_CACHE_DIR by default) up to date
+    with the prices table. `full` rebuilds it from scratch.
+    Returns {"rows": new rows, "months": partitions rewritten}.
+    """
+    directory = directory or PRICE_CACHE_DIR
+    if full:
+        shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    watermarks = read_manifest(directory)
+
+    # 1. New rows, grouped by month
+    by_month = defaultdict(lambda: ([], [], []))
+    for asset_id, date, close in _new_rows(db, watermarks):
+        columns = by_month[date.strftime("%Y-%m")]
+        columns[0].append(asset_id)
+        columns[1].append(date)
+        columns[2].append(np.nan if close is None else close)
+        if asset_id not in watermarks or date > watermarks[asset_id]:
+            watermarks[asset_id] = date
+
+    # 2. Rewrite the touched months, then advance the manifest
+    # (an interrupted refresh re-fetches the same rows; the merge deduplicates them)
+    existing = set(_partition_months(directory))
+    rows = 0
+    for month, (asset_ids, dates, closes) in sorted(by_month.items()):
+        new = (
+            np.array(asset_ids, dtype=np.int32),
+            np.array(dates, dtype="datetime64[us]"),
+            np.array(closes, dtype=np.float64),
+        )
+        if month in existing:
+            new = _merge(_read_partition(directory, month), new)
+        else:
+            new = _merge(tuple(column[:0] for column in new), new)
+        _write_partition(directory, month, *new)
+        rows += len(asset_ids)
+    _write_manifest(directory, watermarks)
+    return {"rows": rows, "months": len(by_month)}
+
+def load_cached_prices(directory: str = None, asset_ids: Iterable[int] = None,
+                       start: datetime = None, end: datetime = None):
+    """
+    Reads prices from the cache, optionally restricted to `asset_ids` and to
+    dates in [start, end] (months outside the range are not opened).
+    Returns {asset_id: (dates, closes)} in date order, like loader.load_prices,
+    but as NumPy columns (datetime64[us], float64): no Python object per bar.
+    """
+    directory = directory or PRICE_CACHE_DIR
+    wanted = None
+    if asset_ids is not None:
+        wanted = np.array(sorted(set(asset_ids)), dtype=np.int32)
+    parts = defaultdict(lambda: ([], []))
+    for month in _partition_months(directory):
+        if ((start and month < start.strftime("%Y-%m"))
+                or (end and month > end.strftime("%Y-%m"))):
+            continue
+        month_assets, dates, closes = _read_partition(directory, month)
+        mask = np.ones(len(dates), dtype=bool)
+        if wanted is not None:
+            mask &= np.isin(month_assets, wanted)
+        if start:
+            mask &= dates >= np.datetime64(start, "us")
+        if end:
+            mask &= dates <= np.datetime64(end, "us")
+        if not mask.all():
+            month_assets, dates, closes = month_assets[mask], dates[mask], closes[mask]
+
+        # Rows are sorted by asset: split at the asset boundaries
+        boundaries = np.flatnonzero(np.diff(month_assets)) + 1
+        for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(month_assets)]):
+            if lo < hi:
+                asset_dates, asset_closes = parts[int(month_assets[lo])]
+                asset_dates.append(dates[lo:hi])
+                asset_closes.append(closes[lo:hi])
+
+    # Months are read in order, so per-asset concatenation keeps date order
+    return {
+        asset_id: (np.concatenate(dates), np.concatenate(closes))
+        for asset_id, (dates, closes) in parts.items()
+    }
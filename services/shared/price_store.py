@@ -0,0 +1,115 @@
+"""
+Shared price store for co-located agents.
+
+The pipeline writes the price histories of a run once, as two flat
+memory-mappable columns (int64 epoch-second dates, float64 closes) plus a
+ticker index, under PRICE_STORE_DIR/<run_id>. Agent requests then reference
+a history by run_id + ticker (Content-Type: application/x-price-ref+json)
+instead of carrying it; quant and risk map the same file (shared page cache)
+instead of each parsing its own copy.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+import numpy as np
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "")
+PRICE_REF_CONTENT_TYPE = "application/x-price-ref+json"
+
+_RUN_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+def run_path(directory: str, run_id: str) -> str:
+    # run_id comes from requests: never let it escape the store directory
+    if not _RUN_ID.match(run_id) or run_id.startswith("."):
+        raise ValueError(f"Invalid run_id: {run_id!r}")
+    return os.path.join(directory, run_id)
+
+def write_price_store(directory: str, run_id: str,
+                      histories: Mapping[str, tuple[Sequence, Sequence[float]]]) -> str:
+    """
+    Writes {ticker: (dates, closes)} (dates in order) for `run_id`.
+    The run directory appears atomically, once complete. Returns its path.
+    """
+    path = run_path(directory, run_id)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    index: dict[str, tuple[int, int]] = {}
+    date_columns, close_columns = [], []
+    offset = 0
+    for ticker, (dates, closes) in histories.items():
+        index[ticker] = (offset, len(closes))
+        date_columns.append(np.array(dates, dtype="datetime64[s]").astype(np.int64))
+        close_columns.append(np.asarray(closes, dtype=np.float64))
+        offset += len(closes)
+
+    dates = np.concatenate(date_columns) if date_columns else np.empty(0, np.int64)
+    closes = np.concatenate(close_columns) if close_columns else np.empty(0)
+    np.save(os.path.join(tmp_path, "dates.npy"), dates)
+    np.save(os.path.join(tmp_path, "closes.npy"), closes)
+    with open(os.path.join(tmp_path, "index.json"), "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+    return path
+
+def remove_price_store(directory: str, run_id: str) -> None:
+    shutil.rmtree(run_path(directory, run_id), ignore_errors=True)
+
+class PriceStore:
+    """Read-only view of one run's store; columns are memory-mapped, not read."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "index.json")) as f:
+            self.index = json.load(f)
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        self.closes = np.load(os.path.join(path, "closes.npy"), mmap_mode="r")
+
+    def columns(self, ticker: str) -> tuple[np.ndarray, np.ndarray]:
+        """(dates, closes) of `ticker`: zero-copy slices of the mapped columns."""
+        if ticker not in self.index:
+            raise ValueError(f"Ticker {ticker} not in price store")
+        offset, count = self.index[ticker]
+        return self.dates[offset:offset + count], self.closes[offset:offset + count]
+
+# Recently opened stores: path -> ((inode, mtime), PriceStore), least recent first
+_open_stores: OrderedDict[str, tuple[tuple[int, int], PriceStore]] = OrderedDict()
+_open_lock = threading.Lock()
+MAX_OPEN_STORES = 4
+
+def open_price_store(run_id: str, directory: Optional[str] = None) -> PriceStore:
+    """
+    Opens (once per process; recent runs stay mapped) the store of `run_id`.
+    A store rewritten under the same run_id (a rerun within the same second)
+    is reopened, and removed stores are unmapped so their space is freed.
+    """
+    directory = directory or PRICE_STORE_DIR
+    if not directory:
+        raise ValueError("PRICE_STORE_DIR is not configured")
+    path = run_path(directory, run_id)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+    with _open_lock:
+        for cached in [p for p in _open_stores if not os.path.isdir(p)]:
+            del _open_stores[cached]
+        if stat is None:
+            raise ValueError(f"No price store for run {run_id}")
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = _open_stores.get(path)
+        if cached is not None and cached[0] == version:
+            _open_stores.move_to_end(path)
+            return cached[1]
+        store = PriceStore(path)
+        _open_stores[path] = (version, store)
+        _open_stores.move_to_end(path)
+        while len(_open_stores) > MAX_OPEN_STORES:
+            _open_stores.popitem(last=False)
+        return store
@@ -1,36 +1,186 @@
-from fastapi import HTTPException, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+"""
+Token-bucket rate limiting.
+
+Each client key has a bucket of `limit` tokens refilled at limit/window
+tokens per second; a request takes one token or gets a 429. The state per
+key is constant (tokens + last refill time), and a bucket idle long enough
+to be full again is indistinguishable from a new one, so it is evicted.
+
+Backends:
+- MemoryBackend: per process (default);
+- RedisBackend: shared by all workers and replicas (RATE_LIMIT_URL), the
+  bucket is updated atomically by a Lua script using the Redis clock. The
+  round trip runs on the threadpool, never on the event loop.
+
+Requests carrying a known API key (RATE_LIMIT_API_KEY_QUOTAS, the platform
+key by default) are limited per key with their own quota; the rest per IP.
+"""
+import functools
+import hashlib
+import json
+import math
+import os
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from services.shared.config import settings
+from services.shared.logger import setup_logger
+from services.shared.metrics import RATE_LIMITED
+from services.shared.security import API_KEY_NAME
+
+logger = setup_logger("rate_limit")
+
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")
+# Requests per window for the platform API key (the pipeline)
+RATE_LIMIT_API_KEY_LIMIT = int(os.getenv("RATE_LIMIT_API_KEY_LIMIT", "1000"))
+# Optional JSON {api_key: requests per window}, replacing the default quota
+RATE_LIMIT_API_KEY_QUOTAS = os.getenv("RATE_LIMIT_API_KEY_QUOTAS", "")
+
+class MemoryBackend:
+    """Buckets in a dict, in least-recently-used order for idle eviction."""
+
+    def __init__(self):
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, capacity: int, rate: float) -> tuple[bool, float]:
+        """
+        Takes a token from `key`'s bucket.
+        Returns (allowed, seconds until a token is available).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.pop(key, (capacity, now, 0.0))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Kept with the time it will be full again
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._evict(now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def _evict(self, now: float) -> None:
+        # The least recently used bucket is checked first; stop at the first one
+        # still refilling
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# KEYS[1] bucket; ARGV capacity, rate. Returns {allowed, retry_after}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+if allowed == 1 then
+    return {1, '0'}
+end
+return {0, tostring((1 - tokens) / rate)}
+"""
+
+class RedisBackend:
+    """Buckets shared through Redis (or a compatible server); expire once full."""
+
+    # acquire() is a network round trip: the middleware runs it off the event loop
+    blocking = True
+
+    def __init__(self, url: str = None, client=None, prefix: str = "ratelimit:"):
+        if client is None:
+            import redis  # Optional dependency, only needed with RATE_LIMIT_URL
+
+            client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def acquire(self, key: str, capacity: int, rate: float) -> tuple[bool, float]:
+        allowed, retry_after = self._script(keys=[self.prefix + key],
+                                            args=[capacity, rate])
+        return bool(allowed), float(retry_after)
+
+def backend_from_env():
+    if RATE_LIMIT_URL:
+        try:
+            return RedisBackend(RATE_LIMIT_URL)
+        except ImportError:
+            logger.warning("RATE_LIMIT_URL is set but the redis package is not "
+                           "installed; limiting per process")
+    return MemoryBackend()
+
+def api_key_quotas() -> dict[str, int]:
+    if RATE_LIMIT_API_KEY_QUOTAS:
+        quotas = json.loads(RATE_LIMIT_API_KEY_QUOTAS)
+        return {key: int(limit) for key, limit in quotas.items()}
+    return {settings.API_KEY_SECRET: RATE_LIMIT_API_KEY_LIMIT}
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, limit: int = 100, window: int = 60):
+    def __init__(self, app, limit: int = 100, window: int = 60, backend=None,
+                 key_quotas: Optional[dict[str, int]] = None):
         """
-        Simple In-Memory Rate Limiter.
-        :param limit: Max requests per window
+        Token-bucket rate limiter.
+        :param limit: Max requests per window (per IP)
         :param window: Window execution time in seconds
+        :param backend: Bucket storage (MemoryBackend, RedisBackend);
+            from RATE_LIMIT_URL by default
+        :param key_quotas: {api_key: max requests per window};
+            from the environment by default
         """
         super().__init__(app)
         self.limit = limit
         self.window = window
-        # Storage: IP -> list of timestamps
-        # In production, use Redis!
-        self.request_history = defaultdict(list)
+        self.backend = backend if backend is not None else backend_from_env()
+        self.key_quotas = key_quotas if key_quotas is not None else api_key_quotas()
+
+    def client_key(self, request: Request) -> tuple[str, int]:
+        """(bucket key, limit): per API key with a quota, else per client IP."""
+        api_key = request.headers.get(API_KEY_NAME)
+        if api_key and api_key in self.key_quotas:
+            # Keys are not stored in the clear
+            digest = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+            return f"key:{digest}", self.key_quotas[api_key]
+        client_ip = request.client.host if request.client else "unknown"
+        return f"ip:{client_ip}", self.limit
 
     async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        now = time.time()
-        
-        # Clean old requests
-        self.request_history[client_ip] = [
-            t for t in self.request_history[client_ip] 
-            if t > now - self.window
-        ]
-        
-        # Check limit
-        if len(self.request_history[client_ip]) >= self.limit:
-            return Response("Rate limit exceeded", status_code=429)
-            
-        self.request_history[client_ip].append(now)
-        
+        key, limit = self.client_key(request)
+        try:
+            acquire = functools.partial(self.backend.acquire, key, limit,
+                                        limit / self.window)
+            if getattr(self.backend, "blocking", False):
+                allowed, retry_after = await run_in_threadpool(acquire)
+            else:
+                allowed, retry_after = acquire()
+        except Exception as e:
+            # Fail open: an unreachable shared backend must not take the service down
+            logger.warning("Rate limit backend failed: %s", e)
+            allowed, retry_after = True, 0.0
+
+        if not allowed:
+            RATE_LIMITED.labels(key.split(":", 1)[0]).inc()
+            return Response("Rate limit exceeded", status_code=429,
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
         return await call_next(request)
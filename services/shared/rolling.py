@@ -0,0 +1,89 @@
+"""
+Rolling per-ticker state for incremental quant/risk computation.
+
+Holds everything the quant and risk rules need from a price history, so a
+run only has to feed the bars added since the previous one:
+
+- the last 200 closes and running sums for the MA-50 / MA-200 windows;
+- Welford accumulators (count, mean, M2) over the daily returns;
+- the running peak close and the worst drawdown seen.
+
+The state is a function of the price history only: the pipeline persists it
+per asset and the quant and risk agents update it the same way.
+"""
+import math
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+MA_WINDOWS = (50, 200)
+
+# Closes kept in the state: the longest moving average window
+WINDOW = max(MA_WINDOWS)
+
+class RollingState(BaseModel):
+    last_date: Optional[datetime] = None
+    count: int = 0  # Bars seen since the start of the history
+    # Last WINDOW closes, oldest first
+    closes: list[float] = Field(default_factory=list)
+    sum_50: float = 0.0
+    sum_200: float = 0.0
+    # Welford accumulators over daily returns
+    n_returns: int = 0
+    mean_return: float = 0.0
+    m2_return: float = 0.0
+    # Drawdown
+    peak: float = 0.0
+    max_drawdown: float = 0.0
+
+    def update(self, dates: Sequence[datetime],
+               closes: Sequence[float]) -> "RollingState":
+        """
+        Returns a new state including the bars dated after last_date, in date
+        order (bars already included in the state are ignored).
+        """
+        state = self.model_copy(deep=True)
+        order = sorted(range(len(dates)), key=lambda i: dates[i])
+        for i in order:
+            if state.last_date is not None and dates[i] <= state.last_date:
+                continue
+            state._push(float(closes[i]))
+            state.last_date = dates[i]
+        return state
+
+    def _push(self, close: float) -> None:
+        # 1. Returns (Welford)
+        if self.closes:
+            ret = close / self.closes[-1] - 1
+            self.n_returns += 1
+            delta = ret - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self.m2_return += delta * (ret - self.mean_return)
+
+        # 2. Moving average windows
+        self.closes.append(close)
+        self.count += 1
+        self.sum_50 += close
+        if len(self.closes) > 50:
+            self.sum_50 -= self.closes[-51]
+        self.sum_200 += close
+        if len(self.closes) > WINDOW:
+            self.sum_200 -= self.closes.pop(0)
+
+        # 3. Drawdown against the running peak
+        self.peak = max(self.peak, close)
+        self.max_drawdown = min(self.max_drawdown, close / self.peak - 1)
+
+    def moving_average(self, window: int) -> float:
+        """Mean of the last `window` closes (the current close on a shorter history)."""
+        if self.count < window:
+            return self.closes[-1]
+        return getattr(self, f"sum_{window}") / window
+
+    def return_std(self) -> float:
+        """Sample standard deviation (ddof=1) of all daily returns."""
+        if self.n_returns < 2:
+            return math.nan
+        return math.sqrt(self.m2_return / (self.n_returns - 1))
@@ -0,0 +1,48 @@
+"""
+Production serving for the agent services.
+
+- WEB_CONCURRENCY uvicorn worker processes per service (the uvicorn CLI used
+  by the Dockerfiles reads the same variable), for parallelism across cores;
+- CPU-bound rule evaluation runs on a thread pool (RULE_WORKERS threads per
+  process) instead of on the event loop, so health checks and I/O keep being
+  served while a long computation is in progress. NumPy/pandas release the
+  GIL for most of their numeric work.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+RULE_WORKERS = int(os.getenv("RULE_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+
+T = TypeVar("T")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def rule_executor() -> ThreadPoolExecutor:
+    """The process-wide rule pool, created on first use (after uvicorn forks)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RULE_WORKERS,
+                                           thread_name_prefix="rule")
+        return _executor
+
+async def run_cpu_bound(fn: Callable[..., T], *args: Any) -> T:
+    """Runs fn(*args) on the rule pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(rule_executor(), functools.partial(fn, *args))
+
+def serve(app: str, port: int, workers: int = None) -> None:
+    """Runs `app` ("module:attribute", as required for several workers) with uvicorn."""
+    import uvicorn
+
+    from services.shared.metrics import clear_multiprocess_dir
+
+    # Stale per-worker metric files from the previous run would be aggregated too
+    clear_multiprocess_dir()
+    uvicorn.run(app, host="0.0.0.0", port=port, workers=workers or WEB_CONCURRENCY)
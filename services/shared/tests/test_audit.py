@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from services.shared.audit import list_chains, verify_chain, verify_chains
+from services.shared.ledger import (
+    FINAL_DECISION_CHAIN,
+    ChainHeads,
+    agent_chain,
+    append_agent_output,
+    append_final_decision,
+)
+from services.shared.models.base import Base
+from services.shared.models.domain import AgentOutput, Asset
+
+
+@pytest.fixture
+def db_uri(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'audit.db'}"
+    engine = create_engine(uri)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    asset = Asset(ticker="AUDIT", name="Audit Test")
+    db.add(asset)
+    db.commit()
+    heads = ChainHeads(db)
+    for i in range(5):
+        for agent in ("value_agent", "quant_agent"):
+            append_agent_output(
+                db, heads, asset.id, agent, "HOLD", 0.1 * (i + 1), {"i": i}, "run_1"
+            )
+        append_final_decision(db, heads, "AUDIT", "HOLD", 0.5, {"i": i}, "run_1")
+    db.commit()
+    db.close()
+    return uri
+
+@pytest.fixture
+def db(db_uri):
+    session = sessionmaker(bind=create_engine(db_uri))()
+    yield session
+    session.close()
+
+def test_parallel_verification_of_all_chains(db, db_uri):
+    chains = list_chains(db)
+    agents = [agent_chain("quant_agent"), agent_chain("value_agent")]
+    assert chains == agents + [FINAL_DECISION_CHAIN]
+
+    reports = verify_chains(db_uri, chains, workers=2)
+    assert [r["chain"] for r in reports] == chains
+    assert all(r["valid"] and r["rows"] == 5 for r in reports)
+
+def test_incremental_verification_resumes_from_checkpoint(db):
+    chain = agent_chain("value_agent")
+    first = verify_chain(db, chain)
+
+    heads = ChainHeads(db)
+    append_agent_output(db, heads, 1, "value_agent", "BUY", 0.9, {}, "run_2")
+    db.commit()
+
+    checkpoint = {"last_id": first["last_id"], "hash": first["hash"]}
+    second = verify_chain(db, chain, checkpoint)
+    assert second["valid"] and second["rows"] == 1
+
+def test_tampering_is_detected(db):
+    chain = agent_chain("quant_agent")
+    checkpoint = verify_chain(db, chain)
+    rows = db.query(AgentOutput).filter(AgentOutput.agent_name == "quant_agent")
+    row = rows.order_by(AgentOutput.id).first()
+    row.score = 0.99
+    db.commit()
+
+    report = verify_chain(db, chain)
+    assert not report["valid"] and "TAMPER" in report["error"]
+    # Rows behind a checkpoint are not re-hashed, but the checkpoint row is re-checked
+    last = db.get(AgentOutput, checkpoint["last_id"])
+    last.hash = "f" * 64
+    db.commit()
+    assert "CHECKPOINT" in verify_chain(db, chain, checkpoint)["error"]
@@ -0,0 +1,35 @@
+from services.shared.batch import run_batch
+from services.value_agent.rules.valuation import calculate_intrinsic_value
+from services.value_agent.schema import ValuationInput
+
+
+def valuation_item(ticker, **overrides):
+    item = {
+        "ticker": ticker, "roe": 0.2, "fcf": 1e8, "debt": 1e7,
+        "ebitda": 2e8, "current_price": 50.0, "shares_outstanding": 1e6
+    }
+    item.update(overrides)
+    return item
+
+def test_batch_isolates_invalid_items():
+    items = [
+        valuation_item("GOOD"),
+        valuation_item("ZERO", ebitda=0.0),  # Fails validation
+        {"roe": 0.1},  # No ticker -> keyed by position
+    ]
+    result = run_batch(items, ValuationInput, calculate_intrinsic_value)
+
+    assert list(result.results) == ["GOOD"]
+    assert "ebitda" in result.errors["ZERO"]
+    assert "item_2" in result.errors
+
+def test_batch_matches_single_ticker_rule():
+    item = valuation_item("AAPL")
+    result = run_batch([item], ValuationInput, calculate_intrinsic_value)
+    assert result.results["AAPL"] == calculate_intrinsic_value(ValuationInput(**item))
+
+def test_batch_rejects_duplicate_tickers():
+    items = [valuation_item("DUP"), valuation_item("DUP")]
+    result = run_batch(items, ValuationInput, calculate_intrinsic_value)
+    assert result.results == {}
+    assert result.errors["DUP"] == "Duplicate ticker in batch"
@@ -0,0 +1,101 @@
+from services.shared.cache import ResultCache
+from services.value_agent.rules.valuation import RULE_VERSION, calculate_intrinsic_value
+from services.value_agent.schema import ValuationInput, ValuationOutput
+
+
+def valuation_input(ticker, **overrides):
+    item = {
+        "ticker": ticker, "roe": 0.2, "fcf": 1e8, "debt": 1e7,
+        "ebitda": 2e8, "current_price": 50.0, "shares_outstanding": 1e6
+    }
+    item.update(overrides)
+    return ValuationInput(**item)
+
+class DictTier:
+    """Stand-in for the shared tier."""
+    def __init__(self, fail=False):
+        self.data, self.fail = {}, fail
+
+    def get(self, key):
+        if self.fail:
+            raise ConnectionError("down")
+        return self.data.get(key)
+
+    def set(self, key, value):
+        if self.fail:
+            raise ConnectionError("down")
+        self.data[key] = value
+
+def cached_rule(cache):
+    return cache.wrap(calculate_intrinsic_value, ValuationOutput, RULE_VERSION)
+
+def test_cached_rule_skips_unchanged_inputs():
+    calls = []
+    def rule(data):
+        calls.append(data.ticker)
+        return calculate_intrinsic_value(data)
+
+    cache = ResultCache("value_agent", maxsize=2)
+    cached = cache.wrap(rule, ValuationOutput, RULE_VERSION)
+    assert cached(valuation_input("AAPL")) == cached(valuation_input("AAPL"))
+    cached(valuation_input("AAPL", current_price=51.0))  # Changed input -> new key
+    cached(valuation_input("MSFT"))  # Evicts the least recently used entry
+
+    assert calls == ["AAPL", "AAPL", "MSFT"]
+    stats = cache.stats()
+    counts = (stats["hits"], stats["misses"], stats["evictions"], stats["size"])
+    assert counts == (1, 3, 1, 2)
+
+    # Rule version is part of the key
+    cache.wrap(rule, ValuationOutput, "2")(valuation_input("MSFT"))
+    assert calls[-1] == "MSFT" and len(calls) == 4
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache("value_agent", ttl=0)
+    cached = cache.wrap(calculate_intrinsic_value, ValuationOutput, RULE_VERSION)
+    cached(valuation_input("AAPL"))
+    cached(valuation_input("AAPL"))
+    assert cache.stats()["expirations"] == 1 and cache.stats()["hits"] == 0
+
+def test_batch_rule_only_evaluates_misses():
+    evaluated = []
+    def batch_rule(inputs):
+        evaluated.append([d.ticker for d in inputs])
+        return {d.ticker: calculate_intrinsic_value(d) for d in inputs}
+
+    cache = ResultCache("value_agent")
+    cached = cache.wrap_batch(batch_rule, ValuationOutput, RULE_VERSION)
+    cached([valuation_input("AAPL"), valuation_input("MSFT")])
+    results = cached([valuation_input(t) for t in ("MSFT", "GOOG", "AAPL")])
+
+    assert evaluated == [["AAPL", "MSFT"], ["GOOG"]]
+    assert list(results) == ["MSFT", "GOOG", "AAPL"]
+
+def test_shared_tier_is_reused_and_failures_are_misses():
+    shared = DictTier()
+    first = ResultCache("value_agent", shared=shared)
+    cached_rule(first)(valuation_input("AAPL"))
+
+    # Another worker: empty in-process tier, same shared tier
+    second = ResultCache("value_agent", shared=shared)
+    result = cached_rule(second)(valuation_input("AAPL"))
+    assert result == calculate_intrinsic_value(valuation_input("AAPL"))
+    assert second.stats()["shared_hits"] == 1
+
+    broken = ResultCache("value_agent", shared=DictTier(fail=True))
+    cached_rule(broken)(valuation_input("AAPL"))
+    assert broken.stats()["shared_errors"] == 2 and broken.stats()["misses"] == 1
+
+def test_invalid_shared_entries_are_recomputed():
+    shared = DictTier()
+    cache = ResultCache("value_agent", shared=shared)
+    cached_rule(cache)(valuation_input("AAPL"))
+    (key,) = shared.data
+    shared.data[key] = '{"unexpected": true}'  # e.g. written by an older schema
+
+    other = ResultCache("value_agent", shared=shared)
+    result = cached_rule(other)(valuation_input("AAPL"))
+    assert result == calculate_intrinsic_value(valuation_input("AAPL"))
+    assert other.stats()["misses"] == 1 and other.stats()["shared_errors"] == 1
+    # Overwritten with the recomputed result
+    assert ValuationOutput.model_validate_json(shared.data[key]) == result
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from services.quant_agent.main import app as quant_app
+from services.shared import database
+from services.shared.config import settings
+
+pytest.importorskip("aiosqlite")
+
+@pytest.fixture
+def sqlite_async_engine(monkeypatch):
+    engine = database.create_async_db_engine("sqlite+aiosqlite:///:memory:")
+    monkeypatch.setattr(database, "_async_engine", engine)
+    monkeypatch.setattr(database, "_async_session_factory", None)
+    yield engine
+    asyncio.run(engine.dispose())
+
+class HangingEngine:
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        await asyncio.sleep(10)
+
+    async def __aexit__(self, *exc):
+        return False
+
+def test_async_db_dependency(sqlite_async_engine):
+    app = FastAPI()
+
+    @app.get("/one")
+    async def one(db=Depends(database.get_async_db)):
+        return {"value": (await db.execute(text("SELECT 1"))).scalar()}
+
+    assert TestClient(app).get("/one").json() == {"value": 1}
+
+def test_ready_reflects_database(sqlite_async_engine, monkeypatch):
+    client = TestClient(quant_app)
+    assert client.get("/ready").status_code == 200
+
+    # A database that never answers fails the check at the timeout
+    monkeypatch.setattr(database, "_async_engine", HangingEngine())
+    assert asyncio.run(database.database_ready(timeout=0.1)) is False
+
+    monkeypatch.setattr(database, "_async_engine", database.create_async_db_engine("sqlite+aiosqlite:////nonexistent/dir/db.sqlite"))
+    assert client.get("/ready").status_code == 503
+
+def test_async_uri_uses_asyncpg():
+    assert settings.SQLALCHEMY_ASYNC_DATABASE_URI.startswith("postgresql+asyncpg://")
+    assert settings.SQLALCHEMY_DATABASE_URI.split("://")[1] == settings.SQLALCHEMY_ASYNC_DATABASE_URI.split("://")[1]
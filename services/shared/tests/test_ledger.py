@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from services.shared.ledger import (
+    GENESIS_HASH,
+    ChainConflictError,
+    ChainHeads,
+    LedgerWriter,
+    agent_chain,
+    append_agent_output,
+    append_final_decision,
+    calculate_hash,
+)
+from services.shared.models.base import Base
+from services.shared.models.domain import AgentOutput, Asset, ChainHead, FinalDecision
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File-backed so that independent sessions behave like separate writers
+    engine = create_engine(f"sqlite:///{tmp_path / 'ledger.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def asset_id(session_factory):
+    db = session_factory()
+    asset = Asset(ticker="CHAIN", name="Chain Test")
+    db.add(asset)
+    db.commit()
+    yield asset.id
+    db.close()
+
+def test_heads_bootstrap_from_existing_tail(session_factory, asset_id):
+    db = session_factory()
+    # Row written before chain_heads existed
+    legacy_hash = calculate_hash(GENESIS_HASH, "legacy")
+    db.add(AgentOutput(asset_id=asset_id, agent_name="quant_agent", signal="BUY",
+                       score=0.1, details="{}", hash=legacy_hash,
+                       previous_hash=GENESIS_HASH))
+    db.commit()
+
+    heads = ChainHeads(db)
+    out = append_agent_output(
+        db, heads, asset_id, "quant_agent", "HOLD", 0.2, {"k": 1}, "run_1"
+    )
+    final = append_final_decision(
+        db, heads, "CHAIN", "HOLD", 0.1, {"raw_score": 0.1}, "run_1"
+    )
+    db.commit()
+
+    assert out.previous_hash == legacy_hash
+    expected = calculate_hash(legacy_hash, f"{asset_id}quant_agentHOLD0.2{out.details}")
+    assert out.hash == expected
+    assert final.previous_hash == GENESIS_HASH
+    assert db.get(ChainHead, agent_chain("quant_agent")).hash == out.hash
+
+def test_stale_head_raises_instead_of_forking(session_factory, asset_id):
+    db_a, db_b = session_factory(), session_factory()
+    heads_a, heads_b = ChainHeads(db_a), ChainHeads(db_b)
+    append_agent_output(db_a, heads_a, asset_id, "risk_agent", "HOLD", 0.5, {}, "run_a")
+    db_a.commit()
+
+    # Writer B advances the chain behind A's back
+    heads_b.seed([agent_chain("risk_agent")])
+    b_out = append_agent_output(
+        db_b, heads_b, asset_id, "risk_agent", "SELL", 0.3, {}, "run_b"
+    )
+    db_b.commit()
+
+    with pytest.raises(ChainConflictError):
+        append_agent_output(
+            db_a, heads_a, asset_id, "risk_agent", "BUY", 0.9, {}, "run_a"
+        )
+    db_a.rollback()
+    heads_a.invalidate()
+
+    retried = append_agent_output(
+        db_a, heads_a, asset_id, "risk_agent", "BUY", 0.9, {}, "run_a"
+    )
+    db_a.commit()
+    assert retried.previous_hash == b_out.hash
+    assert db_a.query(AgentOutput).count() == 3
+
+def test_writer_matches_row_by_row_chain(session_factory, asset_id):
+    db_rows, db_bulk = session_factory(), session_factory()
+    rows = [("value_agent", "BUY", 0.8, {"a": 1}), ("quant_agent", "HOLD", None, {}),
+            ("value_agent", "SELL", 0.2, {"a": 2})]
+
+    heads = ChainHeads(db_rows)
+    expected = []
+    for agent, sig, score, details in rows:
+        out = append_agent_output(
+            db_rows, heads, asset_id, agent, sig, score, details, "run_1"
+        )
+        expected.append(out.hash)
+    final = append_final_decision(db_rows, heads, "CHAIN", "BUY", 0.7, {}, "run_1")
+    expected.append(final.hash)
+    db_rows.rollback()
+
+    writer = LedgerWriter(db_bulk, ChainHeads(db_bulk), batch_size=2)
+    for agent, sig, score, details in rows:
+        writer.add_agent_output(asset_id, agent, sig, score, details, "run_1")
+    writer.add_final_decision("CHAIN", "BUY", 0.7, {}, "run_1")
+    assert writer.full
+    assert writer.flush() == 4
+    assert writer.pending == 0
+
+    written = [o.hash for o in db_bulk.query(AgentOutput).order_by(AgentOutput.id)]
+    written.append(db_bulk.query(FinalDecision).one().hash)
+    assert written == expected
+    assert db_bulk.get(ChainHead, agent_chain("value_agent")).hash == expected[2]
+
+def test_writer_rechains_after_conflict(session_factory, asset_id):
+    db_a, db_b = session_factory(), session_factory()
+    writer = LedgerWriter(db_a, ChainHeads(db_a))
+    writer.add_agent_output(asset_id, "risk_agent", "HOLD", 0.5, {}, "run_a")
+    writer.flush()
+
+    # Writer A buffers on a head that B moves before A flushes
+    writer.add_agent_output(asset_id, "risk_agent", "BUY", 0.9, {}, "run_a")
+    heads_b = ChainHeads(db_b)
+    b_out = append_agent_output(
+        db_b, heads_b, asset_id, "risk_agent", "SELL", 0.3, {}, "run_b"
+    )
+    db_b.commit()
+
+    assert writer.flush() == 1
+    last = db_a.query(AgentOutput).order_by(AgentOutput.id.desc()).first()
+    assert last.previous_hash == b_out.hash
@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+from logging.handlers import QueueHandler
+
+from services.shared import logger as log
+
+
+def make_record(name="quant_agent", level=logging.INFO, msg="Analysis complete for %s",
+                args=("AAPL",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_setup_logger_is_idempotent():
+    first = log.setup_logger("test_idempotent")
+    second = log.setup_logger("test_idempotent")
+    assert first is second
+    assert len(first.handlers) == 1
+    assert isinstance(first.handlers[0], QueueHandler)
+    # Every logger shares one queue (and one listener thread)
+    assert log.setup_logger("test_idempotent_other").handlers == first.handlers
+
+def test_json_formatter_emits_context_fields():
+    record = make_record(run_id="20240101_000000", ticker="AAPL", agent="quant")
+    entry = json.loads(log.JsonFormatter().format(record))
+    assert entry["message"] == "Analysis complete for AAPL"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "quant_agent"
+    assert entry["run_id"] == "20240101_000000"
+    assert (entry["ticker"], entry["agent"]) == ("AAPL", "quant")
+
+def test_json_formatter_omits_missing_fields():
+    entry = json.loads(log.JsonFormatter().format(make_record()))
+    assert not {"run_id", "ticker", "agent"} & set(entry)
+
+def test_context_filter_applies_bound_and_scoped_fields():
+    context = log.ContextFilter()
+    log.bind_log_fields(run_id="run-1")
+    try:
+        with log.log_context(ticker="MSFT"):
+            inside = make_record()
+            context.filter(inside)
+        outside = make_record()
+        context.filter(outside)
+        explicit = make_record(ticker="AAPL")  # extra= wins over the context
+        with log.log_context(ticker="MSFT"):
+            context.filter(explicit)
+    finally:
+        log.bind_log_fields(run_id=None)
+    assert (inside.run_id, inside.ticker) == ("run-1", "MSFT")
+    assert outside.run_id == "run-1" and not hasattr(outside, "ticker")
+    assert explicit.ticker == "AAPL"
+
+def test_log_context_does_not_leak_to_other_threads():
+    seen = []
+    with log.log_context(ticker="MSFT"):
+        worker = threading.Thread(target=lambda: seen.append(log._context_fields.get()))
+        worker.start()
+        worker.join()
+    assert seen == [None]  # The worker ran and saw no fields
+
+def test_sampling_keeps_a_fraction_of_info_and_all_warnings():
+    sampler = log.SamplingFilter(0.25)
+    kept = sum(sampler.filter(make_record()) for _ in range(100))
+    assert kept == 25
+    assert all(sampler.filter(make_record(level=logging.WARNING)) for _ in range(10))
+    assert not any(log.SamplingFilter(0).filter(make_record()) for _ in range(10))
+
+def test_parse_sample_rates():
+    rates = log.parse_sample_rates("quant_agent=0.1, pipeline=0.5")
+    assert rates == {"quant_agent": 0.1, "pipeline": 0.5}
+    assert log.parse_sample_rates("") == {}
+
+def test_records_reach_the_listener_handlers():
+    logger = log.setup_logger("test_delivery", agent="test")
+    received = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            received.append(record)
+
+    collector = Collect()
+    log._listener.handlers = log._listener.handlers + (collector,)
+    try:
+        logger.info("Processing Asset: %s", "AAPL", extra={"ticker": "AAPL"})
+        log._listener.stop()  # Drains the queue
+        log._listener.start()
+    finally:
+        log._listener.handlers = tuple(
+            h for h in log._listener.handlers if h is not collector
+        )
+    delivered = [(r.getMessage(), r.ticker, r.agent) for r in received]
+    assert delivered == [("Processing Asset: AAPL", "AAPL", "test")]
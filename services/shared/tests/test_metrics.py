@@ -0,0 +1,81 @@
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from services.shared import metrics
+from services.shared.rate_limit import MemoryBackend, RateLimitMiddleware
+
+# services.shared.metrics falls back to no-ops without it; these tests need the
+# real client
+prometheus_client = pytest.importorskip("prometheus_client")
+
+class Item(BaseModel):
+    ticker: str
+
+def make_app(agent):
+    router = APIRouter(route_class=metrics.TimedRoute)
+
+    @router.post("/analyze/{ticker}")
+    async def analyze(ticker: str, item: Item):
+        return {"ticker": item.ticker}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1/test")
+    app.add_middleware(RateLimitMiddleware, limit=2, window=60, backend=MemoryBackend(),
+                       key_quotas={})
+    metrics.add_metrics(app, agent)
+    return app
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_requests_are_timed_by_stage_and_route_template():
+    client = TestClient(make_app("stages"))
+    ok = client.post("/api/v1/test/analyze/AAPL", json={"ticker": "AAPL"})
+    invalid = client.post("/api/v1/test/analyze/MSFT", json={"bad": 1})
+    assert (ok.status_code, invalid.status_code) == (200, 422)
+
+    route = "/api/v1/test/analyze/{ticker}"
+    for stage in ("total", "validation", "compute", "serialization"):
+        count = sample("agent_request_duration_seconds_count", agent="stages",
+                       route=route, stage=stage)
+        # The invalid body never reaches the endpoint: total only
+        assert count == (2 if stage == "total" else 1)
+    for status in ("200", "422"):
+        assert sample("agent_requests_total", agent="stages", route=route,
+                      status=status) == 1
+    assert sample("agent_requests_in_flight", agent="stages") == 0
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    client = TestClient(make_app("exposition"))
+    client.post("/api/v1/test/analyze/AAPL", json={"ticker": "AAPL"})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'agent_request_duration_seconds_bucket{agent="exposition"' in resp.text
+
+def test_rate_limit_rejections_are_counted():
+    before = sample("rate_limit_rejections_total", scope="ip")
+    client = TestClient(make_app("limited"))
+    statuses = [
+        client.post("/api/v1/test/analyze/AAPL", json={"ticker": "AAPL"}).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    assert sample("rate_limit_rejections_total", scope="ip") == before + 1
+
+def test_pipeline_metrics_are_written_to_a_textfile(tmp_path, monkeypatch):
+    path = tmp_path / "pipeline.prom"
+    monkeypatch.setattr(metrics, "PIPELINE_METRICS_FILE", str(path))
+    with metrics.pipeline_stage("load"):
+        pass
+    metrics.PIPELINE_CALL_SECONDS.labels("quant", "analyze", "ok").observe(0.02)
+    metrics.export_pipeline_metrics()
+
+    text = path.read_text()
+    assert 'pipeline_stage_duration_seconds_count{stage="load"}' in text
+    assert ('pipeline_agent_call_duration_seconds_bucket'
+            '{agent="quant",endpoint="analyze",le="0.025",outcome="ok"}') in text
+    # Agent metrics live in the default registry, not in the pipeline's file
+    assert "agent_request_duration_seconds" not in text
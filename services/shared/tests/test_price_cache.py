@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from orchestration.loader import load_prices
+from services.shared.models.base import Base
+from services.shared.models.domain import Asset, Price
+from services.shared.price_cache import (
+    load_cached_prices,
+    read_manifest,
+    refresh_price_cache,
+)
+
+pytest.importorskip("pyarrow")
+
+def as_lists(prices):
+    """{asset_id: (dates, closes)} columns as the lists loader.load_prices returns."""
+    return {
+        asset_id: (dates.astype("datetime64[us]").tolist(), closes.tolist())
+        for asset_id, (dates, closes) in prices.items()
+    }
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def add_prices(db, asset_id, start, days):
+    for i in range(days):
+        db.add(Price(asset_id=asset_id, date=start + timedelta(days=i),
+                     close=100.0 + asset_id + i / 10))
+    db.commit()
+
+def test_cache_matches_database(db_session, tmp_path):
+    for ticker in ("AAA", "BBB"):
+        db_session.add(Asset(ticker=ticker, name=ticker))
+    db_session.commit()
+    add_prices(db_session, 1, datetime(2024, 1, 20), 30)  # Spans two months
+    add_prices(db_session, 2, datetime(2024, 1, 1), 10)
+
+    assert refresh_price_cache(db_session, str(tmp_path)) == {"rows": 40, "months": 2}
+    assert as_lists(load_cached_prices(str(tmp_path))) == load_prices(db_session)
+    assert read_manifest(str(tmp_path))[2] == datetime(2024, 1, 10)
+    # Columnar: one array per column and asset, not one object per bar
+    dates, closes = load_cached_prices(str(tmp_path))[1]
+    assert dates.dtype == np.dtype("datetime64[us]")
+    assert closes.dtype == np.dtype(np.float64)
+
+def test_refresh_fetches_only_new_rows(db_session, tmp_path):
+    db_session.add(Asset(ticker="AAA", name="AAA"))
+    db_session.commit()
+    add_prices(db_session, 1, datetime(2024, 1, 1), 20)
+    refresh_price_cache(db_session, str(tmp_path))
+
+    # New bars for the existing asset and a new asset
+    db_session.add(Asset(ticker="BBB", name="BBB"))
+    db_session.commit()
+    add_prices(db_session, 1, datetime(2024, 1, 21), 15)
+    add_prices(db_session, 2, datetime(2024, 2, 1), 5)
+
+    assert refresh_price_cache(db_session, str(tmp_path)) == {"rows": 20, "months": 2}
+    assert refresh_price_cache(db_session, str(tmp_path))["rows"] == 0
+    assert as_lists(load_cached_prices(str(tmp_path))) == load_prices(db_session)
+
+    # Date and asset filters
+    february = load_cached_prices(str(tmp_path), asset_ids=[1],
+                                  start=datetime(2024, 2, 1))
+    assert list(february) == [1]
+    assert february[1][0][0] == np.datetime64(datetime(2024, 2, 1))
+    assert len(february[1][0]) == 4
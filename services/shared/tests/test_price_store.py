@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from services.quant_agent.main import app
+from services.shared import price_store
+from services.shared.config import settings
+from services.shared.price_store import (
+    PRICE_REF_CONTENT_TYPE,
+    open_price_store,
+    remove_price_store,
+    write_price_store,
+)
+
+
+def history(days=250, seed=7):
+    dates = [datetime(2023, 1, 1) + timedelta(days=i) for i in range(days)]
+    returns = np.random.default_rng(seed).normal(0.0005, 0.01, days)
+    closes = 100 * np.cumprod(1 + returns)
+    return dates, closes.tolist()
+
+def test_store_round_trip(tmp_path):
+    histories = {"AAPL": history(), "MSFT": history(60, seed=8)}
+    write_price_store(str(tmp_path), "run_1", histories)
+
+    store = open_price_store("run_1", str(tmp_path))
+    dates, closes = store.columns("MSFT")
+    assert closes.tolist() == histories["MSFT"][1]
+    assert dates[1] - dates[0] == 86400
+    assert not closes.flags.writeable  # Mapped read-only, no copy
+    with pytest.raises(ValueError):
+        store.columns("TSLA")
+
+    remove_price_store(str(tmp_path), "run_1")
+    assert not (tmp_path / "run_1").exists()
+
+def test_rewritten_and_removed_stores_are_not_served_from_the_cache(tmp_path):
+    write_price_store(str(tmp_path), "run_4", {"AAPL": history(30)})
+    first = open_price_store("run_4", str(tmp_path))
+    assert open_price_store("run_4", str(tmp_path)) is first
+
+    # Same run_id rewritten (a rerun within the same second)
+    remove_price_store(str(tmp_path), "run_4")
+    write_price_store(str(tmp_path), "run_4", {"MSFT": history(40, seed=9)})
+    second = open_price_store("run_4", str(tmp_path))
+    assert second is not first and len(second.columns("MSFT")[1]) == 40
+
+    remove_price_store(str(tmp_path), "run_4")
+    with pytest.raises(ValueError):
+        open_price_store("run_4", str(tmp_path))
+    assert str(tmp_path / "run_4") not in price_store._open_stores
+
+def test_run_id_cannot_escape_the_store(tmp_path):
+    for run_id in ("../etc", "..", "a/b", ""):
+        with pytest.raises(ValueError):
+            open_price_store(run_id, str(tmp_path))
+
+def test_price_ref_and_json_requests_agree(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "PRICE_STORE_DIR", str(tmp_path))
+    dates, closes = history()
+    write_price_store(str(tmp_path), "run_2", {"AAPL": (dates, closes)})
+    client = TestClient(app)
+    headers = {"X-API-KEY": settings.API_KEY_SECRET}
+    ref_headers = dict(headers, **{"Content-Type": PRICE_REF_CONTENT_TYPE})
+
+    as_json = client.post("/api/v1/quant/analyze", headers=headers, json={
+        "ticker": "AAPL",
+        "prices": [{"date": d.isoformat(), "price": c} for d, c in zip(dates, closes)],
+    })
+    as_ref = client.post("/api/v1/quant/analyze", headers=ref_headers,
+                         content=b'{"run_id":"run_2","ticker":"AAPL"}')
+    unknown_run = client.post("/api/v1/quant/analyze", headers=ref_headers,
+                              content=b'{"run_id":"run_3","ticker":"AAPL"}')
+
+    assert as_json.status_code == as_ref.status_code == 200
+    assert as_ref.json() == as_json.json()
+    assert unknown_run.status_code == 422
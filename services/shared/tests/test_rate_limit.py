@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.shared.rate_limit import MemoryBackend, RateLimitMiddleware, RedisBackend
+
+
+def make_client(backend, key_quotas=None):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limit=3, window=60, backend=backend,
+                       key_quotas=key_quotas or {})
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+def test_memory_bucket_refills_and_evicts_idle_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.shared.rate_limit.time.monotonic", lambda: now[0])
+    backend = MemoryBackend()
+
+    assert [backend.acquire("a", 2, 1.0)[0] for _ in range(3)] == [True, True, False]
+    assert backend.acquire("a", 2, 1.0) == (False, 1.0)
+    now[0] += 1.0
+    assert backend.acquire("a", 2, 1.0)[0]
+
+    # Once full again an idle bucket holds no information and is dropped
+    now[0] += 10.0
+    backend.acquire("b", 2, 1.0)
+    assert len(backend) == 1
+
+def test_api_key_quota_replaces_ip_limit():
+    client = make_client(MemoryBackend(), key_quotas={"pipeline-key": 10})
+    keyed = [
+        client.get("/ping", headers={"X-API-KEY": "pipeline-key"}).status_code
+        for _ in range(10)
+    ]
+    anonymous = [client.get("/ping").status_code for _ in range(4)]
+    unknown_key = client.get("/ping", headers={"X-API-KEY": "other"})
+
+    assert keyed == [200] * 10
+    assert anonymous == [200, 200, 200, 429]
+    assert unknown_key.status_code == 429  # Counted against the IP
+    assert int(unknown_key.headers["Retry-After"]) >= 1
+
+def test_shared_backend_limits_across_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    # Two workers with their own middleware instance and connection
+    workers = [
+        make_client(RedisBackend(client=fakeredis.FakeRedis(server=server)))
+        for _ in range(2)
+    ]
+
+    statuses = [workers[i % 2].get("/ping").status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    # Buckets expire in Redis once they would be full again
+    redis = fakeredis.FakeRedis(server=server)
+    assert [redis.pttl(key) > 0 for key in redis.keys("ratelimit:*")] == [True]
+
+def test_backend_errors_fail_open():
+    class Down:
+        def acquire(self, key, capacity, rate):
+            raise ConnectionError("unreachable")
+
+    client = make_client(Down())
+    assert [client.get("/ping").status_code for _ in range(5)] == [200] * 5
+
+def test_blocking_backends_run_off_the_event_loop():
+    backend_threads, endpoint_threads = [], []
+
+    class Blocking(MemoryBackend):
+        blocking = True  # Like RedisBackend
+
+        def acquire(self, key, capacity, rate):
+            backend_threads.append(threading.current_thread())
+            return super().acquire(key, capacity, rate)
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limit=3, window=60, backend=Blocking(),
+                       key_quotas={})
+
+    @app.get("/ping")
+    async def ping():
+        endpoint_threads.append(threading.current_thread())  # The event loop thread
+        return {"ok": True}
+
+    assert TestClient(app).get("/ping").status_code == 200
+    assert len(backend_threads) == 1
+    assert backend_threads[0] is not endpoint_threads[0]
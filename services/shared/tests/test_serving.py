@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from services.shared.serving import run_cpu_bound
+
+
+def slow_rule(seconds):
+    time.sleep(seconds)  # Stands in for a long pandas computation
+    return seconds
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        return {"slept": await run_cpu_bound(slow_rule, 0.5)}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+def test_slow_rule_does_not_block_health_checks():
+    async def scenario():
+        transport = httpx.ASGITransport(app=make_app())
+        client = httpx.AsyncClient(transport=transport, base_url="http://test")
+        async with client:
+            slow = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            health = await client.get("/health")
+            answered_first = not slow.done()
+            return (await slow).json(), health.status_code, answered_first
+
+    slow, health_status, answered_first = asyncio.run(scenario())
+    assert slow == {"slept": 0.5}
+    assert health_status == 200
+    assert answered_first  # The health check did not wait for the rule
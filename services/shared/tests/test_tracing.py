@@ -0,0 +1,89 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from services.shared import tracing
+from services.shared.metrics import TimedRoute, add_metrics
+
+
+def read_spans(path):
+    tracing.flush_traces()
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            service = resource["resource"]["attributes"][0]["value"]["stringValue"]
+            for scope in resource["scopeSpans"]:
+                spans += [dict(span, service=service) for span in scope["spans"]]
+    return {span["name"]: span for span in spans}
+
+@pytest.fixture
+def trace_file(monkeypatch, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(path))
+    yield path
+    tracing.flush_traces()  # Leave nothing queued for the next test
+
+def test_disabled_tracing_is_a_noop():
+    assert tracing.start_span("anything") is tracing.NOOP_SPAN
+    assert tracing.inject({}) == {}
+
+def test_traceparent_round_trip(trace_file):
+    with tracing.start_span("parent") as span:
+        headers = tracing.inject({})
+    parent = tracing.extract(headers["traceparent"])
+    assert (parent.trace_id, parent.span_id) == (span.trace_id, span.span_id)
+    assert tracing.extract("00-" + "0" * 32 + "-" + "1" * 16 + "-01") is None
+    assert tracing.extract("garbage") is None
+
+def test_spans_nest_across_threads_and_export_as_otlp(trace_file):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with tracing.start_span("pipeline.run", service="pipeline", run_id="r1") as run:
+            with tracing.start_span("pipeline.asset", ticker="AAPL"):
+                call = lambda: tracing.start_span("call quant/analyze").end()  # noqa: E731
+                pool.submit(tracing.in_trace_context(call)).result()
+            try:
+                with tracing.start_span("db.flush_ledger"):
+                    raise RuntimeError("deadlock")
+            except RuntimeError:
+                pass
+
+    spans = read_spans(trace_file)
+    assert {s["traceId"] for s in spans.values()} == {run.trace_id}
+    assert "parentSpanId" not in spans["pipeline.run"]
+    assert spans["pipeline.asset"]["parentSpanId"] == run.span_id
+    asset = spans["pipeline.asset"]
+    assert spans["call quant/analyze"]["parentSpanId"] == asset["spanId"]
+    assert spans["db.flush_ledger"]["status"] == {
+        "code": tracing.STATUS_ERROR, "message": "RuntimeError: deadlock"
+    }
+    assert asset["service"] == "pipeline"
+    assert {"key": "ticker", "value": {"stringValue": "AAPL"}} in asset["attributes"]
+
+def test_agent_continues_the_callers_trace(trace_file):
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/analyze")
+    async def analyze(payload: dict):
+        return payload
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1/test")
+    add_metrics(app, "traced")
+
+    with tracing.start_span("call test/analyze", kind=tracing.CLIENT) as call:
+        resp = TestClient(app).post("/api/v1/test/analyze", json={"ticker": "AAPL"},
+                                    headers=tracing.inject({}))
+    assert resp.status_code == 200
+
+    spans = read_spans(trace_file)
+    server = spans["POST /api/v1/test/analyze"]
+    assert (server["traceId"], server["parentSpanId"]) == (call.trace_id, call.span_id)
+    assert server["service"] == "traced_agent" and server["kind"] == tracing.SERVER
+    for stage in ("validation", "compute", "serialization"):
+        assert spans[stage]["parentSpanId"] == server["spanId"]
+        span = spans[stage]
+        assert (int(server["startTimeUnixNano"]) <= int(span["startTimeUnixNano"])
+                <= int(span["endTimeUnixNano"]) <= int(server["endTimeUnixNano"]))
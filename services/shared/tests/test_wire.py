@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from services.quant_agent.main import app
+from services.shared.config import settings
+from services.shared.wire import (
+    PRICE_COLUMNS_CONTENT_TYPE,
+    decode_price_columns,
+    encode_price_columns,
+)
+
+
+def history(days=250):
+    dates = [datetime(2023, 1, 1) + timedelta(days=i) for i in range(days)]
+    closes = 100 * np.cumprod(1 + np.random.default_rng(7).normal(0.0005, 0.01, days))
+    return dates, closes.tolist()
+
+def test_round_trip_is_exact():
+    dates, closes = history()
+    body = encode_price_columns({"ticker": "AAPL"}, dates, closes)
+    fields, date_column, close_column = decode_price_columns(body)
+
+    assert fields == {"ticker": "AAPL"}
+    assert close_column.tolist() == closes
+    assert date_column[1] - date_column[0] == 86400
+    assert not close_column.flags.writeable  # View over the request body, no copy
+
+def test_malformed_payloads_are_rejected():
+    body = encode_price_columns({"ticker": "AAPL"}, *history(40))
+    with pytest.raises(ValueError):
+        decode_price_columns(body[:-8])
+    with pytest.raises(ValueError):
+        decode_price_columns(b"JSON" + body[4:])
+
+def test_columns_and_json_requests_agree():
+    client = TestClient(app)
+    headers = {"X-API-KEY": settings.API_KEY_SECRET}
+    dates, closes = history()
+
+    as_json = client.post("/api/v1/quant/analyze", headers=headers, json={
+        "ticker": "AAPL",
+        "prices": [{"date": d.isoformat(), "price": c} for d, c in zip(dates, closes)],
+    })
+    as_columns = client.post(
+        "/api/v1/quant/analyze",
+        headers=dict(headers, **{"Content-Type": PRICE_COLUMNS_CONTENT_TYPE}),
+        content=encode_price_columns({"ticker": "AAPL"}, dates, closes),
+    )
+    too_short = client.post(
+        "/api/v1/quant/analyze",
+        headers=dict(headers, **{"Content-Type": PRICE_COLUMNS_CONTENT_TYPE}),
+        content=encode_price_columns({"ticker": "AAPL"}, dates[:10], closes[:10]),
+    )
+
+    assert as_json.status_code == as_columns.status_code == 200
+    assert as_columns.json() == as_json.json()
+    assert too_short.status_code == 422
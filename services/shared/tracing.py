@@ -0,0 +1,282 @@
+"""
+Lightweight distributed tracing (W3C trace context, OTLP/JSON export).
+
+- run_pipeline opens a trace per run, with spans per asset (or batch), per
+  agent call, for the DB loads/writes and for the MinIO upload;
+- call_agent sends the current span as a `traceparent` header; the agents
+  continue that trace with a server span per request and child spans for
+  validation, compute (rules) and serialization (see metrics.MetricsMiddleware);
+- finished spans are batched by a background thread and appended to
+  TRACE_FILE as OTLP/JSON lines and/or POSTed to TRACE_OTLP_ENDPOINT (an
+  OTLP/HTTP collector, e.g. http://otel-collector:4318/v1/traces).
+
+Tracing is off unless one of them is set; spans are then no-ops. The current
+span lives in a contextvar: work submitted to a thread pool must be wrapped
+with in_trace_context() to stay in the submitting span.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from typing import Optional
+
+from services.shared.logger import setup_logger
+
+logger = setup_logger("tracing")
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "portfolio")
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "1.0"))
+TRACE_BATCH_SIZE = 512
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+class SpanContext:
+    """Identity of a span, local or received in a traceparent header."""
+
+    def __init__(self, trace_id: str, span_id: str, service: Optional[str] = None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.service = service
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+class Span(SpanContext):
+    def __init__(self, name: str, parent: Optional[SpanContext] = None,
+                 service: Optional[str] = None, kind: int = INTERNAL,
+                 start_ns: Optional[int] = None, **attributes):
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        service = service or (parent.service if parent else None) or TRACE_SERVICE_NAME
+        super().__init__(trace_id, secrets.token_hex(8), service)
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def end(self, end_ns: Optional[int] = None,
+            error: Optional[BaseException] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _exporter.add(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(error=exc)
+        return False
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                _attribute(k, v) for k, v in self.attributes.items() if v is not None
+            ],
+            "status": {"code": STATUS_OK},
+        }
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+class _NoopSpan:
+    """Returned by start_span while tracing is off."""
+
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self, end_ns=None, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span",
+                                                             default=None)
+
+def tracing_enabled() -> bool:
+    return bool(TRACE_FILE or TRACE_OTLP_ENDPOINT)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def start_span(name: str, parent: Optional[SpanContext] = None, **kwargs):
+    """
+    A span, child of `parent` (default: the current span; a new trace
+    without one). Use it as a context manager to make it current, or call
+    end() explicitly.
+    """
+    if not tracing_enabled():
+        return NOOP_SPAN
+    return Span(name, parent or _current_span.get(), **kwargs)
+
+def in_trace_context(fn):
+    """
+    `fn` bound to a copy of the caller's context, for executor.submit (threads
+    do not inherit it).
+    """
+    if not tracing_enabled():
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+def inject(headers: dict[str, str]) -> dict[str, str]:
+    """Adds the current span's traceparent to outgoing request headers."""
+    span = _current_span.get()
+    if span is not None and tracing_enabled():
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    return headers
+
+def extract(traceparent: Optional[str]) -> Optional[SpanContext]:
+    """The remote parent in a traceparent header; None if absent or malformed."""
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+def record_request_spans(service: str, name: str, traceparent: Optional[str],
+                         marks: dict[str, float], end: float, status_code: int) -> None:
+    """
+    Server span of an agent request, continuing the caller's trace, with
+    validation / compute / serialization children. `marks` are the
+    perf_counter timestamps taken by metrics.MetricsMiddleware.
+    """
+    end_ns = time.time_ns()
+    to_ns = lambda mark: end_ns - int((end - mark) * 1e9)  # noqa: E731
+    server = Span(name, extract(traceparent), service=service, kind=SERVER,
+                  start_ns=to_ns(marks["start"]), **{"http.status_code": status_code})
+    if "compute_start" in marks and "compute_end" in marks:
+        stages = [
+            ("validation", marks["start"], marks["compute_start"]),
+            ("compute", marks["compute_start"], marks["compute_end"]),
+            ("serialization", marks["compute_end"], marks.get("response", end)),
+        ]
+        for stage, started, finished in stages:
+            Span(stage, server, start_ns=to_ns(started)).end(end_ns=to_ns(finished))
+    error = RuntimeError(f"HTTP {status_code}") if status_code >= 500 else None
+    server.end(end_ns=end_ns, error=error)
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+def otlp_payload(spans: list[Span]) -> dict:
+    """OTLP/JSON ExportTraceServiceRequest, one resource per service."""
+    by_service: dict[str, list[dict]] = {}
+    for span in spans:
+        by_service.setdefault(span.service, []).append(span.to_otlp())
+    return {"resourceSpans": [
+        {
+            "resource": {"attributes": [_attribute("service.name", service)]},
+            "scopeSpans": [
+                {"scope": {"name": "services.shared.tracing"}, "spans": service_spans},
+            ],
+        }
+        for service, service_spans in by_service.items()
+    ]}
+
+class SpanExporter:
+    """Queues finished spans; a daemon thread writes them in batches."""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, span: Span) -> None:
+        self._queue.put(span)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run,
+                                                    name="span-exporter", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(TRACE_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        """Exports every queued span (also called at exit and at the end of a run)."""
+        with self._lock:
+            while True:
+                spans = []
+                while len(spans) < TRACE_BATCH_SIZE:
+                    try:
+                        spans.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not spans:
+                    return
+                self._export(otlp_payload(spans))
+
+    def _export(self, payload: dict) -> None:
+        body = json.dumps(payload, separators=(",", ":"))
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a") as f:
+                    f.write(body + "\n")
+            except OSError as e:
+                logger.warning("Could not write spans to %s: %s", TRACE_FILE, e)
+        if TRACE_OTLP_ENDPOINT:
+            request = urllib.request.Request(
+                TRACE_OTLP_ENDPOINT, data=body.encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                # Tracing must never break the traced code
+                logger.warning("Could not export spans to %s: %s", TRACE_OTLP_ENDPOINT,
+                               e)
+
+_exporter = SpanExporter()
+
+def flush_traces() -> None:
+    _exporter.flush()
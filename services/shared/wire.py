@@ -0,0 +1,179 @@
+"""
+Columnar binary wire format for price histories.
+
+Alternative to JSON lists of {date, price} objects for the quant and risk
+agents, negotiated via Content-Type. Layout (little-endian):
+
+    b"PXC1" | uint32 header length | header JSON | zero padding to 8 bytes
+    | int64[count] dates (epoch seconds) | float64[count] closes
+
+The header carries the scalar fields of the request plus "count". Agents wrap
+the two columns as NumPy arrays (np.frombuffer, no per-point objects).
+"""
+import json
+import struct
+from collections.abc import Sequence
+from typing import Any, ClassVar
+
+import numpy as np
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    ValidationError,
+    field_serializer,
+    model_validator,
+)
+
+from services.shared.price_store import PRICE_REF_CONTENT_TYPE, open_price_store
+
+PRICE_COLUMNS_CONTENT_TYPE = "application/x-price-columns"
+
+MAGIC = b"PXC1"
+_PREFIX = struct.Struct("<4sI")
+
+class EncodedPayload:
+    """A request body already encoded in a non-JSON content type."""
+    __slots__ = ("content_type", "body")
+
+    def __init__(self, content_type: str, body: bytes):
+        self.content_type = content_type
+        self.body = body
+
+def price_ref_payload(run_id: str, ticker: str,
+                      fields: dict[str, Any]) -> EncodedPayload:
+    """Request referencing `ticker`'s history in the shared price store of `run_id`."""
+    body = json.dumps(dict(fields, run_id=run_id, ticker=ticker),
+                      separators=(",", ":")).encode()
+    return EncodedPayload(PRICE_REF_CONTENT_TYPE, body)
+
+def encode_price_columns(fields: dict[str, Any], dates: Sequence,
+                         closes: Sequence[float]) -> bytes:
+    """Encodes scalar `fields` and a (dates, closes) history.
+
+    Dates are datetimes or epoch seconds.
+    """
+    dates = np.asarray(dates)
+    if dates.dtype.kind != "i":
+        dates = dates.astype("datetime64[s]").astype(np.int64)
+    dates = dates.astype("<i8", copy=False)
+    closes = np.asarray(closes, dtype="<f8")
+    if len(dates) != len(closes):
+        raise ValueError("dates and closes must have the same length")
+
+    header = json.dumps(dict(fields, count=len(closes)), separators=(",", ":")).encode()
+    padding = -(_PREFIX.size + len(header)) % 8
+    return b"".join([
+        _PREFIX.pack(MAGIC, len(header)), header, b"\0" * padding,
+        dates.tobytes(), closes.tobytes(),
+    ])
+
+def decode_price_columns(body: bytes) -> tuple[dict[str, Any], np.ndarray, np.ndarray]:
+    """Returns (fields, dates, closes); the arrays are read-only views over `body`."""
+    if len(body) < _PREFIX.size:
+        raise ValueError("Truncated price columns payload")
+    magic, header_length = _PREFIX.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("Not a price columns payload")
+    offset = _PREFIX.size + header_length
+    fields = json.loads(body[_PREFIX.size:offset])
+    if not isinstance(fields, dict):
+        raise ValueError("Price columns header must be an object")
+    count = fields.pop("count", None)
+    offset += -offset % 8
+    if not isinstance(count, int) or len(body) != offset + 16 * count:
+        raise ValueError("Price columns payload does not match its declared count")
+
+    dates = np.frombuffer(body, dtype="<i8", count=count, offset=offset)
+    closes = np.frombuffer(body, dtype="<f8", count=count, offset=offset + 8 * count)
+    return fields, dates, closes
+
+class PriceColumnsModel(BaseModel):
+    """Base for columnar rule inputs: the price history as two NumPy arrays."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # Same bound as the `prices` list of the JSON model
+    min_prices: ClassVar[int] = 0
+
+    dates: np.ndarray  # Epoch seconds
+    closes: np.ndarray
+
+    @model_validator(mode="after")
+    def check_columns(self) -> "PriceColumnsModel":
+        if len(self.dates) != len(self.closes):
+            raise ValueError("dates and closes must have the same length")
+        if len(self.closes) < self.min_prices:
+            raise ValueError(f"Minimum {self.min_prices} prices required")
+        if not np.all(self.closes > 0):
+            raise ValueError("prices must be greater than 0")
+        return self
+
+    @field_serializer("dates", "closes")
+    def serialize_column(self, value: np.ndarray) -> str:
+        # Compact and exact; also what the result cache hashes
+        return value.tobytes().hex()
+
+def price_count(data: BaseModel) -> int:
+    """Length of the price history of a JSON or columnar input."""
+    return len(data.closes) if isinstance(data, PriceColumnsModel) else len(data.prices)
+
+def negotiated_body(json_model: type[BaseModel],
+                    columns_model: type[PriceColumnsModel]):
+    """
+    FastAPI dependency parsing the request body as `json_model` (JSON) or
+    as `columns_model`, from the price columns Content-Type or from a
+    reference into the shared price store. Invalid bodies get the usual 422.
+    """
+    async def parse_body(request: Request) -> BaseModel:
+        body = await request.body()
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        try:
+            if content_type == PRICE_COLUMNS_CONTENT_TYPE:
+                try:
+                    fields, dates, closes = decode_price_columns(body)
+                except ValueError as e:
+                    raise RequestValidationError([
+                        {"type": "value_error", "loc": ("body",), "msg": str(e)}
+                    ]) from e
+                fields.update(dates=dates, closes=closes)
+                return columns_model(**fields)
+            if content_type == PRICE_REF_CONTENT_TYPE:
+                try:
+                    fields = json.loads(body)
+                    store = open_price_store(str(fields.pop("run_id")))
+                    dates, closes = store.columns(str(fields.get("ticker")))
+                except (ValueError, KeyError, AttributeError, OSError) as e:
+                    raise RequestValidationError([{
+                        "type": "value_error", "loc": ("body",),
+                        "msg": f"Price store: {e}",
+                    }]) from e
+                fields.update(dates=dates, closes=closes)
+                return columns_model(**fields)
+            return json_model.model_validate_json(body)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False,
+                              include_input=False)
+            raise RequestValidationError([
+                dict(err, loc=("body",) + tuple(err["loc"])) for err in errors
+            ]) from e
+    return parse_body
+
+def negotiated_openapi(json_model: type[BaseModel]) -> dict[str, Any]:
+    """openapi_extra documenting the accepted request content types."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"title": json_model.__name__, "type": "object"},
+                },
+                PRICE_COLUMNS_CONTENT_TYPE: {
+                    "schema": {"type": "string", "format": "binary"},
+                },
+                PRICE_REF_CONTENT_TYPE: {
+                    "schema": {"type": "object", "required": ["run_id", "ticker"]},
+                },
+            },
+        }
+    }
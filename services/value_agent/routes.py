@@ -1,24 +1,49 @@
 from fastapi import APIRouter, HTTPException, Depends
 from services.value_agent.schema import ValuationInput, ValuationOutput
-from services.value_agent.rules.valuation import calculate_intrinsic_value
+from services.value_agent.rules.valuation import calculate_intrinsic_value, RULE_VERSION
 from services.shared.logger import setup_logger
+from services.shared.metrics import TimedRoute
+from services.shared.batch import BatchInput, BatchOutput, run_batch
+from services.shared.cache import ResultCache
 
 from services.shared.security import get_api_key
 
-router = APIRouter()
-logger = setup_logger("value_agent")
+# Times validation / compute / serialization per request
+router = APIRouter(route_class=TimedRoute)
+logger = setup_logger("value_agent", agent="value")
+
+# Unchanged inputs (e.g. reruns) are served from the result cache
+result_cache = ResultCache.from_env("value_agent")
+cached_intrinsic_value = result_cache.wrap(
+    calculate_intrinsic_value, ValuationOutput, RULE_VERSION
+)
 
 @router.post("/analyze", response_model=ValuationOutput, dependencies=[Depends(get_api_key)])
 async def analyze_stock(data: ValuationInput):
-    logger.info(f"Analyzing ticker: {data.ticker}")
+    logger.info("Analyzing ticker: %s", data.ticker, extra={"ticker": data.ticker})
     try:
-        result = calculate_intrinsic_value(data)
-        logger.info(f"Analysis complete for {data.ticker}: {result.signal}")
+        result = cached_intrinsic_value(data)
+        logger.info("Analysis complete for %s: %s", data.ticker, result.signal,
+                    extra={"ticker": data.ticker})
         return result
     except Exception as e:
-        logger.error(f"Error analyzing {data.ticker}: {str(e)}")
+        logger.error("Error analyzing %s: %s", data.ticker, e,
+                     extra={"ticker": data.ticker})
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analyze/batch", response_model=BatchOutput[ValuationOutput],
+             dependencies=[Depends(get_api_key)])
+async def analyze_stock_batch(data: BatchInput):
+    logger.info("Analyzing batch of %d tickers", len(data.items))
+    result = run_batch(data.items, ValuationInput, cached_intrinsic_value)
+    logger.info("Batch complete: %d analyzed, %d failed", len(result.results),
+                len(result.errors))
+    return result
+
+@router.get("/cache/stats", dependencies=[Depends(get_api_key)])
+async def cache_stats():
+    return result_cache.stats()
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
@@ -1,6 +1,9 @@
 from services.value_agent.schema import ValuationInput, ValuationOutput
 from services.shared.models.enums import SignalType
 
+# Part of the result cache key: bump whenever the rule logic changes
+RULE_VERSION = "1"
+
 def calculate_intrinsic_value(data: ValuationInput) -> ValuationOutput:
     # 1. Simple DCF approximation
     growth_rate = min(data.roe * 0.5, 0.15) 
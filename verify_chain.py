@@ -1,107 +1,105 @@
-import sys
-import hashlib
+import argparse
 import json
-from sqlalchemy import create_engine, select
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+
+from services.shared.audit import list_chains, verify_chains
 from services.shared.config import settings
-from services.shared.models.domain import AgentOutput, FinalDecision
+from services.shared.ledger import FINAL_DECISION_CHAIN
+
 
-def calculate_hash(prev_hash: str, data: str) -> str:
-    """Replicates the SHA-256 hash chain logic from pipeline.py"""
-    return hashlib.sha256(f"{prev_hash}{data}".encode()).hexdigest()
+def load_checkpoint(path):
+    """Returns {chain: {"last_id", "hash"}} from a previous pass ({} if none)."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
 
-def verify_agent_outputs(session):
-    print("\n--- Verifying Agent Outputs (Per Agent Chain) ---")
-    agents = session.query(AgentOutput.agent_name).distinct().all()
-    agent_names = [a[0] for a in agents]
-    
-    all_valid = True
-    
-    for agent in agent_names:
-        print(f"Checking chain for agent: {agent}")
-        outputs = session.query(AgentOutput).filter(AgentOutput.agent_name == agent).order_by(AgentOutput.id.asc()).all()
-        
-        expected_prev = "0" * 64
-        for out in outputs:
-            # Reconstruct data string
-            # pipeline.py: f"{asset_id}{agent}{signal}{score}{details_str}"
-            # Note: score is float, conversion to string must match exactly what Python did in pipeline
-            # Ideally pipeline should use f"{float(score)}" but it likely used default str(float). 
-            # We need to match the production logic exactly.
-            
-            # pipeline.py logic:
-            # score=float(score) if score else 0.0
-            # f"{asset_id}{agent}{signal}{score}{details_str}"
-            
-            # Warning: Python's float to string representation can vary. 
-            # In pipeline.py: f"{...}{score}{...}" uses standard formatting.
-            
-            data_str = f"{out.asset_id}{out.agent_name}{out.signal}{out.score}{out.details}"
-            calculated_hash = calculate_hash(expected_prev, data_str)
-            
-            if out.previous_hash != expected_prev:
-                print(f"  [BROKEN CHAIN] ID {out.id}: Previous hash mismatch!")
-                print(f"    Expected Prev: {expected_prev}")
-                print(f"    Actual Prev:   {out.previous_hash}")
-                all_valid = False
-                break
-            
-            if out.hash != calculated_hash:
-                print(f"  [TAMPER DETECTED] ID {out.id}: Hash mismatch!")
-                print(f"    Data: {data_str}")
-                print(f"    Calculated: {calculated_hash}")
-                print(f"    Stored:     {out.hash}")
-                all_valid = False
-                break
-            
-            expected_prev = out.hash
-            
-    if all_valid:
-        print("✅ Agent Output Chains: VALID")
-    else:
-        print("❌ Agent Output Chains: INVALID")
+def save_checkpoint(path, checkpoints):
+    # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoints, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
 
-def verify_final_decisions(session):
-    print("\n--- Verifying Final Decisions (Global Chain) ---")
-    decisions = session.query(FinalDecision).order_by(FinalDecision.id.asc()).all()
-    
-    all_valid = True
-    expected_prev = "0" * 64
-    
-    for dec in decisions:
-        # pipeline.py: f"{asset.ticker}{final_sig}{conf_score}{details_json}"
-        data_str = f"{dec.ticker}{dec.decision}{dec.confidence}{dec.details}"
-        calculated_hash = calculate_hash(expected_prev, data_str)
-        
-        if dec.previous_hash != expected_prev:
-            print(f"  [BROKEN CHAIN] ID {dec.id}: Previous hash mismatch!")
-            all_valid = False
-            break
-            
-        if dec.hash != calculated_hash:
-            print(f"  [TAMPER DETECTED] ID {dec.id}: Hash mismatch!")
-            print(f"    Data: {data_str}")
-            print(f"    Calculated: {calculated_hash}")
-            print(f"    Stored:     {dec.hash}")
-            all_valid = False
-            break
-            
-        expected_prev = dec.hash
+def print_report(report):
+    status = "OK" if report["valid"] else "FAILED"
+    rate = report["rows"] / report["seconds"] if report["seconds"] > 0 else 0.0
+    print(f"  {report['chain']}: {status} - {report['rows']} rows in "
+          f"{report['seconds']:.2f}s ({rate:,.0f} rows/s), last id {report['last_id']}")
+    if report["error"]:
+        print(f"    {report['error']}")
 
-    if all_valid:
-        print("✅ Final Decision Chain: VALID")
-    else:
-        print("❌ Final Decision Chain: INVALID")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=(
+        "Verifies the SHA-256 hash chains of agent outputs and final decisions."
+    ))
+    parser.add_argument("--checkpoint", help=(
+        "JSON file with the last verified id/hash per chain; only newer rows are "
+        "verified and it is updated on success"
+    ))
+    parser.add_argument("--full", action="store_true", help=(
+        "Ignore the checkpoint and re-verify every chain from genesis"
+    ))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Chains verified in parallel (processes)")
+    args = parser.parse_args(argv)
+
+    db_uri = settings.SQLALCHEMY_DATABASE_URI
+    engine = create_engine(db_uri)
+    session = sessionmaker(bind=engine)()
+    try:
+        chains = list_chains(session)
+    finally:
+        session.close()
+        engine.dispose()
+
+    saved = load_checkpoint(args.checkpoint)
+    checkpoints = {} if args.full else saved
+    mode = "incremental" if checkpoints else "full"
+    print(f"\n--- Verifying {len(chains)} hash chains "
+          f"({mode}, {args.workers} workers) ---")
+
+    started = time.perf_counter()
+    reports = verify_chains(db_uri, chains, checkpoints, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    for report in reports:
+        print_report(report)
+
+    total_rows = sum(r["rows"] for r in reports)
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    print(f"\nVerified {total_rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+    agents_valid = all(
+        r["valid"] for r in reports if r["chain"] != FINAL_DECISION_CHAIN
+    )
+    decisions_valid = all(
+        r["valid"] for r in reports if r["chain"] == FINAL_DECISION_CHAIN
+    )
+    print("✅ Agent Output Chains: VALID" if agents_valid
+          else "❌ Agent Output Chains: INVALID")
+    print("✅ Final Decision Chain: VALID" if decisions_valid
+          else "❌ Final Decision Chain: INVALID")
+
+    if args.checkpoint:
+        # Only chains that verified cleanly move forward; broken ones keep
+        # their last good checkpoint so the break is reported again next run
+        for report in reports:
+            if report["valid"]:
+                saved[report["chain"]] = {
+                    "last_id": report["last_id"], "hash": report["hash"]
+                }
+        save_checkpoint(args.checkpoint, saved)
+
+    return 0 if agents_valid and decisions_valid else 1
 
 if __name__ == "__main__":
-    engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    
     try:
-        verify_agent_outputs(session)
-        verify_final_decisions(session)
+        sys.exit(main())
     except Exception as e:
         print(f"Verification Failed: {e}")
-    finally:
-        session.close()
+        sys.exit(2)